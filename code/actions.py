@@ -0,0 +1,144 @@
+"""
+Per-waypoint actions of mission_engine.py, as coroutines in a registry.
+
+    @register("inspect_roof", params={"passes": int, "speed_mps": float})
+    async def inspect_roof(run, wp, target, params):
+        ...
+
+A mission file attaches actions to a waypoint ("action": "paint" or a list
+such as ["paint", {"name": "deliver", "params": {...}}]) and can import
+modules with more of them ("plugins": ["my_actions"]). The params an action
+declares are checked when the mission file is loaded (mission_schema.py):
+each is a type (float = any finite number), a tuple of types, or a function
+returning an error message or None; an action without a declaration takes
+any params unchecked. The actions of a stop
+run one after the other once the drone is there, while the engine checks
+(and if needed plans) the next leg alongside them.
+
+Every action run is timed (simulated time in headless runs) into the
+"action.<name>" phase and into ACTION_TIMES per stop, see print_report().
+"""
+import importlib
+from collections import namedtuple
+
+from phases import PhaseTimer, phase
+from safety import decision_kind
+from speed_profile import vertical_speed
+
+# fn(run, waypoint, target_xyz, params) coroutine; flies=False: runs from the previous stop
+# instead of flying to the waypoint; ends_mission: the mission stops after it;
+# params: {name: type | (types...) | check(value) -> error or None}, None = not checked
+ActionDef = namedtuple("ActionDef", ["name", "fn", "flies", "ends_mission", "params"])
+
+REGISTRY = {}
+ACTION_TIMES = PhaseTimer()   # "<actor> <action>" intervals, plus "<actor> stop" (arrival -> departure)
+
+
+def register(name, flies=True, ends_mission=False, params=None):
+    """Decorator: make a coroutine available as action `name` in mission files."""
+    def deco(fn):
+        REGISTRY[name] = ActionDef(name, fn, flies, ends_mission, params)
+        return fn
+    return deco
+
+
+def _title_and_text(value):
+    if value is not None and not (isinstance(value, list) and len(value) == 2
+                                  and all(isinstance(m, str) for m in value)):
+        return f"expected [title, text] strings or null, got {value!r}"
+    return None
+
+
+def _three_speeds(value):
+    if value is not None and not (isinstance(value, list) and len(value) == 3 and all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0 for v in value)):
+        return f"expected [down, up, settle] speeds > 0 or null, got {value!r}"
+    return None
+
+
+def load_plugins(modules):
+    """Import plugin modules (their @register calls add to REGISTRY)."""
+    for name in modules:
+        importlib.import_module(name)
+
+
+async def run_actions(run, wp, target):
+    """Run the actions of `wp` in order, each timed."""
+    for spec in wp.actions:
+        action = REGISTRY[spec.name]
+        with phase(f"action.{spec.name}"), ACTION_TIMES.phase(f"{wp.actor} {spec.name}"):
+            await action.fn(run, wp, target, spec.params)
+
+
+def print_report():
+    """Time per action and per stop, to see where the time at each stop goes."""
+    records = ACTION_TIMES.records
+    if not records:
+        return
+    print(f"\n[actions] {'stop':<12} {'action':<10} {'seconds':>8}")
+    for r in records:
+        actor, action = r.name.split(" ", 1)
+        print(f"  {actor:<12} {action:<10} {r.t1 - r.t0:8.2f}")
+    by_action = {}
+    for name, s in ACTION_TIMES.summary().items():
+        action = name.split(" ", 1)[1]
+        total = by_action.setdefault(action, [0, 0.0])
+        total[0] += s["count"]
+        total[1] += s["total_s"]
+    print("  " + ", ".join(f"{a} x{n} {t:.1f}s" for a, (n, t) in by_action.items()))
+
+
+@register("deliver", params={"message": _title_and_text, "severity": int})
+async def deliver(run, wp, target, params):
+    message = params.get("message", ["Building {index}:", " COLOR DELIVERED"])
+    if message:
+        title, text = (m.format(index=wp.index, actor=wp.actor) for m in message)
+        await run.aclient.simPrintLogMessage(title, text, severity=int(params.get("severity", 0)))
+
+
+@register("paint", params={"bounce_m": float, "speeds_mps": _three_speeds})
+async def paint(run, wp, target, params):
+    """
+    Small down-up painting movement above the roof (never below roof - clearance).
+    Speeds: params "speeds_mps" [down, up, settle], else sized to each move (vertical_speed).
+    """
+    _, _, z_cmd = target
+    bounce = float(params.get("bounce_m", 0.5))
+    z_down = max(z_cmd + bounce, run.roof_z[wp.actor] - wp.roof_clearance_m)
+    z_up = z_cmd - bounce
+    down_speed, up_speed, settle_speed = params.get("speeds_mps") or (
+        vertical_speed(z_down - z_cmd), vertical_speed(z_up - z_down), vertical_speed(z_cmd - z_up))
+
+    await run.aclient.simPrintLogMessage("Drone is PAINTING:", "COMPLETED", severity=0)
+    try:
+        # each moveToZAsync is awaited to completion, no settle sleeps in between
+        for z, speed in ((z_down, down_speed), (z_up, up_speed), (z_cmd, settle_speed)):
+            await run.aclient.moveToZAsync(z, speed, vehicle_name=run.vehicle)
+        await run.aclient.hoverAsync(vehicle_name=run.vehicle)
+    except Exception as e:
+        print(f"[WARN] {wp.actor} painting move failed: {e}")
+
+
+@register("inspect", flies=False, ends_mission=True, params={})
+async def inspect(run, wp, target, params):
+    """Check the leg to `wp` from here as the engine would fly it (never re-planned), without flying it; then hold."""
+    start = await run.position()
+    with phase("safety"):
+        _, fitted, preview = run._decide(start, target, replan=False)
+    run.note("leg_start", leg=wp.index, value=target[2], xyz=start)
+    run.note(decision_kind(preview, preview=True), leg=wp.index, xyz=fitted)
+
+    if preview.reason == "target_forbidden":
+        await run.aclient.simPrintLogMessage("ForbiddenZone", f"TARGET FORBIDDEN: {wp.actor}", severity=2)
+        print(f"\nForbiddenZone: TARGET FORBIDDEN -> {wp.actor}")
+    elif preview.action == "hold":
+        await run.aclient.simPrintLogMessage("ForbiddenZone", f"PATH FORBIDDEN to: {wp.actor}", severity=2)
+        print(f"\nForbiddenZone: PATH CROSSES FORBIDDEN -> {wp.actor}")
+
+    if preview.action == "hold":
+        await run.hold("HOLDING AT SAFE_Z (FORBIDDEN AHEAD)")
+    else:
+        print("ForbiddenZone: stop")
+        await run.aclient.simPrintLogMessage("ForbiddenZone", "STOPPED (PREVIEW)", severity=2)
+        await run.aclient.moveToZAsync(run.safe_z, run.mission.cruise.speed_mps, vehicle_name=run.vehicle)
+        await run.hover_wait(run.mission.hold_s)
\ No newline at end of file
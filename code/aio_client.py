@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sensor_stream import default_client_factory
+
+
+class AsyncMultirotorClient:
+    """
+    asyncio facade over cosysairsim.MultirotorClient.
+
+    Two connections, each owned by one worker thread (msgpack-rpc clients are
+    not thread-safe):
+      - motion: every *Async call, awaited until its .join() returns
+      - query:  state / sensor / log calls, plus cancelLastTask
+
+    so a state read or LiDAR check never waits behind a running move.
+
+        aclient = AsyncMultirotorClient(vehicle_name="Drone1")
+        await aclient.takeoffAsync(vehicle_name="Drone1")
+        state = await aclient.getMultirotorState(vehicle_name="Drone1")
+
+    Cancelling a task awaiting a motion call sends cancelLastTask on the query
+    connection and waits for the joined call to return before re-raising.
+    """
+
+    def __init__(self, client_factory=default_client_factory, vehicle_name=""):
+        self.motion_client = client_factory()
+        self.query_client = client_factory()
+        self.vehicle_name = vehicle_name
+        # set while a motion call is being cancelled; blocking helpers run with
+        # motion() can poll it (e.g. dwell(..., until=aclient.cancelling.is_set))
+        self.cancelling = threading.Event()
+        self._motion_pool = ThreadPoolExecutor(1, thread_name_prefix="aio-motion")
+        self._query_pool = ThreadPoolExecutor(1, thread_name_prefix="aio-query")
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        if name.endswith("Async"):
+            method = getattr(self.motion_client, name)
+
+            async def motion_call(*args, **kwargs):
+                vehicle = kwargs.get("vehicle_name", self.vehicle_name)
+                return await self._motion(lambda: method(*args, **kwargs).join(), vehicle)
+
+            return motion_call
+
+        method = getattr(self.query_client, name)
+
+        async def query_call(*args, **kwargs):
+            return await self._run(self._query_pool, functools.partial(method, *args, **kwargs))
+
+        return query_call
+
+    async def motion(self, fn, *args, **kwargs):
+        """Run blocking fn(motion_client, *args, **kwargs) on the motion thread (cancellable)."""
+        return await self._motion(functools.partial(fn, self.motion_client, *args, **kwargs), self.vehicle_name)
+
+    async def query(self, fn, *args, **kwargs):
+        """Run blocking fn(query_client, *args, **kwargs) on the query thread."""
+        return await self._run(self._query_pool, functools.partial(fn, self.query_client, *args, **kwargs))
+
+    async def _run(self, pool, fn):
+        return await asyncio.get_running_loop().run_in_executor(pool, fn)
+
+    async def _motion(self, fn, vehicle_name):
+        fut = asyncio.get_running_loop().run_in_executor(self._motion_pool, fn)
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            self.cancelling.set()
+            try:
+                await self._run(self._query_pool, functools.partial(
+                    self.query_client.cancelLastTask, vehicle_name=vehicle_name))
+                await asyncio.gather(fut, return_exceptions=True)
+            finally:
+                self.cancelling.clear()
+            raise
+
+    def close(self):
+        self._motion_pool.shutdown(wait=False)
+        self._query_pool.shutdown(wait=False)
+
+
+async def guarded(motion, *watchers):
+    """
+    Await `motion` while the `watchers` coroutines run alongside it.
+
+    A watcher that returns a truthy value (the reason) aborts the motion, which
+    cancels it on the simulator. Watchers that return a falsy value just stop.
+    Returns (motion_result, None) or (None, reason).
+    """
+    move = asyncio.ensure_future(motion)
+    watch = [asyncio.ensure_future(w) for w in watchers]
+    try:
+        pending = {move, *watch}
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if move in done:
+                return move.result(), None
+            for t in done:
+                reason = t.result()
+                if reason:
+                    move.cancel()
+                    await asyncio.gather(move, return_exceptions=True)
+                    return None, reason
+    finally:
+        if not move.done():
+            move.cancel()
+            await asyncio.gather(move, return_exceptions=True)
+        for t in watch:
+            t.cancel()
+        await asyncio.gather(*watch, return_exceptions=True)
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+Per-leg cruise altitudes from a 2.5D height field, instead of one SAFE_Z.
+
+waypoint3 flies every leg at SAFE_Z, the highest roof of the whole mission
+plus its margins. HeightField keeps the highest known top (NED z, more
+negative = higher) per CELL_M grid cell, from:
+
+  - the waypoint actors: each roof is stamped as a disc of ROOF_RADIUS_M
+    (the footprint of the building under it is not known);
+  - LiDAR, optionally: every return raises its cell's top; returns seen
+    from above (below the sensor) also mark the cell as mapped.
+
+AltitudePlanner gives each leg the altitude its own corridor needs: the
+highest top within half_width_m of the leg, minus clearance_m, minus
+unmapped_margin_m when part of the corridor has never been mapped (the
+same stacked margins as SAFE_Z, taken over the corridor, not the mission).
+
+    altitudes = AltitudePlanner.from_waypoints(waypoints)     # roofs of (idx, name, x, y, z_roof, z_target)
+    altitudes.heights.add_scan(client.getLidarData(lidar_name="LidarFront", vehicle_name="Drone1"))
+    z = altitudes.leg_z((x0, y0), (x1, y1))
+
+Corridor queries sample the leg every half cell and are cached per
+(endpoint cells, width); the cache is dropped whenever the field changes.
+bench_altitude_planner.py compares the climb against a global SAFE_Z.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from obstacle_detect import as_points
+from voxel_map import scan_to_world
+
+CELL_M = 2.0
+ROOF_RADIUS_M = 15.0        # disc stamped around a waypoint actor's roof
+HALF_WIDTH_M = 10.0         # corridor half-width around a leg (cross-track error, detour corners)
+CLEARANCE_M = 19.0          # above the highest top in the corridor (waypoint3: ROOF + EXTRA clearance)
+UNMAPPED_MARGIN_M = 30.0    # on top, while part of the corridor was never mapped (waypoint3: SAFE_Z_MARGIN_M)
+GROUND_Z = 0.0              # top of a corridor with no known cell at all
+CACHE_SIZE = 4096           # cached corridor queries
+GROW_CELLS = 64             # the grid grows by at least this many cells on a side
+Z_TOL_M = 0.5               # altitude changes smaller than this are not flown
+
+# top_z: highest top in the corridor (None: nothing known); unmapped: fraction of its cells never mapped
+Corridor = namedtuple("Corridor", ["top_z", "unmapped", "cells"])
+LegAltitude = namedtuple("LegAltitude", ["start", "end", "z", "top_z", "unmapped"])
+
+
+class HeightField:
+    def __init__(self, cell_m=CELL_M):
+        self.cell = float(cell_m)
+        self.i0 = self.j0 = 0                          # grid index of top[0, 0]
+        self.top = np.full((0, 0), np.nan)             # highest top per cell (NaN: nothing seen)
+        self.mapped = np.zeros((0, 0), dtype=bool)     # cell seen from above (or a stamped roof)
+        self.version = 0
+        self._cache = {}
+        self._cache_version = 0
+        self.hits = self.misses = 0
+
+    def _index(self, xy):
+        return np.floor(np.asarray(xy, dtype=np.float64) / self.cell).astype(np.int64)
+
+    def _grow(self, ij):
+        """Reallocate so that every (i, j) in `ij` falls inside the grid."""
+        lo, hi = ij.min(axis=0), ij.max(axis=0)
+        ni, nj = self.top.shape
+        if self.top.size and lo[0] >= self.i0 and lo[1] >= self.j0 \
+                and hi[0] < self.i0 + ni and hi[1] < self.j0 + nj:
+            return
+        if self.top.size:
+            lo = np.minimum(lo, (self.i0, self.j0))
+            hi = np.maximum(hi, (self.i0 + ni - 1, self.j0 + nj - 1))
+        lo, hi = lo - GROW_CELLS, hi + GROW_CELLS
+        top = np.full((hi[0] - lo[0] + 1, hi[1] - lo[1] + 1), np.nan)
+        mapped = np.zeros(top.shape, dtype=bool)
+        if self.top.size:
+            si, sj = self.i0 - lo[0], self.j0 - lo[1]
+            top[si:si + ni, sj:sj + nj] = self.top
+            mapped[si:si + ni, sj:sj + nj] = self.mapped
+        self.top, self.mapped, self.i0, self.j0 = top, mapped, int(lo[0]), int(lo[1])
+
+    # ---------- updates ----------
+
+    def add_tops(self, points, mapped=True):
+        """Raise each cell's top to the (N,3) points' z; `mapped`: bool or (N,) bool per point."""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if not len(pts):
+            return 0
+        ij = self._index(pts[:, :2])
+        self._grow(ij)
+        i, j = ij[:, 0] - self.i0, ij[:, 1] - self.j0
+        np.fmin.at(self.top, (i, j), pts[:, 2])
+        m = np.broadcast_to(np.asarray(mapped, dtype=bool), (len(pts),))
+        self.mapped[i[m], j[m]] = True
+        self.version += 1
+        return len(pts)
+
+    def add_roof(self, x, y, z_roof, radius_m=ROOF_RADIUS_M):
+        """Stamp a roof at z_roof as a disc (a waypoint actor stands on it)."""
+        r = np.arange(-radius_m, radius_m + self.cell, self.cell)
+        gx, gy = np.meshgrid(x + r, y + r, indexing="ij")
+        inside = (gx - x) ** 2 + (gy - y) ** 2 <= radius_m ** 2
+        pts = np.column_stack([gx[inside], gy[inside], np.full(int(inside.sum()), float(z_roof))])
+        return self.add_tops(pts)
+
+    def add_points(self, points_world, origin=None):
+        """LiDAR returns in world NED; with the sensor `origin`, returns below it mark their cell mapped."""
+        pts = np.asarray(points_world, dtype=np.float64).reshape(-1, 3)
+        mapped = True if origin is None else pts[:, 2] > float(origin[2]) + self.cell
+        return self.add_tops(pts, mapped)
+
+    def add_scan(self, lidar_data):
+        """Fuse one getLidarData result (sensor-frame points + pose)."""
+        p = lidar_data.pose.position
+        pts = scan_to_world(as_points(lidar_data.point_cloud), lidar_data.pose)
+        return self.add_points(pts, (p.x_val, p.y_val, p.z_val))
+
+    def add_voxel_map(self, vmap):
+        """The occupied voxels of a voxel_map.VoxelMap, seen from its newest origin."""
+        occ = vmap.logodds > 0.0
+        return self.add_points(vmap.centers(vmap.keys[occ]) - (0.0, 0.0, vmap.voxel * 0.5), vmap.origin)
+
+    # ---------- (de)serialization ----------
+
+    def to_dict(self):
+        """The known cells as [i, j, top_z, mapped] (for a telemetry log), so from_dict() rebuilds the field."""
+        i, j = np.nonzero(~np.isnan(self.top))
+        cells = [[int(a) + self.i0, int(b) + self.j0, float(self.top[a, b]), bool(self.mapped[a, b])]
+                 for a, b in zip(i.tolist(), j.tolist())]
+        return {"cell_m": self.cell, "cells": cells}
+
+    @classmethod
+    def from_dict(cls, d):
+        field = cls(d["cell_m"])
+        if d["cells"]:
+            c = np.asarray(d["cells"], dtype=np.float64)
+            # cell centers, so each top lands back in its own cell
+            field.add_tops(np.column_stack([(c[:, :2] + 0.5) * field.cell, c[:, 2]]), c[:, 3] != 0.0)
+        return field
+
+    # ---------- queries ----------
+
+    def corridor(self, a, b, half_width_m=HALF_WIDTH_M):
+        """Highest top and unmapped fraction within `half_width_m` of the XY segment a -> b (cached)."""
+        ka, kb = tuple(self._index(a[:2]).tolist()), tuple(self._index(b[:2]).tolist())
+        key = (min(ka, kb), max(ka, kb), float(half_width_m))
+        if self._cache_version != self.version or len(self._cache) >= CACHE_SIZE:
+            self._cache.clear()
+            self._cache_version = self.version
+        hit = self._cache.get(key)
+        if hit is not None:
+            self.hits += 1
+            return hit
+        self.misses += 1
+        result = self._corridor(a, b, half_width_m)
+        self._cache[key] = result
+        return result
+
+    def _corridor(self, a, b, half_width_m):
+        a = np.asarray(a[:2], dtype=np.float64)
+        d = np.asarray(b[:2], dtype=np.float64) - a
+        length = float(np.hypot(*d))
+        unit = d / length if length > 1e-9 else np.array([1.0, 0.0])
+        normal = np.array([-unit[1], unit[0]])
+        step = self.cell * 0.5
+        # the corridor is widened by a cell, so every cell it touches is sampled
+        t = np.linspace(-half_width_m - self.cell, length + half_width_m + self.cell,
+                        max(2, int(math.ceil((length + 2 * (half_width_m + self.cell)) / step)) + 1))
+        u = np.linspace(-half_width_m - self.cell, half_width_m + self.cell,
+                        max(2, int(math.ceil(2 * (half_width_m + self.cell) / step)) + 1))
+        pts = a + t[:, None, None] * unit + u[None, :, None] * normal
+        # round ends: samples past an end count only within half_width_m (+ a cell) of it
+        along = np.clip(t, 0.0, length)[:, None]
+        keep = np.hypot(t[:, None] - along, u[None, :]) <= half_width_m + self.cell
+        ij = self._index(pts[keep])
+        key = np.unique((ij[:, 0] << 32) | (ij[:, 1] + (1 << 31)))
+        ni, nj = self.top.shape
+        i, j = (key >> 32) - self.i0, (key & 0xFFFFFFFF) - (1 << 31) - self.j0
+        inside = (i >= 0) & (i < ni) & (j >= 0) & (j < nj)
+        i, j = i[inside], j[inside]
+        tops = self.top[i, j]
+        top = float(np.nanmin(tops)) if len(tops) and not np.isnan(tops).all() else None
+        unmapped = 1.0 - float(self.mapped[i, j].sum()) / len(key)
+        return Corridor(top, unmapped, len(key))
+
+    def stats(self):
+        return {"cells": int(self.top.size), "known": int(np.count_nonzero(~np.isnan(self.top))),
+                "mapped": int(self.mapped.sum()), "cache_hits": self.hits, "cache_misses": self.misses}
+
+
+class AltitudePlanner:
+    """Cruise altitude per leg from a HeightField; every answered leg is kept in .legs for the report."""
+
+    def __init__(self, heights, clearance_m=CLEARANCE_M, unmapped_margin_m=UNMAPPED_MARGIN_M,
+                 half_width_m=HALF_WIDTH_M, ground_z=GROUND_Z):
+        self.heights = heights
+        self.clearance = float(clearance_m)
+        self.unmapped_margin = float(unmapped_margin_m)
+        self.half_width = float(half_width_m)
+        self.ground_z = float(ground_z)
+        self.legs = []
+
+    @classmethod
+    def from_waypoints(cls, waypoints, clearance_m=CLEARANCE_M, unmapped_margin_m=UNMAPPED_MARGIN_M, **kwargs):
+        """Height field of the roofs of waypoint3-style tuples (idx, name, x, y, z_roof, z_target)."""
+        heights = HeightField()
+        for _, _, x, y, z_roof, _ in waypoints:
+            heights.add_roof(x, y, z_roof)
+        return cls(heights, clearance_m, unmapped_margin_m, **kwargs)
+
+    def to_dict(self):
+        return {"heights": self.heights.to_dict(), "clearance_m": self.clearance,
+                "unmapped_margin_m": self.unmapped_margin, "half_width_m": self.half_width, "ground_z": self.ground_z}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(HeightField.from_dict(d["heights"]), d["clearance_m"], d["unmapped_margin_m"], d["half_width_m"],
+                   d["ground_z"])
+
+    def leg_z(self, a, b):
+        """Lowest safe cruise z (NED) over the XY leg a -> b."""
+        c = self.heights.corridor(a, b, self.half_width)
+        top = self.ground_z if c.top_z is None else min(c.top_z, self.ground_z)
+        z = top - self.clearance - (self.unmapped_margin if c.unmapped > 0.0 else 0.0)
+        self.legs.append(LegAltitude(tuple(a[:2]), tuple(b[:2]), z, c.top_z, c.unmapped))
+        return z
+
+    def route_z(self, points):
+        """One cruise z for a polyline: the highest of its legs."""
+        return min(self.leg_z(p, q) for p, q in zip(points[:-1], points[1:]))
+
+    def fit_leg(self, start, target, decide):
+        """
+        (climb, target, decision) for a leg flown at target[2]: decide(start,
+        target) from the cruise altitude (climb = the vertical move up to it,
+        if the leg starts lower), re-decided once at the higher altitude a
+        detour's own corridor needs. Descending legs need no climb point: the
+        straight line down stays above the leg's altitude.
+        """
+        climb = []
+        if target[2] < start[2] - Z_TOL_M:
+            start = (start[0], start[1], target[2])
+            climb = [start]
+        decision = decide(start, target)
+        if decision.action == "fly" and decision.detour:
+            z = self.route_z([start] + list(decision.detour) + [target])
+            if z < target[2] - Z_TOL_M:
+                target = (target[0], target[1], z)
+                if climb or z < start[2] - Z_TOL_M:
+                    start = (start[0], start[1], z)
+                    climb = [start]
+                decision = decide(start, target)
+        return climb, target, decision
+
+    def route(self, waypoints, start_xy, reclimb=False):
+        """
+        The waypoint tuples in flight order from `start_xy`, z_target lowered
+        to each stop-to-stop leg's altitude (for preflight.check_route with
+        safe_z=math.inf; detours may still raise a leg in flight).
+
+        With reclimb=False no leg goes lower than a later leg has to climb
+        back from: the route climbs, in steps, to its highest leg and only
+        descends after it, so it never climbs more than one SAFE_Z climb.
+        reclimb=True keeps every leg at its own altitude (worth it when the
+        drone descends to each stop anyway).
+        """
+        zs, prev = [], start_xy
+        for w in waypoints:
+            zs.append(min(w[5], self.leg_z(prev, (w[2], w[3]))))
+            prev = (w[2], w[3])
+        if not reclimb and zs:
+            # highest (most negative) z up to each leg, and from it on; a leg flies at the lower of the two
+            before = np.minimum.accumulate(zs)
+            after = np.minimum.accumulate(zs[::-1])[::-1]
+            zs = np.maximum(before, after).tolist()
+        return [w[:5] + (z,) for w, z in zip(waypoints, zs)]
+
+    def report(self, safe_z=None):
+        zs = [leg.z for leg in self.legs]
+        return {"legs": len(zs), "z_min": min(zs, default=None), "z_max": max(zs, default=None),
+                "safe_z": safe_z, "mean_below_safe_z_m": (float(np.mean(zs)) - safe_z) if zs and safe_z is not None
+                else None, **self.heights.stats()}
+
+    def print_report(self, safe_z=None):
+        r = self.report(safe_z)
+        if not r["legs"]:
+            return
+        line = f"[altitude] {r['legs']} leg queries, cruise z {r['z_max']:.1f} .. {r['z_min']:.1f}"
+        if safe_z is not None:
+            line += f" (SAFE_Z {safe_z:.1f}, on average {r['mean_below_safe_z_m']:.1f} m lower)"
+        print(line)
+        print(f"[altitude] height field: {r['known']} known / {r['mapped']} mapped cells, "
+              f"corridor cache {r['cache_hits']} hits / {r['cache_misses']} misses")
\ No newline at end of file
@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+
+from altitude_planner import CELL_M, AltitudePlanner, HeightField
+
+CITIES = 20
+BUILDINGS = 300
+STOPS = 8
+AREA_M = 1000.0
+HEIGHT_M = (8.0, 60.0)      # building heights (top z = -height)
+HALF_SIZE_M = (6.0, 20.0)
+CLEARANCE_M = 19.0          # waypoint3: ROOF_CLEARANCE_M + EXTRA_CLEARANCE_M
+MARGIN_M = 30.0             # waypoint3: SAFE_Z_MARGIN_M
+SEED = 0
+
+
+def make_city(rng):
+    """Axis-aligned buildings (cx, cy, hx, hy, top_z)."""
+    return np.column_stack([rng.uniform(0, AREA_M, BUILDINGS), rng.uniform(0, AREA_M, BUILDINGS),
+                            rng.uniform(*HALF_SIZE_M, BUILDINGS), rng.uniform(*HALF_SIZE_M, BUILDINGS),
+                            -rng.uniform(*HEIGHT_M, BUILDINGS)])
+
+
+def scanned(city):
+    """Height field of every roof and the ground, as a complete LiDAR survey would leave it."""
+    heights = HeightField()
+    g = np.arange(-50.0, AREA_M + 50.0, CELL_M * 0.5)
+    gx, gy = np.meshgrid(g, g, indexing="ij")
+    heights.add_points(np.column_stack([gx.ravel(), gy.ravel(), np.zeros(gx.size)]))
+    for cx, cy, hx, hy, top in city:
+        bx, by = np.meshgrid(np.arange(cx - hx, cx + hx, CELL_M * 0.5), np.arange(cy - hy, cy + hy, CELL_M * 0.5),
+                             indexing="ij")
+        heights.add_points(np.column_stack([bx.ravel(), by.ravel(), np.full(bx.size, top)]))
+    return heights
+
+
+def climb_m(zs, stops=None):
+    """
+    Metres climbed from the ground through the leg altitudes zs (NED): held
+    at every stop (stops=None, as waypoint3 flies), or with a descent to each
+    stop's z_target in between (a delivery at roof - clearance).
+    """
+    ends = zs if stops is None else [max(z, s) for z, s in zip(zs, stops)]
+    return sum(max(0.0, a - b) for a, b in zip([0.0] + ends[:-1], zs))
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    totals = {k: [] for k in ("safe_z", "roofs", "roofs/leg", "scanned", "scanned/leg")}
+    delivery = {k: [] for k in totals}
+    hits = {k: 0 for k in totals}
+    lower = {k: [] for k in totals}
+    query_ms, cached_ms = [], []
+    for _ in range(CITIES):
+        city = make_city(rng)
+        truth = scanned(city)
+        picks = city[rng.choice(BUILDINGS, STOPS, replace=False)]
+        waypoints = [(i, f"B{i}", cx, cy, top, top - 14.0) for i, (cx, cy, _, _, top) in enumerate(picks)]
+        start = (AREA_M / 2, AREA_M / 2)
+        legs = list(zip([start] + [w[2:4] for w in waypoints[:-1]], [w[2:4] for w in waypoints]))
+        safe_z = min(w[4] for w in waypoints) - CLEARANCE_M - MARGIN_M
+
+        roofs = AltitudePlanner.from_waypoints(waypoints, CLEARANCE_M, MARGIN_M)
+        full = AltitudePlanner(truth, CLEARANCE_M, MARGIN_M)
+        zs = {"safe_z": [safe_z] * len(legs)}
+        for name, planner in (("roofs", roofs), ("scanned", full)):
+            t0 = time.perf_counter()
+            zs[name + "/leg"] = [w[5] for w in planner.route(waypoints, start, reclimb=True)]
+            query_ms.append((time.perf_counter() - t0) * 1e3 / len(legs))
+            t0 = time.perf_counter()
+            zs[name] = [w[5] for w in planner.route(waypoints, start)]
+            cached_ms.append((time.perf_counter() - t0) * 1e3 / len(legs))
+
+        # the straight line of each leg against the true roofs under it
+        tops = [truth.corridor(a, b, 0.0).top_z for a, b in legs]
+        for name, z in zs.items():
+            totals[name].append(climb_m(z))
+            delivery[name].append(climb_m(z, [w[5] for w in waypoints]))
+            hits[name] += sum(zz > top for zz, top in zip(z, tops))
+            lower[name] += [zz - safe_z for zz in z]
+
+    legs_n = CITIES * STOPS
+    print(f"{CITIES} cities x {BUILDINGS} buildings, {STOPS} stops each, clearance {CLEARANCE_M:g} m "
+          f"+ {MARGIN_M:g} m while unmapped")
+    print("*/leg: every leg at its own altitude (reclimb=True)")
+    print(f"{'altitudes':>11} {'lower m':>8} {'climb m':>8} {'vs SAFE_Z':>9} {'delivery climb m':>17} "
+          f"{'vs SAFE_Z':>9} {'legs into roofs':>16}")
+    base, base_d = float(np.mean(totals["safe_z"])), float(np.mean(delivery["safe_z"]))
+    for name in totals:
+        climb, climb_d = float(np.mean(totals[name])), float(np.mean(delivery[name]))
+        print(f"{name:>11} {float(np.mean(lower[name])):>8.1f} {climb:>8.0f} {100 * (climb / base - 1):>8.0f}% "
+              f"{climb_d:>17.0f} {100 * (climb_d / base_d - 1):>8.0f}% {hits[name]:>7}/{legs_n}")
+    print(f"corridor query: {np.mean(query_ms):.2f} ms per leg, {np.mean(cached_ms) * 1e3:.0f} us cached")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
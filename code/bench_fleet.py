@@ -0,0 +1,43 @@
+import time
+
+import numpy as np
+
+from fleet import ReservationTable, partition, simulate_fleet
+from zone_index import ZoneRegistry
+from bench_zone_index import random_zones
+from path_planner import DetourPlanner
+
+FLEET_SIZES = [1, 2, 4, 8, 16]
+N_STOPS = 200
+N_ZONES = 200
+AREA_M = 4_000.0
+SAFE_Z = -120.0
+HOME_SPACING_M = 25.0
+SEED = 0
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    stops = np.column_stack([rng.uniform(-AREA_M / 2, AREA_M / 2, size=(N_STOPS, 2)), np.full(N_STOPS, SAFE_Z)])
+    zones = ZoneRegistry([z for z in random_zones(N_ZONES * 25, rng) if abs(z.cx) < AREA_M and abs(z.cy) < AREA_M])
+    planner = DetourPlanner(zones)
+    homes = [(-AREA_M / 2 - 50.0, (i - 8) * HOME_SPACING_M, SAFE_Z) for i in range(max(FLEET_SIZES))]
+
+    print(f"{N_STOPS} stops, {len(zones)} zones")
+    print(f"{'drones':>7} {'per min':>8} {'makespan s':>11} {'wait s':>8} {'skipped':>8} {'plan ms':>8} {'sim ms':>8}")
+    for n in FLEET_SIZES:
+        t0 = time.perf_counter()
+        routes = partition(stops, homes[:n], zones, planner)
+        t_plan = time.perf_counter() - t0
+
+        table = ReservationTable()
+        t0 = time.perf_counter()
+        rep = simulate_fleet(homes[:n], stops, routes, zones=zones, planner=planner, table=table)
+        t_sim = time.perf_counter() - t0
+
+        print(f"{n:>7} {rep.per_min:>8.2f} {rep.makespan_s:>11.0f} {sum(r.wait_s for r in rep.vehicles):>8.0f} "
+              f"{sum(r.skipped for r in rep.vehicles):>8} {t_plan * 1e3:>8.0f} {t_sim * 1e3:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import math
+import time
+
+import cosysairsim as airsim
+import numpy as np
+
+from frames import GeoAnchor, euler_to_quat, ned_to_unreal, quat_to_euler, unreal_to_ned
+
+SIZES = [1_000, 100_000, 1_000_000]
+LOOP_N = 10_000          # per-point Python baselines are timed on this many and scaled
+ANCHOR = (44.4056, 8.9463, 20.0)
+AREA_M = 5000.0
+SEED = 0
+
+
+def timed(fn, *args, repeat=3):
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def per_point_geodetic(anchor, pts):
+    """One point at a time, the way a loop over a route calls it."""
+    return [anchor.ned_to_geodetic(p) for p in pts]
+
+
+def per_point_euler(quats):
+    return [airsim.quaternion_to_euler_angles(airsim.Quaternionr(x, y, z, w)) for w, x, y, z in quats]
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    anchor = GeoAnchor(*ANCHOR)
+    print(f"{'points':>9} {'unreal ms':>10} {'geodetic ms':>12} {'back ms':>8} {'round trip m':>13} "
+          f"{'euler ms':>9} {'Mpts/s':>7}")
+    for n in SIZES:
+        pts = np.column_stack([rng.uniform(-AREA_M, AREA_M, (n, 2)), rng.uniform(-300.0, 0.0, n)])
+        rpy = np.column_stack([rng.uniform(-math.pi, math.pi, n), rng.uniform(-1.5, 1.5, n),
+                               rng.uniform(-math.pi, math.pi, n)])
+        quats = euler_to_quat(rpy)
+
+        cm, t_unreal = timed(ned_to_unreal, pts)
+        assert np.allclose(unreal_to_ned(cm), pts)
+        lla, t_geo = timed(anchor.ned_to_geodetic, pts)
+        back, t_back = timed(anchor.geodetic_to_ned, lla)
+        _, t_euler = timed(quat_to_euler, quats)
+        err = float(np.abs(back - pts).max())
+        print(f"{n:>9} {t_unreal * 1e3:>10.2f} {t_geo * 1e3:>12.2f} {t_back * 1e3:>8.2f} {err:>13.1e} "
+              f"{t_euler * 1e3:>9.2f} {n / t_geo / 1e6:>7.1f}")
+
+    pts = pts[:LOOP_N]
+    _, t_loop = timed(per_point_geodetic, anchor, pts, repeat=1)
+    _, t_batch = timed(anchor.ned_to_geodetic, pts)
+    print(f"\nNED -> geodetic, {LOOP_N} points: per point {t_loop * 1e3:.0f} ms, batched {t_batch * 1e3:.2f} ms "
+          f"({t_loop / t_batch:.0f}x)")
+    quats = quats[:LOOP_N]
+    ref, t_loop = timed(per_point_euler, quats, repeat=1)
+    out, t_batch = timed(quat_to_euler, quats)
+    print(f"quaternion -> euler, {LOOP_N}: cosysairsim per point {t_loop * 1e3:.0f} ms, batched "
+          f"{t_batch * 1e3:.2f} ms ({t_loop / t_batch:.0f}x), max diff {np.abs(np.array(ref) - out).max():.1e} rad")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
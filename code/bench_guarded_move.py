@@ -0,0 +1,83 @@
+import asyncio
+import sys
+
+import numpy as np
+
+import guarded_move
+from aio_client import AsyncMultirotorClient
+from guarded_move import GuardedMove
+from headless_sim import HeadlessWorld, sim_time_modules
+
+SPEEDS = [8.0, 12.0, 16.0, 20.0]
+TIME_SCALE = 10.0
+CRUISE_Z = -20.0
+END_X = 200.0
+WALL_X = 120.0             # a wall across the path that no zone knows about
+WALL_HALF_M = 1.0
+CLEAR_AFTER_S = [None, 20.0]   # None: the wall stays (guard gives up), else it is removed after that
+
+SCENE = {
+    "vehicles": {"Drone1": [0.0, 0.0, 0.0]},
+    "boxes": [{"type": "box", "name": "Wall", "center_m": [WALL_X, 0.0, CRUISE_Z],
+               "extent_m": [WALL_HALF_M, 15.0, 15.0], "yaw_deg": 0.0}],
+    "ground_z_m": 0.0,
+    "lidars": {"LidarFront": {"vehicle": "Drone1", "range_m": guarded_move.LIDAR_RANGE_M, "channels": 16,
+                              "points_per_channel": 360, "vfov_deg": [-15.0, 15.0], "hfov_deg": [-90.0, 90.0],
+                              "noise_m": 0.02}},
+}
+
+
+async def clear_wall(world, after_s):
+    await asyncio.sleep(after_s)
+    world.set_boxes([])
+
+
+async def run_case(world, speed, clear_after_s):
+    aclient = AsyncMultirotorClient(world.client, vehicle_name="Drone1")
+    try:
+        await aclient.enableApiControl(True, vehicle_name="Drone1")
+        await aclient.armDisarm(True, vehicle_name="Drone1")
+        await aclient.takeoffAsync(vehicle_name="Drone1")
+        await aclient.moveToZAsync(CRUISE_Z, 5.0, vehicle_name="Drone1")
+
+        guard = GuardedMove(aclient, "Drone1", "LidarFront")
+        clearing = asyncio.ensure_future(clear_wall(world, clear_after_s)) if clear_after_s is not None else None
+        t0 = world.clock.now()
+        reason = await guard.fly([(END_X, 0.0, CRUISE_Z)], speed)
+        sim_s = world.clock.now() - t0
+        if clearing is not None:
+            clearing.cancel()
+            await asyncio.gather(clearing, return_exceptions=True)
+        return guard, reason, sim_s
+    finally:
+        aclient.close()
+
+
+def main():
+    this = sys.modules[__name__]
+    print(f"{'m/s':>5} {'wall':>6} {'cap':>5} {'brakes':>6} {'slows':>5} {'lat p50':>8} {'lat max':>8} "
+          f"{'gap m':>6} {'stop gap':>8} {'collided':>8} {'sim s':>6}  result")
+    for clear_after_s in CLEAR_AFTER_S:
+        for speed in SPEEDS:
+            world = HeadlessWorld(SCENE, time_scale=TIME_SCALE)
+            with sim_time_modules(world, [this]):
+                guard, reason, sim_s = asyncio.run(run_case(world, speed, clear_after_s))
+
+            r = guard.report()
+            brakes = [e for e in guard.events if e.kind == "brake"]
+            face = WALL_X - WALL_HALF_M
+            # headless cancels stop dead; a real drone still needs v^2 / 2a after the brake
+            gap = min((face - e.xyz[0] for e in brakes), default=np.nan)
+            stop_gap = min((face - e.xyz[0] - e.speed ** 2 / (2 * guard.decel) for e in brakes), default=np.nan)
+            collided = world.vehicles["Drone1"].collision is not None
+            result = reason or f"reached x={world.position(world.vehicles['Drone1'])[0]:.0f}"
+            wall = "stays" if clear_after_s is None else f"{clear_after_s:.0f}s"
+            lat50 = r["latency_p50_ms"] if r["latency_p50_ms"] is not None else np.nan
+            latmax = r["latency_max_ms"] if r["latency_max_ms"] is not None else np.nan
+            print(f"{speed:>5.0f} {wall:>6} {min(speed, r['safe_speed_mps']):>5.1f} {r['brakes']:>6} "
+                  f"{r['slowdowns']:>5} {lat50:>8.0f} {latmax:>8.0f} {gap:>6.1f} {stop_gap:>8.1f} "
+                  f"{str(collided):>8} {sim_s:>6.1f}  {result}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import math
+import time
+
+import numpy as np
+
+import obstacle_detect
+
+SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 3
+SEED = 0
+
+
+def legacy_blocked_ahead(pts, dist_thresh=8.0):
+    """The original per-point loop from lidar_blocked_test.py (without the RPC)."""
+    count_close_front = 0
+
+    for i in range(0, len(pts), 3):
+        x = pts[i]
+        y = pts[i+1]
+        z = pts[i+2]
+        d = math.sqrt(x*x + y*y + z*z)
+
+        if x > 1.0 and abs(y) < 2.0 and d < dist_thresh:
+            count_close_front += 1
+            if count_close_front > 30:
+                return True, count_close_front
+
+    return False, count_close_front
+
+
+def make_cloud(n, rng):
+    """
+    Clear-scene cloud: points 10..60 m away plus a handful of near returns,
+    so the legacy loop cannot exit early (its worst and most common case).
+    """
+    dirs = rng.normal(size=(n, 3)).astype(np.float32)
+    dirs /= np.linalg.norm(dirs, axis=1, keepdims=True)
+    r = rng.uniform(10.0, 60.0, size=(n, 1)).astype(np.float32)
+    pts = dirs * r
+    pts[:20] = (3.0, 0.5, 0.0)
+    return pts
+
+
+def best_of(fn, repeats=REPEATS):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+
+    print(f"{'points':>10} {'legacy ms':>11} {'list->np ms':>12} {'ndarray ms':>11} {'speedup':>8}")
+    for n in SIZES:
+        pts = make_cloud(n, rng)
+        flat_list = pts.reshape(-1).tolist()   # what msgpack hands back from getLidarData
+        flat_arr = pts.reshape(-1)
+
+        legacy = legacy_blocked_ahead(flat_list)
+        report = obstacle_detect.detect(obstacle_detect.as_points(flat_arr))
+        assert legacy == (report.blocked, report.count), (legacy, report)
+
+        t_legacy = best_of(lambda: legacy_blocked_ahead(flat_list))
+        t_list = best_of(lambda: obstacle_detect.detect(obstacle_detect.as_points(flat_list)))
+        t_arr = best_of(lambda: obstacle_detect.detect(obstacle_detect.as_points(flat_arr)))
+
+        print(f"{n:>10} {t_legacy * 1e3:>11.2f} {t_list * 1e3:>12.2f} {t_arr * 1e3:>11.2f} "
+              f"{t_legacy / t_arr:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+import math
+import time
+
+import numpy as np
+
+from forbidden_zone import OrientedBoxZone
+from path_planner import DetourPlanner
+from speed_profile import TRACKING_LAG_S, V_MIN_MPS, SpeedPlanner, segment_clearance
+from zone_index import ZoneRegistry
+
+ZONE_COUNTS = [0, 20, 200]
+ROUTES = 50
+AREA_M = 1000.0
+CRUISE_Z = -60.0
+FIXED_MPS = 8.0
+CEILING_MPS = 15.0
+SEED = 0
+
+
+def make_zones(n, rng):
+    return ZoneRegistry([
+        OrientedBoxZone(float(x), float(y), CRUISE_Z, float(ex), float(ey), 40.0, float(yaw), f"Z{i}")
+        for i, (x, y, ex, ey, yaw) in enumerate(zip(
+            rng.uniform(0, AREA_M, n), rng.uniform(0, AREA_M, n), rng.uniform(5, 30, n), rng.uniform(5, 30, n),
+            rng.uniform(-math.pi, math.pi, n)))
+    ])
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    print(f"{'zones':>6} {'routes':>6} {'fixed s':>9} {'profile s':>10} {'saved':>6} {'moves':>6} "
+          f"{'plan ms':>8} {'margin ok':>9} {'fixed too fast':>14}")
+    for n in ZONE_COUNTS:
+        zones = make_zones(n, rng)
+        detours = DetourPlanner(zones)
+        sp = SpeedPlanner(zones)
+        fixed = profiled = plan_s = 0.0
+        moves = routes = segs = too_fast = 0
+        margin_ok = True
+        while routes < ROUTES:
+            a = (*rng.uniform(0, AREA_M, 2), CRUISE_Z)
+            b = (*rng.uniform(0, AREA_M, 2), CRUISE_Z)
+            if zones.point_blocked(*a) or zones.point_blocked(*b):
+                continue
+            route = detours.plan(a, b)
+            if route is None:
+                continue
+            routes += 1
+            t0 = time.perf_counter()
+            prof = sp.plan(route, CEILING_MPS)
+            plan_s += time.perf_counter() - t0
+            profiled += prof.est_s
+            moves += len(prof.runs)
+            fixed += sp.estimate(route, [FIXED_MPS] * (len(route) - 1), [c[0] for c in sp.corner_limits(
+                route, sp.segment_limits(route, FIXED_MPS))])
+            # segments where the fixed speed's cross-track error would reach a zone
+            for p, q in zip(route[:-1], route[1:]):
+                segs += 1
+                too_fast += FIXED_MPS * TRACKING_LAG_S > segment_clearance(zones, p, q)
+            # every run's speed keeps the cross-track error inside each segment's zone clearance
+            for run in prof.runs:
+                for p, q in zip(run.points[:-1], run.points[1:]):
+                    if run.speed * TRACKING_LAG_S > max(segment_clearance(zones, p, q), V_MIN_MPS * TRACKING_LAG_S):
+                        margin_ok = False
+        print(f"{n:>6} {routes:>6} {fixed:>9.0f} {profiled:>10.0f} {100 * (1 - profiled / fixed):>5.0f}% "
+              f"{moves / routes:>6.1f} {plan_s / routes * 1e3:>8.2f} {str(margin_ok):>9} "
+              f"{100 * too_fast / segs:>13.0f}%")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
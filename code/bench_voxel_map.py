@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+
+from voxel_map import VoxelMap
+
+POINTS = [10_000, 100_000]
+SCANS = 60
+SPEED_M_PER_SCAN = 0.8   # 8 m/s at 10 Hz
+RANGE_M = 50.0
+SEED = 0
+
+# a street: ground at z=0, two facades along x, one block ahead (NED, z down)
+GROUND_Z = 0.0
+FACADE_Y = (-12.0, 12.0)
+BLOCK_X = 60.0
+
+
+def make_scan(n, origin, rng):
+    """(N,3) sensor-frame points (no rotation) of the street seen from `origin`."""
+    k = n // 4
+    ground = np.column_stack([rng.uniform(-RANGE_M, RANGE_M, n - 3 * k) + origin[0],
+                              rng.uniform(FACADE_Y[0], FACADE_Y[1], n - 3 * k), np.full(n - 3 * k, GROUND_Z)])
+    left = np.column_stack([rng.uniform(-RANGE_M, RANGE_M, k) + origin[0], np.full(k, FACADE_Y[0]),
+                            rng.uniform(-30.0, 0.0, k)])
+    right = np.column_stack([rng.uniform(-RANGE_M, RANGE_M, k) + origin[0], np.full(k, FACADE_Y[1]),
+                             rng.uniform(-30.0, 0.0, k)])
+    block = np.column_stack([np.full(k, BLOCK_X), rng.uniform(-10.0, 10.0, k), rng.uniform(-30.0, 0.0, k)])
+    pts = np.concatenate([ground, left, right, block])
+    pts += rng.normal(0.0, 0.03, size=pts.shape)
+    return (pts - origin).astype(np.float32)
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    print(f"{'points':>8} {'scans':>6} {'p50 ms':>8} {'p95 ms':>8} {'Hz':>7} {'voxels':>8} {'MB':>6} "
+          f"{'corridor ms':>12} {'ray ms':>7} {'blocked':>8}")
+    for n in POINTS:
+        vmap = VoxelMap()
+        times = []
+        origin = np.array([0.0, 0.0, -10.0])
+        for _ in range(SCANS):
+            sensor = make_scan(n, origin, rng)
+            t0 = time.perf_counter()
+            vmap.integrate(sensor.astype(np.float64) + origin, origin)
+            times.append(time.perf_counter() - t0)
+            origin = origin + (SPEED_M_PER_SCAN, 0.0, 0.0)
+
+        goal = (BLOCK_X + 5.0, 0.0, -10.0)
+        t0 = time.perf_counter()
+        report = vmap.corridor_blocked(origin, goal, half_width_m=2.0)
+        t_corridor = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        vmap.ray_hit(origin, goal)
+        t_ray = time.perf_counter() - t0
+
+        ms = np.array(times) * 1e3
+        s = vmap.stats()
+        print(f"{n:>8} {SCANS:>6} {np.percentile(ms, 50):>8.1f} {np.percentile(ms, 95):>8.1f} "
+              f"{1e3 / np.mean(ms):>7.1f} {s['voxels']:>8} {s['bytes'] / 1e6:>6.1f} "
+              f"{t_corridor * 1e3:>12.2f} {t_ray * 1e3:>7.2f} {str(report.blocked):>8}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,72 @@
+import math
+import time
+
+import numpy as np
+
+from forbidden_zone import OrientedBoxZone
+from zone_index import ZoneRegistry
+
+ZONE_COUNTS = [1, 10, 100, 1_000, 10_000, 100_000]
+N_QUERIES = 1_000
+N_LINEAR_QUERIES = 20      # the linear scan gets slow, time fewer queries and scale per query
+EXTENT_M = 20_000.0        # roughly the Cesium Genova tile set, centered on the origin
+LEG_M = 400.0
+Z_BAND = (-600.0, 0.0)
+SEED = 0
+
+
+def random_zones(n, rng):
+    cx, cy = rng.uniform(-EXTENT_M / 2, EXTENT_M / 2, size=(2, n))
+    cz = rng.uniform(*Z_BAND, size=n)
+    ex, ey = rng.uniform(5.0, 60.0, size=(2, n))
+    ez = rng.uniform(10.0, 80.0, size=n)
+    yaw = rng.uniform(-math.pi, math.pi, size=n)
+    return [OrientedBoxZone(*v) for v in zip(cx, cy, cz, ex, ey, ez, yaw)]
+
+
+def random_legs(n, rng):
+    a = np.column_stack([rng.uniform(-EXTENT_M / 2, EXTENT_M / 2, size=(n, 2)), rng.uniform(*Z_BAND, size=n)])
+    ang = rng.uniform(-math.pi, math.pi, size=n)
+    b = a.copy()
+    b[:, 0] += LEG_M * np.cos(ang)
+    b[:, 1] += LEG_M * np.sin(ang)
+    return a.tolist(), b.tolist()
+
+
+def linear_leg_blocked(zones, a, b):
+    """What a per-zone loop with segment_crosses_forbidden_xy would do."""
+    return any(z.leg_blocked(*a, *b) for z in zones)
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    starts, ends = random_legs(N_QUERIES, rng)
+
+    print(f"{'zones':>8} {'build ms':>9} {'point us':>9} {'leg us':>9} {'linear leg us':>14} {'speedup':>8}")
+    for n in ZONE_COUNTS:
+        zones = random_zones(n, rng)
+
+        t0 = time.perf_counter()
+        reg = ZoneRegistry(zones)
+        t_build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for a in starts:
+            reg.point_blocked(a[0], a[1], a[2])
+        t_point = (time.perf_counter() - t0) / N_QUERIES
+
+        t0 = time.perf_counter()
+        indexed = [reg.leg_blocked(*a, *b) for a, b in zip(starts, ends)]
+        t_leg = (time.perf_counter() - t0) / N_QUERIES
+
+        t0 = time.perf_counter()
+        linear = [linear_leg_blocked(zones, a, b) for a, b in zip(starts[:N_LINEAR_QUERIES], ends[:N_LINEAR_QUERIES])]
+        t_linear = (time.perf_counter() - t0) / N_LINEAR_QUERIES
+
+        assert linear == indexed[:N_LINEAR_QUERIES]
+        print(f"{n:>8} {t_build * 1e3:>9.1f} {t_point * 1e6:>9.1f} {t_leg * 1e6:>9.1f} "
+              f"{t_linear * 1e6:>14.1f} {t_linear / t_leg:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
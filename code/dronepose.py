@@ -1,6 +1,8 @@
 import math
 import cosysairsim as airsim
 
+from frames import GeoAnchor, as_wxyz, as_xyz, ned_to_unreal, quat_to_euler
+
 client = airsim.MultirotorClient(ip="127.0.0.1")
 client.confirmConnection()
 
@@ -46,7 +48,7 @@ try:
     print(f"Z (Down):  {p_pose.z_val}")
 
     # Orientation -> roll/pitch/yaw
-    roll, pitch, yaw = airsim.to_eularian_angles(pose.orientation)
+    roll, pitch, yaw = quat_to_euler(as_wxyz(pose.orientation))
 
     print("\n=== Orientation (degrees) ===")
     print(f"Roll:  {math.degrees(roll)}")
@@ -68,17 +70,23 @@ try:
     print(f"Latitude:  {gp.latitude}")
     print(f"Longitude: {gp.longitude}")
     print(f"Altitude:  {gp.altitude}")
+
+    # the same point from the NED position and the home geo point (the NED origin)
+    anchor = GeoAnchor.from_geo_point(client.getHomeGeoPoint(vehicle_name=vehicle_name))
+    lat, lon, alt = anchor.ned_to_geodetic(as_xyz(p_est))
+    print(f"From NED:  {lat:.8f}, {lon:.8f}, alt={alt:.2f}")
 except Exception as e:
     print("\n(getGpsData not available or GPS not enabled)")
     print("Error:", e)
 
 # -----------------------------
 # 5) Unreal-unit conversion hint
-# NED meters -> centimeters (Unreal units)
+# NED meters -> centimeters (Unreal units, Z up), relative to the PlayerStart
 # -----------------------------
-print("\n=== NED meters -> Unreal centimeters (just unit conversion) ===")
-print(f"X_cm: {p_est.x_val * 100.0}")
-print(f"Y_cm: {p_est.y_val * 100.0}")
-print(f"Z_cm: {p_est.z_val * 100.0}")
+x_cm, y_cm, z_cm = ned_to_unreal(as_xyz(p_est))
+print("\n=== NED meters -> Unreal centimeters (relative to the PlayerStart) ===")
+print(f"X_cm: {x_cm}")
+print(f"Y_cm: {y_cm}")
+print(f"Z_cm: {z_cm}")
 
 print("\nDone.")
\ No newline at end of file
@@ -1,29 +1,7 @@
 import math
 import cosysairsim as airsim
 
-def quat_to_euler(q):
-    # q: airsim.Quaternionr with (w_val, x_val, y_val, z_val)
-    w, x, y, z = q.w_val, q.x_val, q.y_val, q.z_val
-
-    # roll (x-axis rotation)
-    sinr_cosp = 2.0 * (w * x + y * z)
-    cosr_cosp = 1.0 - 2.0 * (x * x + y * y)
-    roll = math.atan2(sinr_cosp, cosr_cosp)
-
-    # pitch (y-axis rotation)
-    sinp = 2.0 * (w * y - z * x)
-    if abs(sinp) >= 1:
-        pitch = math.copysign(math.pi / 2, sinp)
-    else:
-        pitch = math.asin(sinp)
-
-    # yaw (z-axis rotation)
-    siny_cosp = 2.0 * (w * z + x * y)
-    cosy_cosp = 1.0 - 2.0 * (y * y + z * z)
-    yaw = math.atan2(siny_cosp, cosy_cosp)
-
-    return roll, pitch, yaw
-
+from frames import GeoAnchor, as_wxyz, as_xyz, ned_to_unreal, quat_to_euler
 
 client = airsim.MultirotorClient(ip="127.0.0.1")
 client.confirmConnection()
@@ -58,7 +36,7 @@ print(f"X (North): {p_pose.x_val}")
 print(f"Y (East):  {p_pose.y_val}")
 print(f"Z (Down):  {p_pose.z_val}")
 
-roll, pitch, yaw = quat_to_euler(pose.orientation)
+roll, pitch, yaw = quat_to_euler(as_wxyz(pose.orientation))
 
 print("\n=== Orientation (degrees) ===")
 print(f"Roll:  {math.degrees(roll):.3f}")
@@ -74,8 +52,16 @@ print(f"Latitude:  {gp.latitude}")
 print(f"Longitude: {gp.longitude}")
 print(f"Altitude:  {gp.altitude}")
 
+# 5) the same position converted from NED (frames.py): home geo point = NED origin
+anchor = GeoAnchor.from_geo_point(client.getHomeGeoPoint(vehicle_name=vehicle_name))
+ned = as_xyz(p_est)
+lat, lon, alt = anchor.ned_to_geodetic(ned)
+x_cm, y_cm, z_cm = ned_to_unreal(ned)
+
 print("\n=== Summary ===")
-print(f"NED (m):   {p_est.x_val:.2f}, {p_est.y_val:.2f}, {p_est.z_val:.2f}")
+print(f"NED (m):   {ned[0]:.2f}, {ned[1]:.2f}, {ned[2]:.2f}")
+print(f"Unreal:    {x_cm:.1f}, {y_cm:.1f}, {z_cm:.1f} cm from the PlayerStart")
 print(f"GPS:       {gp.latitude:.8f}, {gp.longitude:.8f}, alt={gp.altitude:.2f}")
+print(f"From NED:  {lat:.8f}, {lon:.8f}, alt={alt:.2f}")
 
 print("\nDone.")
\ No newline at end of file
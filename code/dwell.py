@@ -0,0 +1,62 @@
+import math
+import time
+from collections import namedtuple
+
+DWELL_DRIFT_M = 1.0         # re-command the hold when the drone drifts farther than this
+DWELL_POLL_S = 0.1          # how often the stream / condition is looked at (no RPC when streamed)
+DWELL_RECOVER_SPEED_MPS = 2.0
+STATE_MAX_AGE_S = 0.5
+
+# reason = "timer" | "condition"; recommands = extra hold commands sent after the first hoverAsync
+DwellResult = namedtuple("DwellResult", ["waited_s", "reason", "recommands", "max_drift_m"])
+
+
+def _stream_position(stream, max_age_s):
+    state = stream.latest_value("state", max_age_s=max_age_s) if stream is not None else None
+    if state is None:
+        return None
+    p = state.kinematics_estimated.position
+    return p.x_val, p.y_val, p.z_val
+
+
+def dwell(client, seconds, vehicle_name, stream=None, until=None, drift_m=DWELL_DRIFT_M,
+          poll_s=DWELL_POLL_S, recover_speed=DWELL_RECOVER_SPEED_MPS):
+    """
+    Hold position for `seconds` (or until `until()` returns True) with ONE hoverAsync.
+
+    With a SensorStream carrying "state", the position is watched from the stream
+    (no RPCs) and the drone is sent back to the hold point only if it drifts more
+    than `drift_m`. Without a stream the wait is a plain timer.
+    """
+    client.hoverAsync(vehicle_name=vehicle_name).join()
+
+    t0 = time.monotonic()
+    end_t = t0 + seconds
+    anchor = _stream_position(stream, STATE_MAX_AGE_S)
+    recommands = 0
+    max_drift = 0.0
+    reason = "timer"
+
+    while True:
+        now = time.monotonic()
+        if until is not None and until():
+            reason = "condition"
+            break
+        if now >= end_t:
+            break
+
+        if anchor is not None:
+            pos = _stream_position(stream, STATE_MAX_AGE_S)
+            if pos is not None:
+                drift = math.dist(pos, anchor)
+                max_drift = max(max_drift, drift)
+                if drift > drift_m:
+                    client.moveToPositionAsync(*anchor, recover_speed, vehicle_name=vehicle_name).join()
+                    client.hoverAsync(vehicle_name=vehicle_name).join()
+                    recommands += 1
+
+        # nothing to watch: sleep straight to the deadline
+        step = poll_s if (anchor is not None or until is not None) else end_t - now
+        time.sleep(max(0.0, min(step, end_t - time.monotonic())))
+
+    return DwellResult(time.monotonic() - t0, reason, recommands, max_drift)
\ No newline at end of file
@@ -0,0 +1,456 @@
+import asyncio
+import heapq
+import math
+import time
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from aio_client import AsyncMultirotorClient
+from dwell import dwell
+from mission_schema import load_mission
+from path_executor import MAX_ACCEL_MPS2, PathExecutor
+from path_planner import path_length
+from pose_resolver import resolve_positions
+from route_order import distance_matrix, order_route
+
+DEFAULT_MISSION = "missions/waypoint3.json"   # level, zones, clearances; its deliver waypoints are the stops
+REFRESH_POSE_CACHE = False
+
+# vehicle name -> spawn X, Y, Z in meters (NED) as in settings.json "Vehicles"; each vehicle's
+# API frame starts at its spawn. Keep spawns at least 3 reservation cells apart.
+FLEET = {
+    "Drone1": (0.0, 0.0, 0.0),
+    "Drone2": (0.0, 20.0, 0.0),
+    "Drone3": (0.0, 40.0, 0.0),
+}
+
+SPEED_MPS = 8.0
+DELIVERY_HOLD_S = 2.0
+ORDER_TIME_BUDGET_S = 0.2      # per vehicle
+
+RESERVE_CELL_M = 5.0           # a drone takes its cell and the 26 around it
+RESERVE_SLOT_S = 1.0
+RESERVE_PAD_SLOTS = 2          # timing slack before / after each planned pass
+MAX_DEPARTURE_DELAY_S = 300.0  # give up the rest of a vehicle's route after waiting this long for one leg
+KMEANS_ITERS = 50
+SEED = 0
+
+VehicleResult = namedtuple("VehicleResult", ["vehicle", "deliveries", "skipped", "flight_s", "wait_s", "done_s"])
+FleetReport = namedtuple("FleetReport", ["vehicles", "deliveries", "makespan_s", "per_min"])
+
+
+def kmeans(xy, k, iters=KMEANS_ITERS, seed=SEED):
+    """Labels (N,) of k-means on (N,2) points, k-means++ seeding, no empty cluster."""
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    n = len(xy)
+    k = min(k, n)
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+
+    centers = [xy[rng.integers(n)]]
+    for _ in range(1, k):
+        d2 = ((xy[:, None, :] - np.array(centers)[None, :, :]) ** 2).sum(-1).min(axis=1)
+        centers.append(xy[rng.choice(n, p=d2 / d2.sum())] if d2.sum() > 0 else xy[rng.integers(n)])
+    centers = np.array(centers)
+
+    labels = None
+    for _ in range(iters):
+        d2 = ((xy[:, None, :] - centers[None, :, :]) ** 2).sum(-1)
+        new = d2.argmin(axis=1)
+        for c in range(k):
+            if not (new == c).any():
+                # an empty cluster takes the point farthest from its own center
+                new[int(d2[np.arange(n), new].argmax())] = c
+        if labels is not None and (new == labels).all():
+            break
+        labels = new
+        centers = np.array([xy[labels == c].mean(axis=0) for c in range(k)])
+    return labels
+
+
+def partition(stops, starts, zones=None, planner=None, time_budget_s=ORDER_TIME_BUDGET_S):
+    """
+    Split (N,3) stops between vehicles at `starts` (M,3): k-means in XY, each
+    cluster to the nearest free vehicle, then each vehicle's stops ordered with
+    route_order. Returns one list of stop indices per vehicle.
+    """
+    stops = np.asarray(stops, dtype=np.float64).reshape(-1, 3)
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    labels = kmeans(stops[:, :2], len(starts))
+    k = int(labels.max()) + 1 if len(labels) else 0
+
+    # greedy cluster -> vehicle matching, closest pairs first
+    centers = np.array([stops[labels == c, :2].mean(axis=0) for c in range(k)]).reshape(-1, 2)
+    cost = np.linalg.norm(centers[:, None, :] - starts[None, :, :2], axis=-1)
+    owner = {}
+    used = set()
+    for flat in np.argsort(cost, axis=None):
+        c, v = np.unravel_index(flat, cost.shape)
+        if c not in owner and v not in used:
+            owner[c] = v
+            used.add(v)
+
+    routes = [[] for _ in range(len(starts))]
+    for c, v in owner.items():
+        idx = np.flatnonzero(labels == c)
+        pts = [starts[v]] + [stops[i] for i in idx]
+        order = order_route(distance_matrix(pts, zones, planner), 0, None, time_budget_s)
+        routes[v] = [int(idx[i - 1]) for i in order[1:]]
+    return routes
+
+
+def leg_path(a, b, zones=None, planner=None):
+    """[a, b], or the planner's detour when the straight leg is blocked; None if unreachable."""
+    a, b = tuple(map(float, a)), tuple(map(float, b))
+    if zones is not None and zones.leg_blocked(*a, *b):
+        return planner.plan(a, b) if planner is not None else None
+    return [a, b]
+
+
+class ReservationTable:
+    """
+    Space-time reservations on a grid of cell_m cubes and slot_s time slots.
+
+    A leg reserves every cell it sweeps (and the 26 around it) during the slots
+    it is expected to pass there, +/- pad_slots. At the end of a leg the drone
+    "parks": its cells stay taken for all later slots until it reserves its next
+    leg or is released. reserve() delays the departure slot by slot until the
+    leg and its park are free, so two drones never hold the same cell at once.
+    """
+
+    def __init__(self, cell_m=RESERVE_CELL_M, slot_s=RESERVE_SLOT_S, pad_slots=RESERVE_PAD_SLOTS,
+                 accel_mps2=MAX_ACCEL_MPS2):
+        self.cell = cell_m
+        self.slot = slot_s
+        self.pad = pad_slots
+        self.accel = accel_mps2
+        self._slots = defaultdict(dict)   # cell -> {slot: vehicle}
+        self._parked = {}                 # cell -> (vehicle, from_slot)
+        self._park_of = {}                # vehicle -> (cells, from_slot)
+
+    def _around(self, p):
+        i, j, k = (math.floor(v / self.cell) for v in p)
+        return [(i + a, j + b, k + c) for a in (-1, 0, 1) for b in (-1, 0, 1) for c in (-1, 0, 1)]
+
+    def leg_time(self, path, speed):
+        """Constant-speed time plus the speed-up / slow-down lag of a trapezoid profile."""
+        return path_length(path) / speed + speed / self.accel
+
+    def _sweep(self, path, t0, speed):
+        """{cell: (first_slot, last_slot)} for `path` flown from t0."""
+        out = {}
+        step = self.cell / 2.0
+        lag = speed / (2.0 * self.accel)
+        run = 0.0
+        for a, b in zip(path[:-1], path[1:]):
+            seg = math.dist(a, b)
+            n = max(1, math.ceil(seg / step))
+            for m in range(n + 1):
+                f = m / n
+                p = tuple(u + (w - u) * f for u, w in zip(a, b))
+                t = t0 + (lag if run + f * seg > 0 else 0.0) + (run + f * seg) / speed
+                s = math.floor(t / self.slot)
+                for c in self._around(p):
+                    lo, hi = out.get(c, (s, s))
+                    out[c] = (min(lo, s), max(hi, s))
+            run += seg
+        return out
+
+    def _conflict(self, vehicle, sweep, m, end_cells, arrive_slot):
+        """None if free with the departure shifted by m slots, else "slot" or "park"."""
+        pad = self.pad
+        for c, (lo, hi) in sweep.items():
+            p = self._parked.get(c)
+            if p is not None and p[0] != vehicle and hi + m + pad >= p[1]:
+                return "park"
+            slots = self._slots.get(c)
+            if slots:
+                lo_m, hi_m = lo + m - pad, hi + m + pad
+                for s, v in slots.items():
+                    if v != vehicle and lo_m <= s <= hi_m:
+                        return "slot"
+        for c in end_cells:
+            p = self._parked.get(c)
+            if p is not None and p[0] != vehicle:
+                return "park"
+            slots = self._slots.get(c)
+            if slots and any(v != vehicle and s >= arrive_slot - pad for s, v in slots.items()):
+                return "slot"
+        return None
+
+    def park(self, vehicle, p, t):
+        """Hold the cells around p from time t on (start of the mission)."""
+        self.release(vehicle)
+        cells = self._around(p)
+        from_slot = math.floor(t / self.slot)
+        for c in cells:
+            self._parked[c] = (vehicle, from_slot)
+        self._park_of[vehicle] = (cells, from_slot)
+
+    def release(self, vehicle):
+        """Drop the vehicle's park (landed, or leaving the airspace)."""
+        own = self._park_of.pop(vehicle, None)
+        if own is None:
+            return
+        for c in own[0]:
+            if self._parked.get(c, (None,))[0] == vehicle:
+                del self._parked[c]
+
+    def reserve(self, vehicle, path, t_ready, speed, max_delay_s=MAX_DEPARTURE_DELAY_S):
+        """
+        Reserve `path` for the earliest departure >= t_ready (whole slots) and
+        park at its end; returns the departure time. None if another drone is
+        parked in the way or no slot is free within max_delay_s: retry later.
+        """
+        path = [tuple(map(float, p)) for p in path]
+        sweep = self._sweep(path, t_ready, speed)
+        end_cells = self._around(path[-1])
+        arrive_slot = math.floor((t_ready + self.leg_time(path, speed)) / self.slot)
+
+        for m in range(int(max_delay_s / self.slot) + 1):
+            hit = self._conflict(vehicle, sweep, m, end_cells, arrive_slot + m)
+            if hit == "park":
+                return None
+            if hit is None:
+                break
+        else:
+            return None
+
+        base = math.floor(t_ready / self.slot)
+        own = self._park_of.get(vehicle)
+        if own is not None:
+            # the wait at the old stop becomes an ordinary timed reservation
+            cells, from_slot = own
+            self.release(vehicle)
+            for c in cells:
+                for s in range(max(from_slot, base), base + m + self.pad + 1):
+                    self._slots[c][s] = vehicle
+        for c, (lo, hi) in sweep.items():
+            for s in range(lo + m - self.pad, hi + m + self.pad + 1):
+                self._slots[c][s] = vehicle
+        for c in end_cells:
+            self._parked[c] = (vehicle, arrive_slot + m)
+        self._park_of[vehicle] = (end_cells, arrive_slot + m)
+        return t_ready + m * self.slot
+
+    def release_before(self, t):
+        """Forget slots that ended before t (keeps the table small on long missions)."""
+        s0 = math.floor(t / self.slot) - self.pad
+        for c in list(self._slots):
+            slots = self._slots[c]
+            for s in [s for s in slots if s < s0]:
+                del slots[s]
+            if not slots:
+                del self._slots[c]
+
+    def stats(self):
+        return {
+            "cells": len(self._slots),
+            "slots": sum(len(v) for v in self._slots.values()),
+            "parked_cells": len(self._parked),
+        }
+
+
+def _vehicle_plan(stops, routes, homes):
+    """Per vehicle: [(xyz, is_delivery), ...] ending with the way back home."""
+    return [[(tuple(stops[i]), True) for i in r] + [(tuple(h), False)] for r, h in zip(routes, homes)]
+
+
+def simulate_fleet(homes, stops, routes, speed=SPEED_MPS, hold_s=DELIVERY_HOLD_S, zones=None, planner=None,
+                   table=None):
+    """
+    Kinematic timeline of the fleet (no simulator). Every leg goes through the
+    same ReservationTable rules as fly_fleet, so waits caused by deconfliction
+    are included. Returns a FleetReport.
+    """
+    table = ReservationTable() if table is None else table
+    plans = _vehicle_plan(np.asarray(stops, dtype=np.float64).reshape(-1, 3), routes, homes)
+    n = len(plans)
+    pos = [tuple(map(float, h)) for h in homes]
+    done = [0] * n
+    skipped = [0] * n
+    flight = [0.0] * n
+    wait = [0.0] * n
+    last = [0.0] * n
+    blocked_since = [None] * n
+
+    for v in range(n):
+        table.park(v, pos[v], 0.0)
+    heap = [(0.0, v, 0) for v in range(n)]
+    while heap:
+        t, v, k = heapq.heappop(heap)
+        if k == len(plans[v]):
+            table.release(v)
+            continue
+        target, delivery = plans[v][k]
+        path = leg_path(pos[v], target, zones, planner)
+        if path is None:
+            skipped[v] += delivery
+            heapq.heappush(heap, (t, v, k + 1))
+            continue
+
+        dep = table.reserve(v, path, t, speed)
+        if dep is None:
+            blocked_since[v] = t if blocked_since[v] is None else blocked_since[v]
+            if t - blocked_since[v] > MAX_DEPARTURE_DELAY_S:
+                skipped[v] += sum(d for _, d in plans[v][k:])
+                table.release(v)
+                continue
+            wait[v] += table.slot
+            heapq.heappush(heap, (t + table.slot, v, k))
+            continue
+
+        blocked_since[v] = None
+        arrive = dep + table.leg_time(path, speed)
+        wait[v] += dep - t
+        flight[v] += arrive - dep
+        pos[v] = target
+        if delivery:
+            done[v] += 1
+            last[v] = arrive + hold_s
+        heapq.heappush(heap, (arrive + (hold_s if delivery else 0.0), v, k + 1))
+
+    vehicles = [VehicleResult(v, done[v], skipped[v], flight[v], wait[v], last[v]) for v in range(n)]
+    return _report(vehicles)
+
+
+def _report(vehicles):
+    deliveries = sum(r.deliveries for r in vehicles)
+    makespan = max((r.done_s for r in vehicles), default=0.0)
+    return FleetReport(vehicles, deliveries, makespan, 60.0 * deliveries / makespan if makespan > 0 else 0.0)
+
+
+def print_report(report, label="fleet"):
+    print(f"[{label}] {len(report.vehicles)} vehicle(s): {report.deliveries} deliveries in "
+          f"{report.makespan_s:.0f}s -> {report.per_min:.2f} deliveries/min")
+    for r in report.vehicles:
+        print(f"  {r.vehicle}: {r.deliveries} delivered, {r.skipped} skipped, "
+              f"flying {r.flight_s:.0f}s, waiting {r.wait_s:.0f}s")
+
+
+def scaling_table(homes, stops, sizes, speed=SPEED_MPS, hold_s=DELIVERY_HOLD_S, zones=None, planner=None):
+    """Estimated deliveries/min for each fleet size (the first n homes are used)."""
+    rows = []
+    print(f"{'drones':>7} {'deliveries':>11} {'makespan s':>11} {'per min':>8} {'wait s':>8}")
+    for n in sizes:
+        routes = partition(stops, homes[:n], zones, planner)
+        rep = simulate_fleet(homes[:n], stops, routes, speed, hold_s, zones, planner)
+        rows.append((n, rep))
+        print(f"{n:>7} {rep.deliveries:>11} {rep.makespan_s:>11.0f} {rep.per_min:>8.2f} "
+              f"{sum(r.wait_s for r in rep.vehicles):>8.0f}")
+    return rows
+
+
+async def _prepare(aclient, vehicle, spawn, safe_z):
+    await aclient.confirmConnection()
+    await aclient.enableApiControl(True, vehicle_name=vehicle)
+    await aclient.armDisarm(True, vehicle_name=vehicle)
+    await aclient.takeoffAsync(vehicle_name=vehicle)
+    await aclient.moveToZAsync(safe_z - spawn[2], SPEED_MPS, vehicle_name=vehicle)
+
+
+async def _fly_vehicle(aclient, vehicle, spawn, home, plan, table, t0, speed, hold_s, zones=None, planner=None):
+    # routes, zones and reservations stay in the world frame; only the path sent to AirSim is spawn-local
+    executor = PathExecutor(aclient.motion_client, vehicle, speed, zones=zones, origin=spawn)
+    pos = tuple(home)
+    done = skipped = 0
+    flight = wait = last = 0.0
+
+    for k, (target, delivery) in enumerate(plan):
+        path = leg_path(pos, target, zones, planner)
+        if path is None:
+            print(f"[{vehicle}] no route to {target}, skipping")
+            skipped += delivery
+            continue
+
+        t_ready = time.monotonic() - t0
+        while True:
+            now = time.monotonic() - t0
+            dep = table.reserve(vehicle, path, now, speed)
+            if dep is not None:
+                break
+            if now - t_ready > MAX_DEPARTURE_DELAY_S:
+                break
+            await asyncio.sleep(table.slot)
+        if dep is None:
+            print(f"[{vehicle}] airspace blocked for {MAX_DEPARTURE_DELAY_S:.0f}s, giving up the rest of the route")
+            skipped += sum(d for _, d in plan[k:])
+            break
+        table.release_before(now)
+
+        await asyncio.sleep(max(0.0, dep - (time.monotonic() - t0)))
+        wait += dep - t_ready
+        planned = dep + table.leg_time(path, speed)
+        start = time.monotonic() - t0
+        await aclient.motion(lambda client: executor.fly(path[0], path[1:]))
+        arrived = time.monotonic() - t0
+        flight += arrived - start
+        if arrived - planned > table.pad * table.slot:
+            print(f"[{vehicle}] arrived {arrived - planned:.1f}s behind its reservation")
+        pos = target
+
+        if delivery:
+            done += 1
+            await aclient.simPrintLogMessage(f"{vehicle}:", "COLOR DELIVERED", severity=0)
+            await aclient.motion(dwell, hold_s, vehicle)
+            last = time.monotonic() - t0
+
+    await aclient.landAsync(vehicle_name=vehicle)
+    table.release(vehicle)
+    return VehicleResult(vehicle, done, skipped, flight, wait, last)
+
+
+async def fly_fleet(fleet, homes, stops, routes, speed=SPEED_MPS, hold_s=DELIVERY_HOLD_S, zones=None, planner=None):
+    """
+    Fly every vehicle's route concurrently (one AsyncMultirotorClient each) and
+    report. homes, stops and zones are world NED; `fleet` gives each spawn.
+    """
+    names = list(fleet)
+    plans = _vehicle_plan(np.asarray(stops, dtype=np.float64).reshape(-1, 3), routes, homes)
+    clients = [AsyncMultirotorClient(vehicle_name=v) for v in names]
+    try:
+        await asyncio.gather(*(_prepare(c, v, fleet[v], h[2]) for c, v, h in zip(clients, names, homes)))
+        table = ReservationTable()
+        t0 = time.monotonic()
+        for v, h in zip(names, homes):
+            table.park(v, h, 0.0)
+        results = await asyncio.gather(*(
+            _fly_vehicle(c, v, fleet[v], h, p, table, t0, speed, hold_s, zones, planner)
+            for c, v, h, p in zip(clients, names, homes, plans)
+        ))
+    finally:
+        for c in clients:
+            c.close()
+    return _report(list(results))
+
+
+def main(mission_path=DEFAULT_MISSION):
+    mission = load_mission(mission_path)
+    stops_wp = [w for w in mission.waypoints if w.actions and all(a.name == "deliver" for a in w.actions)]
+    names = [w.actor for w in stops_wp]
+    positions = resolve_positions(names, level_name=mission.level, refresh=REFRESH_POSE_CACHE)
+    clearance = np.array([w.roof_clearance_m for w in stops_wp])
+    alt = mission.altitude
+    safe_z = (positions[:, 2] - clearance).min() - (alt.extra_clearance_m + alt.safe_z_margin_m)
+    stops = positions.copy()
+    stops[:, 2] = np.minimum(positions[:, 2] - clearance, safe_z)
+    homes = [(x, y, safe_z) for x, y, _ in FLEET.values()]
+    zones, planner = mission.zones, mission.planner
+
+    print("Estimated throughput (kinematic model):")
+    scaling_table(homes, stops, range(1, len(FLEET) + 1), zones=zones, planner=planner)
+
+    routes = partition(stops, homes, zones, planner)
+    for v, r in zip(FLEET, routes):
+        print(f"{v}: {[names[i] for i in r]}")
+
+    report = asyncio.run(fly_fleet(FLEET, homes, stops, routes, zones=zones, planner=planner))
+    print_report(report)
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MISSION)
\ No newline at end of file
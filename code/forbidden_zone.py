@@ -0,0 +1,252 @@
+import math
+import warnings
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from frames import CM_PER_M, unreal_to_ned
+
+
+def segment_intersects_aabb(x0, y0, x1, y1, xmin, xmax, ymin, ymax) -> bool:
+    """
+    Liang–Barsky line clipping for axis-aligned rectangle.
+    Returns True if the segment intersects the rectangle.
+    """
+    dx = x1 - x0
+    dy = y1 - y0
+
+    p = [-dx, dx, -dy, dy]
+    q = [x0 - xmin, xmax - x0, y0 - ymin, ymax - y0]
+
+    u1, u2 = 0.0, 1.0
+    for pi, qi in zip(p, q):
+        if pi == 0:
+            if qi < 0:
+                return False
+        else:
+            t = qi / pi
+            if pi < 0:
+                u1 = max(u1, t)
+            else:
+                u2 = min(u2, t)
+
+    return u1 <= u2
+
+
+def segments_intersect_aabb(p0, p1, xmin, xmax, ymin, ymax) -> np.ndarray:
+    """Vectorized segment_intersects_aabb over (N,2) start / end arrays."""
+    p0 = np.asarray(p0, dtype=np.float64).reshape(-1, 2)
+    p1 = np.asarray(p1, dtype=np.float64).reshape(-1, 2)
+    d = p1 - p0
+
+    p = np.stack([-d[:, 0], d[:, 0], -d[:, 1], d[:, 1]], axis=1)
+    q = np.stack([p0[:, 0] - xmin, xmax - p0[:, 0], p0[:, 1] - ymin, ymax - p0[:, 1]], axis=1)
+
+    parallel = p == 0
+    outside = np.any(parallel & (q < 0), axis=1)
+
+    t = np.divide(q, p, out=np.zeros_like(q), where=~parallel)
+    u1 = np.max(np.where(p < 0, t, 0.0), axis=1, initial=0.0)
+    u2 = np.min(np.where(p > 0, t, 1.0), axis=1, initial=1.0)
+
+    return ~outside & (u1 <= u2)
+
+
+@dataclass(frozen=True)
+class OrientedBoxZone:
+    """
+    Immutable no-fly box rotated by `yaw` around Z, in NED meters.
+
+    ex / ey are half-sizes including any safety margin, ez is the half-height
+    (math.inf for a zone that blocks every altitude). The world->local rotation
+    is computed once in __post_init__, so the checks below do no trig.
+    """
+    cx: float
+    cy: float
+    cz: float
+    ex: float
+    ey: float
+    ez: float
+    yaw: float
+    name: str = ""
+    c: float = field(init=False, repr=False)
+    s: float = field(init=False, repr=False)
+    rot: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        c = math.cos(-self.yaw)
+        s = math.sin(-self.yaw)
+        rot = np.array([[c, -s], [s, c]])
+        rot.flags.writeable = False
+        object.__setattr__(self, "c", c)
+        object.__setattr__(self, "s", s)
+        object.__setattr__(self, "rot", rot)
+
+    @classmethod
+    def from_ned_cm(cls, center_cm, extent_cm, yaw_deg, margin_m=0.0, xy_only=False, name=""):
+        """Build from a NED center in cm (Z down), a TriggerBox's Box Extent (cm) and Rotation Z (deg)."""
+        cx, cy, cz = (c / CM_PER_M for c in center_cm)
+        ez = math.inf if xy_only else extent_cm[2] / CM_PER_M
+        return cls(
+            cx, cy, cz, extent_cm[0] / CM_PER_M + margin_m, extent_cm[1] / CM_PER_M + margin_m, ez,
+            math.radians(yaw_deg), name,
+        )
+
+    @classmethod
+    def from_unreal_location(cls, location_cm, extent_cm, yaw_deg, margin_m=0.0, xy_only=False, name="",
+                             origin_cm=(0.0, 0.0, 0.0)):
+        """Build from a TriggerBox's Location as shown in the editor (cm, Z up; frames.unreal_to_ned)."""
+        center_cm = unreal_to_ned(location_cm, origin_cm) * CM_PER_M
+        return cls.from_ned_cm(center_cm.tolist(), extent_cm, yaw_deg, margin_m, xy_only, name)
+
+    @classmethod
+    def from_unreal_cm(cls, center_cm, extent_cm, yaw_deg, margin_m=0.0, xy_only=False, name=""):
+        """Deprecated: the center is NED, not an editor Location; use from_ned_cm or from_unreal_location."""
+        warnings.warn("OrientedBoxZone.from_unreal_cm takes a NED center; use from_ned_cm "
+                      "(or from_unreal_location for the editor Location)", DeprecationWarning, stacklevel=2)
+        return cls.from_ned_cm(center_cm, extent_cm, yaw_deg, margin_m, xy_only, name)
+
+    def bounds_xy(self):
+        """World-axis bounding rectangle (xmin, ymin, xmax, ymax) of the footprint."""
+        ac = abs(self.c)
+        as_ = abs(self.s)
+        hx = ac * self.ex + as_ * self.ey
+        hy = as_ * self.ex + ac * self.ey
+        return self.cx - hx, self.cy - hy, self.cx + hx, self.cy + hy
+
+    # ---------- scalar checks (one point / one leg, no numpy overhead) ----------
+
+    def to_local(self, x, y):
+        dx = x - self.cx
+        dy = y - self.cy
+        return dx * self.c - dy * self.s, dx * self.s + dy * self.c
+
+    def z_overlaps(self, z) -> bool:
+        return abs(z - self.cz) <= self.ez
+
+    def contains_point(self, x, y, z=None) -> bool:
+        lx, ly = self.to_local(x, y)
+        in_xy = (abs(lx) <= self.ex) and (abs(ly) <= self.ey)
+        if z is None:
+            return in_xy
+        return in_xy and self.z_overlaps(z)
+
+    def segment_crosses(self, x0, y0, x1, y1) -> bool:
+        """True if the XY segment intersects the box footprint (altitude ignored)."""
+        lx0, ly0 = self.to_local(x0, y0)
+        lx1, ly1 = self.to_local(x1, y1)
+        return segment_intersects_aabb(lx0, ly0, lx1, ly1, -self.ex, self.ex, -self.ey, self.ey)
+
+    def leg_blocked(self, x0, y0, z0, x1, y1, z1) -> bool:
+        """waypoint3 rule: path crosses the footprint and either end is inside the Z band."""
+        in_z = self.z_overlaps(z0) or self.z_overlaps(z1)
+        return in_z and self.segment_crosses(x0, y0, x1, y1)
+
+    # ---------- vectorized checks over arrays ----------
+
+    def to_local_xy(self, xy) -> np.ndarray:
+        xy = np.asarray(xy, dtype=np.float64)[..., :2]
+        return (xy - (self.cx, self.cy)) @ self.rot.T
+
+    def contains_xy(self, xy) -> np.ndarray:
+        local = self.to_local_xy(xy)
+        return (np.abs(local[..., 0]) <= self.ex) & (np.abs(local[..., 1]) <= self.ey)
+
+    def contains(self, xyz) -> np.ndarray:
+        """(N,3) points -> (N,) bool, inside footprint and Z band."""
+        xyz = np.asarray(xyz, dtype=np.float64)
+        return self.contains_xy(xyz) & (np.abs(xyz[..., 2] - self.cz) <= self.ez)
+
+    def segments_cross(self, starts, ends) -> np.ndarray:
+        """(N,2|3) start / end arrays -> (N,) bool, XY footprint crossing."""
+        l0 = self.to_local_xy(starts).reshape(-1, 2)
+        l1 = self.to_local_xy(ends).reshape(-1, 2)
+        return segments_intersect_aabb(l0, l1, -self.ex, self.ex, -self.ey, self.ey)
+
+    def segments_blocked(self, starts, ends) -> np.ndarray:
+        """Vectorized leg_blocked over (N,3) start / end arrays."""
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        in_z = (np.abs(starts[:, 2] - self.cz) <= self.ez) | (np.abs(ends[:, 2] - self.cz) <= self.ez)
+        return in_z & self.segments_cross(starts, ends)
+
+    def route_blocked(self, route) -> np.ndarray:
+        """(M,3) polyline -> (M-1,) bool, one entry per leg."""
+        route = np.asarray(route, dtype=np.float64).reshape(-1, 3)
+        return self.segments_blocked(route[:-1], route[1:])
+
+@dataclass(frozen=True)
+class PolygonZone:
+    """
+    Immutable no-fly prism: a simple XY polygon (NED meters) extruded over a Z band.
+
+    Same check interface as OrientedBoxZone (contains_point / segment_crosses /
+    leg_blocked / bounds_xy), so both kinds can live in one ZoneRegistry.
+    """
+    vertices: tuple
+    cz: float = 0.0
+    ez: float = math.inf
+    name: str = ""
+    xs: np.ndarray = field(init=False, repr=False, compare=False)
+    ys: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        v = np.asarray(self.vertices, dtype=np.float64).reshape(-1, 2)
+        if len(v) < 3:
+            raise ValueError(f"Polygon zone '{self.name}' needs at least 3 vertices")
+        xs = v[:, 0].copy()
+        ys = v[:, 1].copy()
+        xs.flags.writeable = False
+        ys.flags.writeable = False
+        object.__setattr__(self, "vertices", tuple(map(tuple, v.tolist())))
+        object.__setattr__(self, "xs", xs)
+        object.__setattr__(self, "ys", ys)
+
+    @classmethod
+    def from_z_range(cls, vertices, z_min=-math.inf, z_max=math.inf, name=""):
+        if math.isinf(z_min) or math.isinf(z_max):
+            return cls(vertices, 0.0, math.inf, name)
+        return cls(vertices, (z_min + z_max) / 2.0, abs(z_max - z_min) / 2.0, name)
+
+    def bounds_xy(self):
+        return float(self.xs.min()), float(self.ys.min()), float(self.xs.max()), float(self.ys.max())
+
+    def z_overlaps(self, z) -> bool:
+        return abs(z - self.cz) <= self.ez
+
+    def contains_point(self, x, y, z=None) -> bool:
+        # even-odd ray casting over all edges at once
+        xs, ys = self.xs, self.ys
+        xj, yj = np.roll(xs, 1), np.roll(ys, 1)
+        crosses = (ys > y) != (yj > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = (xj - xs) * (y - ys) / (yj - ys) + xs
+        in_xy = bool(np.count_nonzero(crosses & (x < x_at)) & 1)
+        if z is None:
+            return in_xy
+        return in_xy and self.z_overlaps(z)
+
+    def segment_crosses(self, x0, y0, x1, y1) -> bool:
+        """
+        True if the XY segment touches the polygon (crosses an edge or lies inside).
+        Collinear overlap with an edge's line counts as a crossing (errs on the safe side).
+        """
+        if self.contains_point(x0, y0):
+            return True
+
+        ax, ay = self.xs, self.ys
+        bx, by = np.roll(ax, -1), np.roll(ay, -1)
+
+        def orient(px, py, qx, qy, rx, ry):
+            return (qx - px) * (ry - py) - (qy - py) * (rx - px)
+
+        d1 = orient(x0, y0, x1, y1, ax, ay)
+        d2 = orient(x0, y0, x1, y1, bx, by)
+        d3 = orient(ax, ay, bx, by, x0, y0)
+        d4 = orient(ax, ay, bx, by, x1, y1)
+        hit = (d1 * d2 <= 0) & (d3 * d4 <= 0)
+        return bool(np.any(hit))
+
+    def leg_blocked(self, x0, y0, z0, x1, y1, z1) -> bool:
+        in_z = self.z_overlaps(z0) or self.z_overlaps(z1)
+        return in_z and self.segment_crosses(x0, y0, x1, y1)
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+Coordinate frames in one place, batched over NumPy arrays.
+
+    NED       AirSim world: x north, y east, z down, metres, origin at the
+              vehicle's PlayerStart (what every client call returns)
+    Unreal    editor Location: X north, Y east, Z up, centimetres
+    ENU       x east, y north, z up, metres (Cesium's local tangent frame, ROS)
+    geodetic  WGS84 latitude, longitude (deg), altitude above the ellipsoid
+              (m), as Cesium georeferences the level
+
+Points are (..., 3) arrays and quaternions (..., 4) in AirSim's (w, x, y, z)
+order; every function takes one point or a whole route / point cloud and
+returns float64 arrays of the same leading shape. Z signs and the cm/m
+factor live here only.
+
+    anchor = GeoAnchor.from_geo_point(client.getHomeGeoPoint(vehicle_name="Drone1"))
+    lla = anchor.ned_to_geodetic(route)                   # (N, 3) lat, lon, alt
+    cm = ned_to_unreal(route, origin_cm=player_start_cm)  # editor coordinates
+
+GeoAnchor precomputes the ECEF position and ENU rotation of the NED origin,
+so a conversion is two matrix products plus the closed-form ECEF ->
+geodetic step. bench_frames.py measures the batched transforms.
+"""
+import math
+
+import numpy as np
+
+CM_PER_M = 100.0
+
+WGS84_A = 6378137.0                  # semi-major axis (m)
+WGS84_F = 1.0 / 298.257223563
+WGS84_B = WGS84_A * (1.0 - WGS84_F)
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+WGS84_EP2 = WGS84_E2 / (1.0 - WGS84_E2)
+
+_NED_ENU = np.array([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, -1.0]])   # its own inverse
+_Q_NED_ENU = np.array([0.0, math.sqrt(0.5), math.sqrt(0.5), 0.0])          # world NED -> ENU
+_Q_FRD_FLU = np.array([0.0, 1.0, 0.0, 0.0])                                 # body FRD -> FLU
+
+
+def _points(points):
+    pts = np.asarray(points, dtype=np.float64)
+    if pts.shape[-1] != 3:
+        raise ValueError(f"points must have shape (..., 3), got {pts.shape}")
+    return pts
+
+
+def _quats(quats):
+    q = np.asarray(quats, dtype=np.float64)
+    if q.shape[-1] != 4:
+        raise ValueError(f"quaternions must have shape (..., 4) as (w, x, y, z), got {q.shape}")
+    return q
+
+
+# ---------- AirSim types ----------
+
+def as_xyz(vectors):
+    """Vector3r (or a list of them) -> (3,) / (N, 3)."""
+    if hasattr(vectors, "x_val"):
+        return np.array([vectors.x_val, vectors.y_val, vectors.z_val])
+    return np.array([[v.x_val, v.y_val, v.z_val] for v in vectors], dtype=np.float64).reshape(-1, 3)
+
+
+def as_wxyz(quats):
+    """Quaternionr (or a list of them) -> (4,) / (N, 4) in (w, x, y, z) order."""
+    if hasattr(quats, "w_val"):
+        return np.array([quats.w_val, quats.x_val, quats.y_val, quats.z_val])
+    return np.array([[q.w_val, q.x_val, q.y_val, q.z_val] for q in quats], dtype=np.float64).reshape(-1, 4)
+
+
+def as_lla(geo_points):
+    """GeoPoint (or a list of them) -> (3,) / (N, 3) latitude, longitude, altitude."""
+    if hasattr(geo_points, "latitude"):
+        return np.array([geo_points.latitude, geo_points.longitude, geo_points.altitude])
+    return np.array([[g.latitude, g.longitude, g.altitude] for g in geo_points], dtype=np.float64).reshape(-1, 3)
+
+
+# ---------- NED <-> Unreal cm <-> ENU ----------
+
+def ned_to_unreal(points_m, origin_cm=(0.0, 0.0, 0.0)):
+    """NED metres -> Unreal world cm; origin_cm = the PlayerStart Location the NED origin sits at."""
+    pts = _points(points_m) * CM_PER_M
+    pts[..., 2] = -pts[..., 2]
+    return pts + np.asarray(origin_cm, dtype=np.float64)
+
+
+def unreal_to_ned(points_cm, origin_cm=(0.0, 0.0, 0.0)):
+    """Unreal world cm (editor Location, Z up) -> NED metres."""
+    pts = (_points(points_cm) - np.asarray(origin_cm, dtype=np.float64)) / CM_PER_M
+    pts[..., 2] = -pts[..., 2]
+    return pts
+
+
+def ned_to_enu(points):
+    """NED -> ENU (and back: the swap is its own inverse)."""
+    return _points(points) @ _NED_ENU
+
+
+enu_to_ned = ned_to_enu
+
+
+# ---------- quaternions (w, x, y, z) ----------
+
+def quat_multiply(a, b):
+    """Hamilton product a * b, batched."""
+    a, b = _quats(a), _quats(b)
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack([aw * bw - ax * bx - ay * by - az * bz,
+                     aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw], axis=-1)
+
+
+def quat_conjugate(q):
+    return _quats(q) * (1.0, -1.0, -1.0, -1.0)
+
+
+def quat_to_matrix(q):
+    """(..., 4) unit quaternions -> (..., 3, 3) rotation matrices (body -> world)."""
+    w, x, y, z = np.moveaxis(_quats(q), -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def quat_rotate(q, points):
+    """Rotate (..., 3) points by (..., 4) quaternions (broadcast: one q for a whole cloud)."""
+    return np.einsum("...ij,...j->...i", quat_to_matrix(q), _points(points))
+
+
+def quat_to_euler(q):
+    """(..., 4) -> (..., 3) roll, pitch, yaw (rad), ZYX as cosysairsim.quaternion_to_euler_angles."""
+    w, x, y, z = np.moveaxis(_quats(q), -1, 0)
+    roll = np.arctan2(2.0 * (w * x + y * z), 1.0 - 2.0 * (x * x + y * y))
+    pitch = np.arcsin(np.clip(2.0 * (w * y - z * x), -1.0, 1.0))
+    yaw = np.arctan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    return np.stack([roll, pitch, yaw], axis=-1)
+
+
+def euler_to_quat(rpy):
+    """(..., 3) roll, pitch, yaw (rad) -> (..., 4), as cosysairsim.euler_to_quaternion."""
+    roll, pitch, yaw = np.moveaxis(_points(rpy) * 0.5, -1, 0)
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    return np.stack([cr * cp * cy + sr * sp * sy,
+                     sr * cp * cy - cr * sp * sy,
+                     cr * sp * cy + sr * cp * sy,
+                     cr * cp * sy - sr * sp * cy], axis=-1)
+
+
+def quat_unreal_to_ned(q):
+    """Unreal FQuat (as w, x, y, z) -> NED; the mirrored Z flips the x and y parts (its own inverse)."""
+    return _quats(q) * (1.0, -1.0, -1.0, 1.0)
+
+
+quat_ned_to_unreal = quat_unreal_to_ned
+
+
+def rotator_to_quat(pitch_deg, yaw_deg, roll_deg):
+    """Unreal FRotator (deg, as in the editor) -> NED quaternion; the angles carry over unchanged."""
+    return euler_to_quat(np.stack(np.broadcast_arrays(np.radians(roll_deg), np.radians(pitch_deg),
+                                                      np.radians(yaw_deg)), axis=-1))
+
+
+def quat_ned_to_enu(q):
+    """Attitude body FRD in NED -> body FLU in ENU (the ROS convention)."""
+    return quat_multiply(quat_multiply(_Q_NED_ENU, q), _Q_FRD_FLU)
+
+
+def quat_enu_to_ned(q):
+    return quat_multiply(quat_multiply(quat_conjugate(_Q_NED_ENU), q), quat_conjugate(_Q_FRD_FLU))
+
+
+# ---------- geodetic (WGS84) ----------
+
+def geodetic_to_ecef(lla):
+    """(..., 3) latitude, longitude (deg), altitude (m) -> ECEF metres."""
+    lla = _points(lla)
+    lat, lon = np.radians(lla[..., 0]), np.radians(lla[..., 1])
+    alt = lla[..., 2]
+    sl, cl = np.sin(lat), np.cos(lat)
+    n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sl * sl)
+    return np.stack([(n + alt) * cl * np.cos(lon), (n + alt) * cl * np.sin(lon),
+                     (n * (1.0 - WGS84_E2) + alt) * sl], axis=-1)
+
+
+def ecef_to_geodetic(ecef):
+    """ECEF metres -> (..., 3) latitude, longitude (deg), altitude (m); Bowring's closed form, sub-mm near the surface."""
+    ecef = _points(ecef)
+    x, y, z = np.moveaxis(ecef, -1, 0)
+    p = np.hypot(x, y)
+    theta = np.arctan2(z * WGS84_A, p * WGS84_B)
+    st, ct = np.sin(theta), np.cos(theta)
+    lat = np.arctan2(z + WGS84_EP2 * WGS84_B * st ** 3, p - WGS84_E2 * WGS84_A * ct ** 3)
+    sl = np.sin(lat)
+    n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sl * sl)
+    # near the poles p / cos(lat) loses precision, use the z form there
+    cl = np.cos(lat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alt = np.where(np.abs(cl) > 1e-3, p / cl - n, z / sl - n * (1.0 - WGS84_E2))
+    return np.stack([np.degrees(lat), np.degrees(np.arctan2(y, x)), alt], axis=-1)
+
+
+def enu_rotation(lat_deg, lon_deg):
+    """3x3 rotation ECEF -> ENU at a geodetic position (rows: east, north, up)."""
+    lat, lon = math.radians(lat_deg), math.radians(lon_deg)
+    sl, cl, so, co = math.sin(lat), math.cos(lat), math.sin(lon), math.cos(lon)
+    return np.array([[-so, co, 0.0],
+                     [-sl * co, -sl * so, cl],
+                     [cl * co, cl * so, sl]])
+
+
+class GeoAnchor:
+    """
+    The geodetic position of the NED origin (Cesium georeference, or
+    getHomeGeoPoint) with its ECEF point and ENU rotation precomputed.
+    Exact on the WGS84 ellipsoid; AirSim's own GPS model is a flat-earth
+    approximation, a few cm off over a few km.
+    """
+
+    def __init__(self, lat_deg, lon_deg, alt_m=0.0):
+        self.lla = np.array([lat_deg, lon_deg, alt_m], dtype=np.float64)
+        self.ecef = geodetic_to_ecef(self.lla)
+        self.rot = enu_rotation(lat_deg, lon_deg)
+        self.ned_to_ecef_rot = _NED_ENU @ self.rot     # rows: north, east, down in ECEF
+
+    @classmethod
+    def from_geo_point(cls, geo_point):
+        return cls(geo_point.latitude, geo_point.longitude, geo_point.altitude)
+
+    def ned_to_ecef(self, points):
+        return self.ecef + _points(points) @ self.ned_to_ecef_rot
+
+    def ecef_to_ned(self, ecef):
+        return (_points(ecef) - self.ecef) @ self.ned_to_ecef_rot.T
+
+    def ned_to_geodetic(self, points):
+        """NED metres -> (..., 3) latitude, longitude (deg), altitude (m)."""
+        return ecef_to_geodetic(self.ned_to_ecef(points))
+
+    def geodetic_to_ned(self, lla):
+        """(..., 3) latitude, longitude (deg), altitude (m) -> NED metres."""
+        return self.ecef_to_ned(geodetic_to_ecef(lla))
+
+    def enu_to_geodetic(self, points):
+        return self.ned_to_geodetic(enu_to_ned(points))
+
+    def geodetic_to_enu(self, lla):
+        return ned_to_enu(self.geodetic_to_ned(lla))
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""
+LiDAR-guarded flight: the obstacle check runs during the move, not only before it.
+
+    guard = GuardedMove(aclient, "Drone1", "LidarFront", executor)
+    reason = await guard.fly(points, 12.0)     # None, or why the move was given up
+    guard.print_report()
+
+While the path is flown (one moveOnPathAsync, corners blended like the
+PathExecutor's), one scan every 1/CHECK_HZ s is moved into world NED with its
+pose and tested against the corridor (HALF_WIDTH_M) of the path still ahead.
+The clear distance along the path is compared with the stopping distance
+
+    speed * reaction_s + speed**2 / (2 * BRAKE_DECEL_MPS2) + MARGIN_M
+
+with reaction_s = one check period + the check-to-brake latency bound.
+
+  - closer than that: brake (cancelLastTask + hover), then resume the rest of
+    the path once RESUME_CLEAR_CHECKS scans in a row are clear again; give up
+    after MAX_BLOCKED_S
+  - closer than SLOW_DISTANCE_FACTOR times that: re-send the rest of the path
+    at SLOW_FACTOR speed, back to full speed beyond FAST_DISTANCE_FACTOR times
+
+Every check-to-brake latency (scan request -> motion cancelled) is measured.
+A latency above MAX_LATENCY_S replaces the bound from then on, and the
+commanded speed is capped at the speed whose stopping distance still fits in
+the LiDAR range (max_safe_speed), so a cruise speed above 8 m/s stays safe.
+"""
+import asyncio
+import math
+import time
+from collections import namedtuple
+
+import cosysairsim as airsim
+import numpy as np
+
+from obstacle_detect import as_points
+from path_executor import blend_corners
+from voxel_map import scan_to_world
+
+CHECK_HZ = 10.0
+HALF_WIDTH_M = 2.0            # corridor radius around the path ahead
+MIN_POINTS = 10               # returns needed in the corridor to count as an obstacle
+MIN_RANGE_M = 1.0             # returns closer than this to the sensor are the drone itself
+LIDAR_RANGE_M = 50.0
+BRAKE_DECEL_MPS2 = 4.0        # as path_executor.MAX_ACCEL_MPS2
+MARGIN_M = 3.0
+MAX_LATENCY_S = 0.25          # check-to-brake bound used in the stopping distance
+
+SLOW_FACTOR = 0.5
+SLOW_DISTANCE_FACTOR = 2.0
+FAST_DISTANCE_FACTOR = 2.5    # hysteresis: back to full speed only when clearly free
+RESUME_CLEAR_CHECKS = 3
+MAX_BLOCKED_S = 15.0
+
+# kind: "brake" | "slow" | "fast" | "resume" | "give_up"
+GuardEvent = namedtuple("GuardEvent", ["kind", "t", "xyz", "clear_m", "speed", "latency_s"])
+
+
+def stopping_distance(speed, reaction_s, decel=BRAKE_DECEL_MPS2):
+    """Distance covered from the scan that sees the obstacle to standstill."""
+    return speed * reaction_s + speed * speed / (2.0 * decel)
+
+
+def max_safe_speed(range_m, reaction_s, decel=BRAKE_DECEL_MPS2, margin_m=MARGIN_M):
+    """Highest speed whose stopping distance plus margin fits in `range_m`."""
+    room = range_m - margin_m
+    if room <= 0:
+        return 0.0
+    return decel * (math.sqrt(reaction_s * reaction_s + 2.0 * room / decel) - reaction_s)
+
+
+def clear_distance(points_world, origin, path, half_width=HALF_WIDTH_M, min_points=MIN_POINTS,
+                   min_range=MIN_RANGE_M):
+    """
+    Distance along the polyline `path` (first vertex = the drone) to the
+    min_points-th nearest return within `half_width` of it; math.inf if clear.
+    """
+    pts = np.asarray(points_world, dtype=np.float64).reshape(-1, 3)
+    d0 = pts - np.asarray(origin, dtype=np.float64)
+    pts = pts[np.einsum("ij,ij->i", d0, d0) > min_range * min_range]
+    path = np.asarray(path, dtype=np.float64).reshape(-1, 3)
+    if len(pts) < min_points or len(path) < 2:
+        return math.inf
+
+    seg = np.diff(path, axis=0)
+    seg_len = np.linalg.norm(seg, axis=1)
+    cum = np.concatenate([[0.0], np.cumsum(seg_len)[:-1]])
+    along = np.full(len(pts), math.inf)
+    # few segments, each one vector pass over all returns
+    for a, d, length, s0 in zip(path[:-1], seg, seg_len, cum):
+        if length <= 0:
+            continue
+        t = np.clip((pts - a) @ d / (length * length), 0.0, 1.0)
+        near = np.linalg.norm(pts - (a + t[:, None] * d), axis=1) <= half_width
+        along = np.where(near, np.minimum(along, s0 + t * length), along)
+
+    hits = along[np.isfinite(along)]
+    if len(hits) < min_points:
+        return math.inf
+    return float(np.partition(hits, min_points - 1)[min_points - 1])
+
+
+def remaining(route, pos):
+    """Vertices of `route` (route[0] = where the move started) still ahead of `pos`."""
+    p = np.asarray(pos, dtype=np.float64)
+    best, k_best = math.inf, 0
+    for k, (a, b) in enumerate(zip(route[:-1], route[1:])):
+        a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+        d = b - a
+        dd = float(d @ d)
+        t = min(1.0, max(0.0, float((p - a) @ d) / dd)) if dd > 0 else 0.0
+        dist = float(np.linalg.norm(p - (a + t * d)))
+        if dist < best:
+            best, k_best = dist, k
+    return [tuple(q) for q in route[k_best + 1:]]
+
+
+class GuardedMove:
+    def __init__(self, aclient, vehicle_name, lidar_name, executor=None, check_hz=CHECK_HZ,
+                 max_latency_s=MAX_LATENCY_S, lidar_range_m=LIDAR_RANGE_M, decel=BRAKE_DECEL_MPS2):
+        self.aclient = aclient
+        self.vehicle_name = vehicle_name
+        self.lidar_name = lidar_name
+        self.executor = executor        # PathExecutor: blend corners like it does; None = sharp corners
+        self.period = 1.0 / check_hz
+        self.max_latency = max_latency_s
+        self.lidar_range = lidar_range_m
+        self.decel = decel
+        self.checks = 0
+        self.latencies = []
+        self.events = []
+
+    # ---------- limits ----------
+
+    @property
+    def reaction_s(self):
+        """One check period plus the latency bound (raised by any measured latency above it)."""
+        return self.period + max(self.max_latency, max(self.latencies, default=0.0))
+
+    def stop_m(self, speed):
+        return stopping_distance(speed, self.reaction_s, self.decel) + MARGIN_M
+
+    def safe_speed(self):
+        return max_safe_speed(self.lidar_range, self.reaction_s, self.decel)
+
+    # ---------- sim calls ----------
+
+    async def _position(self):
+        state = await self.aclient.getMultirotorState(vehicle_name=self.vehicle_name)
+        p = state.kinematics_estimated.position
+        return p.x_val, p.y_val, p.z_val
+
+    async def _scan(self, route):
+        """(drone position, clear distance along the rest of `route`) from one scan."""
+        data = await self.aclient.getLidarData(lidar_name=self.lidar_name, vehicle_name=self.vehicle_name)
+        self.checks += 1
+        p = data.pose.position
+        pos = (p.x_val, p.y_val, p.z_val)
+        pts = scan_to_world(as_points(data.point_cloud), data.pose)
+        return pos, clear_distance(pts, pos, [pos] + remaining(route, pos))
+
+    async def _move(self, route, speed):
+        ex = self.executor
+        pts = blend_corners(route, ex.blend_radius, zones=ex.zones)[0] if ex is not None else route
+        kwargs = {"lookahead": ex.lookahead, "adaptive_lookahead": ex.adaptive_lookahead} if ex is not None else {}
+        await self.aclient.moveOnPathAsync([airsim.Vector3r(x, y, z) for x, y, z in pts[1:]], speed,
+                                           vehicle_name=self.vehicle_name, **kwargs)
+
+    async def _watch(self, route, cmd, speed, slow):
+        """Scan until the path ahead calls for a change; returns (kind, t_check, pos, clear_m)."""
+        while True:
+            t0 = time.monotonic()
+            pos, clear = await self._scan(route)
+            stop = self.stop_m(speed)
+            if clear < self.stop_m(cmd):
+                return "brake", t0, pos, clear
+            if not slow and clear < SLOW_DISTANCE_FACTOR * stop:
+                return "slow", t0, pos, clear
+            if slow and clear >= FAST_DISTANCE_FACTOR * stop:
+                return "fast", t0, pos, clear
+            await asyncio.sleep(max(0.0, self.period - (time.monotonic() - t0)))
+
+    async def _wait_clear(self, route, speed):
+        """Hover until the rest of `route` is clear for RESUME_CLEAR_CHECKS scans; False after MAX_BLOCKED_S."""
+        t_end = time.monotonic() + MAX_BLOCKED_S
+        clear_scans = 0
+        while time.monotonic() < t_end:
+            await asyncio.sleep(self.period)
+            _, clear = await self._scan(route)
+            clear_scans = clear_scans + 1 if clear >= self.stop_m(speed) else 0
+            if clear_scans >= RESUME_CLEAR_CHECKS:
+                return True
+        return False
+
+    def _note(self, kind, pos, clear, speed, latency=None):
+        self.events.append(GuardEvent(kind, time.monotonic(), pos, clear, speed, latency))
+
+    # ---------- flight ----------
+
+    async def fly(self, points, speed):
+        """Fly through `points` with the LiDAR check alongside; returns None or why the move was given up."""
+        cap = self.safe_speed()
+        if speed > cap:
+            print(f"[guard] {speed:.1f} m/s needs {self.stop_m(speed):.0f} m of clear path, "
+                  f"LiDAR sees {self.lidar_range:.0f} m: capped at {cap:.1f} m/s")
+        points = [tuple(p) for p in points]
+        slow = False
+        while points:
+            full = min(speed, self.safe_speed())
+            cmd = full * SLOW_FACTOR if slow else full
+            route = [await self._position()] + points
+            move = asyncio.ensure_future(self._move(route, cmd))
+            watch = asyncio.ensure_future(self._watch(route, cmd, full, slow))
+            done, _ = await asyncio.wait({move, watch}, return_when=asyncio.FIRST_COMPLETED)
+            if move in done:
+                watch.cancel()
+                await asyncio.gather(watch, return_exceptions=True)
+                move.result()
+                await self.aclient.hoverAsync(vehicle_name=self.vehicle_name)
+                return None
+
+            kind, t0, pos, clear = watch.result()
+            move.cancel()   # cancelLastTask, waits for the path call to return
+            await asyncio.gather(move, return_exceptions=True)
+            latency = time.monotonic() - t0
+            self.latencies.append(latency)
+            if latency > self.max_latency:
+                print(f"[guard] check-to-brake {latency * 1000:.0f} ms is above the "
+                      f"{self.max_latency * 1000:.0f} ms bound; stopping distances use it from now on")
+            self._note(kind, pos, clear, cmd, latency)
+            points = remaining(route, await self._position()) or points[-1:]
+
+            if kind == "slow":
+                print(f"[guard] path blocked {clear:.1f} m ahead: slowing to {full * SLOW_FACTOR:.1f} m/s")
+                slow = True
+            elif kind == "fast":
+                slow = False
+            else:
+                await self.aclient.hoverAsync(vehicle_name=self.vehicle_name)
+                print(f"[guard] path blocked {clear:.1f} m ahead: BRAKE ({latency * 1000:.0f} ms after the scan)")
+                slow = True
+                if not await self._wait_clear([pos] + points, full * SLOW_FACTOR):
+                    self._note("give_up", pos, clear, 0.0)
+                    return f"LiDAR: path blocked {clear:.0f} m ahead for {MAX_BLOCKED_S:.0f}s"
+                self._note("resume", pos, clear, full * SLOW_FACTOR)
+                print("[guard] path clear again: resuming")
+        return None
+
+    # ---------- report ----------
+
+    def report(self):
+        lat = np.array(self.latencies) * 1000.0
+        kinds = [e.kind for e in self.events]
+        return {
+            "checks": self.checks,
+            "brakes": kinds.count("brake"),
+            "slowdowns": kinds.count("slow"),
+            "resumes": kinds.count("resume"),
+            "latency_p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+            "latency_max_ms": float(lat.max()) if len(lat) else None,
+            "bound_ms": self.max_latency * 1000.0,
+            "reaction_s": self.reaction_s,
+            "safe_speed_mps": self.safe_speed(),
+        }
+
+    def print_report(self):
+        r = self.report()
+        lat = (f"check-to-brake p50 {r['latency_p50_ms']:.0f} ms, max {r['latency_max_ms']:.0f} ms"
+               if r["latency_max_ms"] is not None else "no re-commands")
+        print(f"[guard] {r['checks']} LiDAR checks, {r['brakes']} brake(s), {r['slowdowns']} slow-down(s), "
+              f"{r['resumes']} resume(s); {lat} (bound {r['bound_ms']:.0f} ms); "
+              f"safe speed {r['safe_speed_mps']:.1f} m/s")
\ No newline at end of file
@@ -0,0 +1,685 @@
+import asyncio
+import contextlib
+import json
+import math
+import sys
+import threading
+import time
+
+import cosysairsim as airsim
+import numpy as np
+
+import rpc_trace
+from forbidden_zone import OrientedBoxZone
+from zone_index import zone_from_dict
+
+DEFAULT_SCENE = "headless_scene.json"
+DEFAULT_TIME_SCALE = 100.0     # simulated seconds per wall second; math.inf = no waiting at all
+TAKEOFF_ALT_M = 3.0
+TAKEOFF_SPEED_MPS = 2.0
+LAND_SPEED_MPS = 1.5
+MAX_ACCEL_MPS2 = 4.0
+SEED = 0
+HEADLESS_VERSION = 1
+
+DEFAULT_LIDAR = {
+    "range_m": 50.0,
+    "channels": 16,
+    "points_per_channel": 360,
+    "vfov_deg": [-15.0, 15.0],
+    "hfov_deg": [-180.0, 180.0],
+    "noise_m": 0.0,
+}
+
+
+class SimClock:
+    """
+    Simulated time. With a finite time_scale it runs that many times faster
+    than the wall clock; with math.inf nothing ever waits and time only moves
+    when a sleep or a joined command advances it (for sequential scripts).
+    """
+
+    def __init__(self, time_scale=DEFAULT_TIME_SCALE):
+        self.scale = time_scale
+        self._t = 0.0
+        self._real0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def instant(self):
+        return math.isinf(self.scale)
+
+    def now(self):
+        if self.instant:
+            return self._t
+        return self._t + (time.perf_counter() - self._real0) * self.scale
+
+    def advance_to(self, t):
+        if self.instant:
+            with self._lock:
+                self._t = max(self._t, t)
+
+    def sleep(self, dt):
+        if dt <= 0:
+            return
+        if self.instant:
+            self.advance_to(self._t + dt)
+        else:
+            time.sleep(dt / self.scale)
+
+    def real_timeout(self, dt):
+        return max(0.0, dt) / self.scale if not self.instant else 0.0
+
+    def wait_event(self, event, dt):
+        """event.wait() for dt simulated seconds (with an instant clock, dt wall seconds: nothing else waits)."""
+        return event.wait(max(0.0, dt) if self.instant else self.real_timeout(dt))
+
+
+class SimTime:
+    """Stand-in for the `time` module of a script: sleeps and clocks are simulated."""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._epoch0 = time.time()
+
+    def sleep(self, dt):
+        self._clock.sleep(dt)
+
+    def monotonic(self):
+        return self._clock.now()
+
+    perf_counter = monotonic
+
+    def time(self):
+        return self._epoch0 + self._clock.now()
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class SimAsyncio:
+    """Stand-in for the `asyncio` module of a script: asyncio.sleep runs on the sim clock."""
+
+    def __init__(self, clock):
+        self._clock = clock
+
+    async def sleep(self, dt, result=None):
+        if self._clock.instant:
+            self._clock.advance_to(self._clock.now() + dt)
+            await asyncio.sleep(0)
+            return result
+        return await asyncio.sleep(dt / self._clock.scale, result)
+
+    def __getattr__(self, name):
+        return getattr(asyncio, name)
+
+
+def trapezoid_s(t, length, v_max, a_max):
+    """Distance covered after t seconds on a rest-to-rest trapezoid profile."""
+    if length <= 0 or t <= 0:
+        return 0.0
+    t_acc = v_max / a_max
+    d_acc = 0.5 * a_max * t_acc * t_acc
+    if 2 * d_acc > length:
+        t_acc = math.sqrt(length / a_max)
+        v_max = a_max * t_acc
+        d_acc = length / 2.0
+    t_cruise = (length - 2 * d_acc) / v_max
+    if t < t_acc:
+        return 0.5 * a_max * t * t
+    if t < t_acc + t_cruise:
+        return d_acc + v_max * (t - t_acc)
+    td = t - t_acc - t_cruise
+    if td < t_acc:
+        return d_acc + v_max * t_cruise + v_max * td - 0.5 * a_max * td * td
+    return length
+
+
+def trapezoid_duration(length, v_max, a_max):
+    if length <= 0:
+        return 0.0
+    t_acc = v_max / a_max
+    if v_max * t_acc > length:
+        return 2.0 * math.sqrt(length / a_max)
+    return 2.0 * t_acc + (length - v_max * t_acc) / v_max
+
+
+class Motion:
+    """A commanded polyline (world NED) flown rest-to-rest from t0, optionally cut short."""
+
+    def __init__(self, points, speed, t0, accel=MAX_ACCEL_MPS2, timeout_s=math.inf, stop_s=math.inf):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        seg = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+        self.cum = np.concatenate([[0.0], np.cumsum(seg)])
+        self.length = float(self.cum[-1])
+        self.speed = max(1e-3, float(speed))
+        self.accel = accel
+        self.t0 = t0
+        self.timeout_s = timeout_s
+        self.stop_s = min(stop_s, self.length)
+        duration = trapezoid_duration(self.length, self.speed, accel)
+        if self.stop_s < self.length:
+            # time at which the profile reaches stop_s (bisection, profile is monotonic)
+            lo, hi = 0.0, duration
+            for _ in range(50):
+                mid = (lo + hi) / 2
+                lo, hi = (mid, hi) if trapezoid_s(mid, self.length, self.speed, accel) < self.stop_s else (lo, mid)
+            duration = hi
+        self.t_end = t0 + min(duration, timeout_s)
+
+    def _s(self, t):
+        return min(self.stop_s, trapezoid_s(min(t, self.t_end) - self.t0, self.length, self.speed, self.accel))
+
+    def _point(self, s):
+        if self.length == 0:
+            return self.points[-1].copy()
+        k = min(int(np.searchsorted(self.cum, s, side="right")) - 1, len(self.points) - 2)
+        seg = self.cum[k + 1] - self.cum[k]
+        f = (s - self.cum[k]) / seg if seg > 0 else 0.0
+        return self.points[k] + (self.points[k + 1] - self.points[k]) * f
+
+    def position(self, t):
+        return self._point(self._s(t))
+
+    def velocity(self, t, dt=0.05):
+        if t >= self.t_end:
+            return np.zeros(3)
+        return (self.position(t + dt) - self.position(t)) / dt
+
+
+class Boxes:
+    """Oriented boxes packed into arrays for vectorized ray casts."""
+
+    def __init__(self, boxes):
+        self.boxes = list(boxes)
+        cols = np.array([[b.cx, b.cy, b.cz, b.ex, b.ey, b.ez, b.c, b.s] for b in self.boxes],
+                        dtype=np.float64).reshape(-1, 8)
+        self.cx, self.cy, self.cz, self.ex, self.ey, self.ez, self.c, self.s = cols.T
+        self.radius = np.sqrt(np.minimum(self.ex, 1e9) ** 2 + np.minimum(self.ey, 1e9) ** 2
+                              + np.minimum(self.ez, 1e9) ** 2)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def raycast(self, origin, dirs, max_range):
+        """
+        Distance along each unit ray in `dirs` (R,3) from `origin` to the first
+        box surface (inf if nothing within max_range). Returns (dist, box index).
+        """
+        origin = np.asarray(origin, dtype=np.float64)
+        dirs = np.asarray(dirs, dtype=np.float64).reshape(-1, 3)
+        r = len(dirs)
+        if len(self) == 0:
+            return np.full(r, np.inf), np.full(r, -1)
+
+        near = np.flatnonzero(np.sqrt((self.cx - origin[0]) ** 2 + (self.cy - origin[1]) ** 2
+                                      + (self.cz - origin[2]) ** 2) - self.radius <= max_range)
+        if len(near) == 0:
+            return np.full(r, np.inf), np.full(r, -1)
+
+        c, s = self.c[near], self.s[near]
+        px, py, pz = origin[0] - self.cx[near], origin[1] - self.cy[near], origin[2] - self.cz[near]
+        lo = np.stack([px * c - py * s, px * s + py * c, pz])                      # (3,B)
+        dx, dy, dz = dirs[:, 0:1], dirs[:, 1:2], dirs[:, 2:3]
+        ld = np.stack([dx * c - dy * s, dx * s + dy * c, np.broadcast_to(dz, (r, len(near)))])  # (3,R,B)
+        ext = np.stack([self.ex[near], self.ey[near], self.ez[near]])              # (3,B)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t1 = (-ext[:, None, :] - lo[:, None, :]) / ld
+            t2 = (ext[:, None, :] - lo[:, None, :]) / ld
+        parallel = ld == 0
+        inside = np.abs(lo)[:, None, :] <= ext[:, None, :]
+        tmin_ax = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+        tmax_ax = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+        tmin = tmin_ax.max(axis=0)
+        tmax = tmax_ax.min(axis=0)
+
+        # strict: a ray leaving a surface it starts on is not a hit
+        hit = (tmax > np.maximum(tmin, 0.0)) & (tmin <= max_range)
+        dist = np.where(hit, np.maximum(tmin, 0.0), np.inf)
+        k = dist.argmin(axis=1)
+        best = dist[np.arange(r), k]
+        return best, np.where(np.isfinite(best), near[k], -1)
+
+    def first_hit_on_path(self, points):
+        """(distance along the polyline, box index) of the first box entered, or (inf, -1)."""
+        run = 0.0
+        for a, b in zip(points[:-1], points[1:]):
+            seg = float(np.linalg.norm(b - a))
+            if seg > 0:
+                d, k = self.raycast(a, ((b - a) / seg)[None, :], seg)
+                if np.isfinite(d[0]):
+                    return run + float(d[0]), int(k[0])
+            run += seg
+        return math.inf, -1
+
+
+class Vehicle:
+    def __init__(self, name, spawn):
+        self.name = name
+        self.spawn = np.asarray(spawn, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self.rest = self.spawn.copy()
+        self.motion = None
+        self.motion_id = 0
+        self.api_control = False
+        self.armed = False
+        self.collision = None        # (t, box name, world xyz) once hit, sticky
+        self.pending_hit = None      # (t, box name, world xyz) of the running motion
+
+
+class HeadlessWorld:
+    """
+    Pure-Python kinematic stand-in for the Unreal / Cesium scene.
+
+    Scene file (JSON, NED meters unless a box uses the zones.json cm format):
+        {"vehicles": {"Drone1": [x, y, z]},          spawn, = each vehicle's API origin
+         "actors":   {"Actor_1": [x, y, z], ...},   world positions for simGetObjectPose
+         "boxes":    [zone entries as in zones.json],   buildings: LiDAR and collisions
+         "ground_z_m": 0.0,                          optional ground plane for LiDAR
+         "lidars":   {"LidarFront": {"vehicle": "Drone1", "range_m": 50, ...}}}
+
+    Every client from client() shares this world, so threads and several
+    connections see the same state. Motions are analytic (trapezoid profile
+    along the commanded polyline), so results do not depend on the time scale.
+    """
+
+    def __init__(self, scene=None, time_scale=DEFAULT_TIME_SCALE, seed=SEED):
+        scene = scene or {}
+        self.clock = SimClock(time_scale)
+        self.seed = seed
+        self.actors = {k: np.asarray(v, dtype=np.float64) for k, v in scene.get("actors", {}).items()}
+        zones = [zone_from_dict(d) for d in scene.get("boxes", [])]
+        if any(not isinstance(z, OrientedBoxZone) for z in zones):
+            raise ValueError("headless_sim only supports box obstacles")
+        self.boxes = Boxes(zones)
+        self.ground_z = scene.get("ground_z_m")
+        self.lidars = {k: dict(DEFAULT_LIDAR, **v) for k, v in scene.get("lidars", {}).items()}
+        self.vehicles = {k: Vehicle(k, v) for k, v in scene.get("vehicles", {"Drone1": [0, 0, 0]}).items()}
+        self.log = []
+        self.rpc_count = 0
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._scans = 0
+
+    @classmethod
+    def load(cls, path=DEFAULT_SCENE, time_scale=DEFAULT_TIME_SCALE, seed=SEED):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), time_scale, seed)
+
+    def client(self, *args, **kwargs):
+        """Client factory, accepts (and ignores) MultirotorClient's ip/port arguments."""
+        return rpc_trace.wrap(HeadlessClient(self))
+
+    def reset(self):
+        with self._lock:
+            for v in self.vehicles.values():
+                v.reset()
+            self.log.clear()
+            self.rpc_count = 0
+            self._scans = 0
+            self.clock = SimClock(self.clock.scale)
+
+    # ---------- vehicle state ----------
+
+    def vehicle(self, name):
+        if not name:
+            name = next(iter(self.vehicles))
+        try:
+            return self.vehicles[name]
+        except KeyError:
+            raise ValueError(f"Vehicle '{name}' is not in the scene") from None
+
+    def _settle(self, v, now):
+        """Finish the running motion if its end time has passed and record collisions."""
+        m = v.motion
+        if m is None:
+            return
+        if v.pending_hit is not None and now >= v.pending_hit[0] and v.collision is None:
+            v.collision = v.pending_hit
+        if now >= m.t_end:
+            v.rest = m.position(m.t_end)
+            v.motion = None
+
+    def position(self, v, now=None):
+        now = self.clock.now() if now is None else now
+        self._settle(v, now)
+        return v.motion.position(now) if v.motion is not None else v.rest.copy()
+
+    def command(self, v, points_world, speed, timeout_s=math.inf, vehicle_accel=MAX_ACCEL_MPS2):
+        """Replace the vehicle's motion with a new polyline starting at its current position."""
+        with self._lock:
+            now = self.clock.now()
+            start = self.position(v, now)
+            pts = np.vstack([start, np.asarray(points_world, dtype=np.float64).reshape(-1, 3)])
+            stop_s, k = self.boxes.first_hit_on_path(pts)
+            m = Motion(pts, speed, now, vehicle_accel, timeout_s, stop_s)
+            v.pending_hit = None
+            if k >= 0:
+                v.pending_hit = (m.t_end, self.boxes.boxes[k].name, m.position(m.t_end))
+            v.motion = m
+            v.motion_id += 1
+            self._changed.notify_all()
+            return SimFuture(self, v, v.motion_id, m.t_end)
+
+    def set_boxes(self, zones):
+        """Replace the obstacles (e.g. one that moves away); running motions are re-checked against them."""
+        with self._lock:
+            now = self.clock.now()
+            self.boxes = Boxes(zones)
+            for v in self.vehicles.values():
+                self._settle(v, now)
+                m = v.motion
+                if m is None:
+                    continue
+                # same profile from the same start, only the collision cut-off changes
+                stop_s, k = self.boxes.first_hit_on_path(m.points)
+                v.motion = Motion(m.points, m.speed, m.t0, m.accel, m.timeout_s, stop_s)
+                v.pending_hit = None
+                if k >= 0:
+                    v.pending_hit = (v.motion.t_end, self.boxes.boxes[k].name, v.motion.position(v.motion.t_end))
+            self._changed.notify_all()
+
+    def stop(self, v):
+        with self._lock:
+            now = self.clock.now()
+            v.rest = self.position(v, now)
+            if v.pending_hit is not None and now >= v.pending_hit[0] and v.collision is None:
+                v.collision = v.pending_hit
+            v.motion = None
+            v.pending_hit = None
+            v.motion_id += 1
+            self._changed.notify_all()
+
+    def wait(self, v, motion_id, t_end):
+        """Block until the motion ends (sim time) or is replaced / cancelled."""
+        if self.clock.instant:
+            with self._lock:
+                if v.motion_id == motion_id:
+                    t_end = v.motion.t_end if v.motion is not None else t_end
+                    self.clock.advance_to(t_end)
+                    self._settle(v, t_end)
+            return
+        with self._changed:
+            while v.motion_id == motion_id:
+                if v.motion is not None:
+                    t_end = v.motion.t_end   # set_boxes may have moved it
+                left = t_end - self.clock.now()
+                if left <= 0:
+                    self._settle(v, self.clock.now())
+                    return
+                self._changed.wait(self.clock.real_timeout(left))
+
+    # ---------- sensors ----------
+
+    def lidar_scan(self, v, cfg):
+        """Synthetic LiDAR hits in the sensor frame (x forward, y right, z down; yaw is always 0)."""
+        origin = self.position(v) + np.asarray(cfg.get("offset_m", (0.0, 0.0, 0.0)), dtype=np.float64)
+        el = np.radians(np.linspace(cfg["vfov_deg"][0], cfg["vfov_deg"][1], int(cfg["channels"])))
+        az = np.radians(np.linspace(cfg["hfov_deg"][0], cfg["hfov_deg"][1], int(cfg["points_per_channel"]),
+                                    endpoint=False))
+        el, az = np.meshgrid(el, az, indexing="ij")
+        # positive elevation looks up, i.e. towards negative z in NED
+        dirs = np.column_stack([(np.cos(el) * np.cos(az)).ravel(), (np.cos(el) * np.sin(az)).ravel(),
+                                (-np.sin(el)).ravel()])
+        rng_m = float(cfg["range_m"])
+        dist, _ = self.boxes.raycast(origin, dirs, rng_m)
+
+        if self.ground_z is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                tg = (self.ground_z - origin[2]) / dirs[:, 2]
+            tg = np.where((dirs[:, 2] > 0) & (tg >= 0), tg, np.inf)
+            dist = np.minimum(dist, tg)
+
+        keep = dist <= rng_m
+        pts = dirs[keep] * dist[keep, None]
+        if cfg["noise_m"] > 0:
+            self._scans += 1
+            rng = np.random.default_rng((self.seed, self._scans))
+            pts = pts + rng.normal(0.0, cfg["noise_m"], size=pts.shape)
+        return pts.astype(np.float32)
+
+
+class SimFuture:
+    """What the *Async calls return; join() waits in simulated time."""
+
+    def __init__(self, world, vehicle, motion_id, t_end):
+        self._world = world
+        self._vehicle = vehicle
+        self._motion_id = motion_id
+        self._t_end = t_end
+
+    def join(self):
+        self._world.wait(self._vehicle, self._motion_id, self._t_end)
+
+
+class _Done:
+    def join(self):
+        pass
+
+
+def _vec(p):
+    return airsim.Vector3r(float(p[0]), float(p[1]), float(p[2]))
+
+
+class HeadlessClient:
+    """
+    The MultirotorClient subset the mission scripts use, backed by a HeadlessWorld.
+    Positions in and out are in each vehicle's API frame (world minus spawn),
+    simGetObjectPose answers in world coordinates, as AirSim does.
+    """
+
+    def __init__(self, world):
+        self.world = world
+
+    def __getattr__(self, name):
+        raise AttributeError(f"MultirotorClient.{name} is not emulated by headless_sim")
+
+    def _v(self, vehicle_name):
+        self.world.rpc_count += 1
+        return self.world.vehicle(vehicle_name)
+
+    # ---------- connection / control ----------
+
+    def confirmConnection(self):
+        self.world.rpc_count += 1
+
+    def ping(self):
+        return True
+
+    def getClientVersion(self):
+        return HEADLESS_VERSION
+
+    def getServerVersion(self):
+        return HEADLESS_VERSION
+
+    def enableApiControl(self, is_enabled, vehicle_name=""):
+        self._v(vehicle_name).api_control = bool(is_enabled)
+
+    def isApiControlEnabled(self, vehicle_name=""):
+        return self._v(vehicle_name).api_control
+
+    def armDisarm(self, arm, vehicle_name=""):
+        self._v(vehicle_name).armed = bool(arm)
+        return True
+
+    def cancelLastTask(self, vehicle_name=""):
+        self.world.stop(self._v(vehicle_name))
+
+    # ---------- motion ----------
+
+    def takeoffAsync(self, timeout_sec=20, vehicle_name=""):
+        v = self._v(vehicle_name)
+        p = self.world.position(v)
+        target = (p[0], p[1], min(p[2], v.spawn[2] - TAKEOFF_ALT_M))
+        return self.world.command(v, [target], TAKEOFF_SPEED_MPS, timeout_sec)
+
+    def landAsync(self, timeout_sec=60, vehicle_name=""):
+        v = self._v(vehicle_name)
+        p = self.world.position(v)
+        return self.world.command(v, [(p[0], p[1], v.spawn[2])], LAND_SPEED_MPS, timeout_sec)
+
+    def hoverAsync(self, vehicle_name=""):
+        self.world.stop(self._v(vehicle_name))
+        return _Done()
+
+    def moveToPositionAsync(self, x, y, z, velocity, timeout_sec=3e+38, drivetrain=0, yaw_mode=None,
+                            lookahead=-1, adaptive_lookahead=1, vehicle_name=""):
+        v = self._v(vehicle_name)
+        return self.world.command(v, [v.spawn + (x, y, z)], velocity, timeout_sec)
+
+    def moveToZAsync(self, z, velocity, timeout_sec=3e+38, yaw_mode=None, lookahead=-1, adaptive_lookahead=1,
+                     vehicle_name=""):
+        v = self._v(vehicle_name)
+        p = self.world.position(v)
+        return self.world.command(v, [(p[0], p[1], v.spawn[2] + z)], velocity, timeout_sec)
+
+    def moveOnPathAsync(self, path, velocity, timeout_sec=3e+38, drivetrain=0, yaw_mode=None, lookahead=-1,
+                        adaptive_lookahead=1, vehicle_name=""):
+        v = self._v(vehicle_name)
+        pts = [v.spawn + (p.x_val, p.y_val, p.z_val) for p in path]
+        return self.world.command(v, pts, velocity, timeout_sec)
+
+    # ---------- state / poses / sensors ----------
+
+    def getMultirotorState(self, vehicle_name=""):
+        v = self._v(vehicle_name)
+        w = self.world
+        with w._lock:
+            now = w.clock.now()
+            p = w.position(v, now) - v.spawn
+            vel = v.motion.velocity(now) if v.motion is not None else np.zeros(3)
+
+        state = airsim.MultirotorState()
+        k = airsim.KinematicsState()
+        k.position = _vec(p)
+        k.orientation = airsim.Quaternionr()
+        k.linear_velocity = _vec(vel)
+        k.angular_velocity = airsim.Vector3r()
+        k.linear_acceleration = airsim.Vector3r()
+        k.angular_acceleration = airsim.Vector3r()
+        state.kinematics_estimated = k
+        c = airsim.CollisionInfo()
+        c.has_collided = v.collision is not None
+        if v.collision is not None:
+            c.object_name = v.collision[1]
+            c.position = _vec(v.collision[2])
+            c.time_stamp = int(v.collision[0] * 1e9)
+        state.collision = c
+        state.timestamp = int(now * 1e9)
+        landed = v.motion is None and p[2] >= -0.05
+        state.landed_state = airsim.LandedState.Landed if landed else airsim.LandedState.Flying
+        return state
+
+    def simGetVehiclePose(self, vehicle_name=""):
+        v = self._v(vehicle_name)
+        return airsim.Pose(_vec(self.world.position(v) - v.spawn), airsim.Quaternionr())
+
+    def simGetObjectPose(self, object_name):
+        self.world.rpc_count += 1
+        w = self.world
+        if object_name in w.actors:
+            return airsim.Pose(_vec(w.actors[object_name]), airsim.Quaternionr())
+        if object_name in w.vehicles:
+            return airsim.Pose(_vec(w.position(w.vehicles[object_name])), airsim.Quaternionr())
+        # unknown actors come back as a NaN pose, not an error
+        nan = airsim.Vector3r(math.nan, math.nan, math.nan)
+        return airsim.Pose(nan, airsim.Quaternionr(math.nan, math.nan, math.nan, math.nan))
+
+    def getLidarData(self, lidar_name="", vehicle_name=""):
+        w = self.world
+        cfg = w.lidars.get(lidar_name, DEFAULT_LIDAR)
+        v = self._v(cfg.get("vehicle", vehicle_name))
+        with w._lock:
+            now = w.clock.now()
+            pts = w.lidar_scan(v, cfg)
+            pose = airsim.Pose(_vec(w.position(v, now) - v.spawn), airsim.Quaternionr())
+        data = airsim.LidarData()
+        data.point_cloud = pts.ravel().tolist()
+        data.time_stamp = int(now * 1e9)
+        data.pose = pose
+        data.segmentation = []
+        return data
+
+    def simPrintLogMessage(self, message, message_param="", severity=0):
+        self.world.rpc_count += 1
+        self.world.log.append((self.world.clock.now(), message, message_param, severity))
+
+
+@contextlib.contextmanager
+def _swapped(pairs):
+    old = [(obj, name, getattr(obj, name)) for obj, name, _ in pairs]
+    try:
+        for obj, name, value in pairs:
+            setattr(obj, name, value)
+        yield
+    finally:
+        for obj, name, value in old:
+            setattr(obj, name, value)
+
+
+def sim_time_modules(world, modules=()):
+    """
+    Context manager: inside it, `time` (and `asyncio` where imported) of the
+    given modules plus the shared mission helpers run on the world's clock,
+    and so do the waits of the sensor_stream / telemetry polling threads.
+    """
+    import dwell
+    import guarded_move
+    import path_executor
+    import phases
+    import sensor_stream
+    import telemetry
+
+    clock_time = SimTime(world.clock)
+    clock_asyncio = SimAsyncio(world.clock)
+    pairs = []
+    for mod in {*modules, dwell, guarded_move, path_executor, phases, sensor_stream, telemetry}:
+        if getattr(mod, "time", None) is time:
+            pairs.append((mod, "time", clock_time))
+        if getattr(mod, "asyncio", None) is asyncio:
+            pairs.append((mod, "asyncio", clock_asyncio))
+        if getattr(mod, "wait_event", None) is sensor_stream.wait_event:
+            pairs.append((mod, "wait_event", world.clock.wait_event))
+    return _swapped(pairs)
+
+
+def run_mission(module, world, **main_kwargs):
+    """Run module.main() headless; returns the world for inspection."""
+    with sim_time_modules(world, [module]):
+        module.main(client_factory=world.client, level_name=None, **main_kwargs)
+    return world
+
+
+def summary(world):
+    out = {"sim_s": world.clock.now(), "rpc_calls": world.rpc_count, "log_messages": len(world.log)}
+    for name, v in world.vehicles.items():
+        p = world.position(v) - v.spawn
+        out[name] = {"position": [round(float(x), 3) for x in p],
+                     "collision": v.collision[1] if v.collision is not None else None}
+    return out
+
+
+def main():
+    import importlib
+
+    scripts = sys.argv[1:] or ["waypoint", "waypoint2", "waypoint3"]
+    for script in scripts:
+        # a mission file (mission_schema.py) runs on mission_engine
+        mission_file = script.lower().endswith((".json", ".yaml", ".yml"))
+        module = importlib.import_module("mission_engine" if mission_file else script)
+        world = HeadlessWorld.load(DEFAULT_SCENE)
+        t0 = time.perf_counter()
+        run_mission(module, world, **({"mission_path": script} if mission_file else {}))
+        wall = time.perf_counter() - t0
+        s = summary(world)
+        print(f"\n[headless] {script}: {s['sim_s']:.0f}s simulated in {wall:.2f}s wall "
+              f"({s['sim_s'] / wall:.0f}x), {s['rpc_calls']} RPCs, {s['log_messages']} log messages")
+        for name, v in world.vehicles.items():
+            print(f"  {name}: {s[name]}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""
+Mission benchmark: runs the reference missions and reports mission time,
+per-phase timings (connect, poses, takeoff, climb, safety, plan, flight,
+dwell, ...), RPC counts and p50/p95/p99 call latency. Results are written as
+JSON and compared against a previous run, so regressions between versions
+show up as a non-zero exit code.
+
+    python mission_bench.py                                  # headless, all missions
+    python mission_bench.py --out new.json --baseline old.json
+    python mission_bench.py --live waypoint2                 # against the running simulator
+
+Headless runs (headless_sim) repeat the same simulated time and RPC counts
+(the asyncio mission within a few %, its threads race the jumping clock);
+wall time and latency measure the Python side only. The connections of
+SensorStream pollers and the telemetry recorder poll at a wall-clock rate, so
+their calls are reported as "stream_calls"; the state reads a mission falls
+back to when its stream sample is stale depend on the same race. Only the
+other calls ("gated_calls": commands, poses, setup) are compared against the
+baseline. Live runs reset the
+simulator before every mission.
+"""
+import argparse
+import contextlib
+import datetime
+import importlib
+import io
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from headless_sim import DEFAULT_SCENE, HeadlessWorld, sim_time_modules
+from phases import PHASES
+from rpc_counter import CountingClient
+from sensor_stream import SensorPoller
+
+MISSIONS = ["waypoint", "waypoint2", "waypoint3"]
+REPEATS = 3
+TIME_SCALE = math.inf      # headless: no waiting, the sim clock jumps
+PERCENTILES = (50, 95, 99)
+RESULTS_VERSION = 2         # 2: rpc.gated_calls / rpc.stream_calls
+
+# allowed growth over the baseline before a metric counts as a regression
+SIM_TOLERANCE = 0.05       # headless mission / phase time and RPC counts (asyncio missions jitter a few %)
+WALL_TOLERANCE = 0.25      # wall time, and every timing of a live run
+LATENCY_TOLERANCE = 0.5    # RPC latency percentiles
+WALL_FLOOR_S = 0.05        # differences below these are noise, never regressions
+LATENCY_FLOOR_MS = 0.5      # a headless call takes ~0.01-0.5 ms; its p99 is one scheduler hiccup
+STREAMED_METHODS = ("getMultirotorState", "getLidarData")   # served by SensorStream when it is fresh
+
+
+def latency_stats(samples_s):
+    ms = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    out = {"count": int(ms.size)}
+    for p, v in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        out[f"p{p}_ms"] = round(float(v), 4)
+    return out
+
+
+def _background_connection():
+    """True when the client is being opened by a poller thread (SensorStream, telemetry)."""
+    thread = threading.current_thread()
+    return isinstance(thread, SensorPoller) or thread.name == "telemetry"
+
+
+def run_once(module, live=False, time_scale=TIME_SCALE, scene=DEFAULT_SCENE, quiet=True):
+    """Run module.main() once; returns the raw measurements of that run."""
+    counts = Counter()
+    latency = {}
+    stream_counts = Counter()
+    PHASES.reset()
+
+    if live:
+        import cosysairsim as airsim
+        base_factory = airsim.MultirotorClient
+        base_factory().reset()
+        world = None
+    else:
+        world = HeadlessWorld.load(scene, time_scale)
+        base_factory = world.client
+
+    def factory(*args, **kwargs):
+        # pollers call as often as the wall clock lets them: counted apart, without latency
+        if _background_connection():
+            return CountingClient(base_factory(*args, **kwargs), stream_counts)
+        return CountingClient(base_factory(*args, **kwargs), counts, latency)
+
+    out = io.StringIO() if quiet else sys.stdout
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        if live:
+            module.main(client_factory=factory)
+        else:
+            with sim_time_modules(world, [module]):
+                module.main(client_factory=factory, level_name=None)
+    wall_s = time.perf_counter() - t0
+
+    return {
+        "mission_s": world.clock.now() if world is not None else wall_s,
+        "wall_s": wall_s,
+        "phases": PHASES.summary(),
+        "counts": counts,
+        "latency": latency,
+        "stream_counts": stream_counts,
+        "collisions": sum(v.collision is not None for v in world.vehicles.values()) if world is not None else None,
+    }
+
+
+def bench_mission(name, repeats=REPEATS, **kwargs):
+    """Run one mission `repeats` times: medians of the timings, latency percentiles over all calls."""
+    module = importlib.import_module(name)
+    runs = [run_once(module, **kwargs) for _ in range(repeats)]
+
+    phases = {}
+    for phase_name in runs[0]["phases"]:
+        per_run = [r["phases"].get(phase_name) for r in runs if phase_name in r["phases"]]
+        phases[phase_name] = {
+            "count": per_run[0]["count"],
+            "total_s": round(statistics.median(p["total_s"] for p in per_run), 4),
+            "max_s": round(statistics.median(p["max_s"] for p in per_run), 4),
+            "wall_s": round(statistics.median(p["wall_s"] for p in per_run), 4),
+        }
+
+    methods = sorted({m for r in runs for m in r["counts"]})
+    by_method = {}
+    all_samples = []
+    for m in methods:
+        samples = [s for r in runs for s in r["latency"].get(m, ())]
+        all_samples += samples
+        by_method[m] = dict(latency_stats(samples), calls=statistics.median(r["counts"][m] for r in runs))
+
+    return {
+        "mission_s": round(statistics.median(r["mission_s"] for r in runs), 4),
+        "wall_s": round(statistics.median(r["wall_s"] for r in runs), 4),
+        "wall_min_s": round(min(r["wall_s"] for r in runs), 4),
+        "collisions": runs[0]["collisions"],
+        "phases": phases,
+        "rpc": {
+            "calls": statistics.median(sum(r["counts"].values()) for r in runs),
+            "gated_calls": statistics.median(
+                sum(n for m, n in r["counts"].items() if m not in STREAMED_METHODS) for r in runs
+            ),
+            "latency": latency_stats(all_samples) if all_samples else None,
+            "by_method": by_method,
+            "stream_calls": statistics.median(sum(r["stream_counts"].values()) for r in runs),
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_bench(missions=MISSIONS, repeats=REPEATS, live=False, time_scale=TIME_SCALE, scene=DEFAULT_SCENE,
+              quiet=True):
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "target": "live" if live else "headless",
+        "time_scale": None if live else (None if math.isinf(time_scale) else time_scale),
+        "scene": None if live else scene,
+        "repeats": repeats,
+        "missions": {},
+    }
+    for name in missions:
+        results["missions"][name] = bench_mission(
+            name, repeats, live=live, time_scale=time_scale, scene=scene, quiet=quiet
+        )
+    return results
+
+
+def _check(regressions, label, old, new, tolerance, floor=0.0):
+    if old is None or new is None:
+        return
+    if new > old * (1.0 + tolerance) and new - old > floor:
+        regressions.append(f"{label}: {old:g} -> {new:g} (+{(new / old - 1) * 100 if old else math.inf:.0f}%)")
+
+
+def compare(baseline, current):
+    """List of regressions of `current` against `baseline` (both run_bench() results)."""
+    if baseline.get("target") != current.get("target") or baseline.get("scene") != current.get("scene"):
+        print(f"[bench] baseline is {baseline.get('target')} / {baseline.get('scene')}, "
+              f"not comparable with {current.get('target')} / {current.get('scene')}")
+        return []
+
+    timing_tol = SIM_TOLERANCE if current["target"] == "headless" else WALL_TOLERANCE
+    same_counts = baseline.get("version") == current.get("version")
+    if not same_counts:
+        print(f"[bench] baseline is results version {baseline.get('version')}, RPC counts not compared")
+    regressions = []
+    for name, new in current["missions"].items():
+        old = baseline["missions"].get(name)
+        if old is None:
+            continue
+        _check(regressions, f"{name} mission_s", old["mission_s"], new["mission_s"], timing_tol, WALL_FLOOR_S)
+        _check(regressions, f"{name} wall_s", old["wall_s"], new["wall_s"], WALL_TOLERANCE, WALL_FLOOR_S)
+        if same_counts:
+            _check(regressions, f"{name} rpc calls", old["rpc"]["gated_calls"], new["rpc"]["gated_calls"],
+                   SIM_TOLERANCE)
+        if (new["collisions"] or 0) > (old["collisions"] or 0):
+            regressions.append(f"{name} collisions: {old['collisions']} -> {new['collisions']}")
+
+        for phase_name, p in new["phases"].items():
+            q = old["phases"].get(phase_name)
+            if q is not None:
+                _check(regressions, f"{name} phase {phase_name}", q["total_s"], p["total_s"], timing_tol,
+                       WALL_FLOOR_S)
+
+        old_lat, new_lat = old["rpc"]["latency"], new["rpc"]["latency"]
+        if old_lat and new_lat:
+            for p in PERCENTILES:
+                key = f"p{p}_ms"
+                _check(regressions, f"{name} rpc {key}", old_lat[key], new_lat[key], LATENCY_TOLERANCE,
+                       LATENCY_FLOOR_MS)
+    return regressions
+
+
+def print_results(results):
+    print(f"\n[bench] {results['target']} ({results['git']}), {results['repeats']} run(s) per mission")
+    for name, r in results["missions"].items():
+        lat = r["rpc"]["latency"] or {}
+        print(f"\n{name}: {r['mission_s']:.1f}s mission, {r['wall_s']:.3f}s wall, {r['rpc']['calls']:.0f} RPCs "
+              f"(+{r['rpc']['stream_calls']:.0f} streamed) "
+              f"(p50 {lat.get('p50_ms', 0):.3f} / p95 {lat.get('p95_ms', 0):.3f} / p99 {lat.get('p99_ms', 0):.3f} ms)"
+              + (f", {r['collisions']} collision(s)" if r["collisions"] else ""))
+        for phase_name, p in r["phases"].items():
+            print(f"  {phase_name:<10} x{p['count']:<4} {p['total_s']:8.2f}s  (max {p['max_s']:.2f}s, "
+                  f"wall {p['wall_s'] * 1000:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("missions", nargs="*", default=MISSIONS)
+    parser.add_argument("--live", action="store_true", help="run against the simulator instead of headless_sim")
+    parser.add_argument("--repeats", type=int, default=None)
+    parser.add_argument("--time-scale", type=float, default=TIME_SCALE)
+    parser.add_argument("--scene", default=DEFAULT_SCENE)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file; exit 1 on regressions")
+    parser.add_argument("--verbose", action="store_true", help="show the missions' own output")
+    args = parser.parse_args()
+
+    repeats = args.repeats or (1 if args.live else REPEATS)
+    results = run_bench(args.missions, repeats, args.live, args.time_scale, args.scene, quiet=not args.verbose)
+    print_results(results)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[bench] results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results)
+        if regressions:
+            print(f"\n[bench] {len(regressions)} regression(s) against {args.baseline}:")
+            for r in regressions:
+                print(f"  {r}")
+            sys.exit(1)
+        print(f"\n[bench] no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
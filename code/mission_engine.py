@@ -0,0 +1,449 @@
+"""
+Runs any mission file (mission_schema.py) the way waypoint3 runs its own
+constants: asyncio client, takeoff while the actor poses load, SAFE_Z climb
+(or per-leg corridor altitudes, altitude_planner.py),
+decide_leg per leg (detour or hold), blended path or stop-and-go legs, the
+zone / LiDAR watchers, and per-waypoint actions (actions.py).
+
+    python mission_engine.py missions/waypoint3.json
+    python headless_sim.py missions/waypoint2.json
+
+While the actions of a stop run, the next leg is already checked (and a
+detour planned) in a worker thread; on departure that decision is reused if
+the drone is where the check assumed and its first segment is still clear.
+
+The mission file is checked for changes before every leg; an edited file is
+recompiled and its zones, planner, speeds and hold settings take effect from
+the next leg on (the waypoint list of a running mission is kept).
+
+Before arming, the whole route is checked by preflight.py; with
+"preflight": "reject" (default) a mission that cannot finish never takes off.
+
+With AIRSIM_TELEMETRY_DIR (or TELEMETRY_DIR) set, the flight is recorded
+like waypoint3's (telemetry.py) and can be checked with replay.py.
+"""
+import cosysairsim as airsim
+import asyncio
+import math
+import sys
+import time
+from collections import Counter
+
+import actions
+from aio_client import AsyncMultirotorClient, guarded
+from altitude_planner import AltitudePlanner
+from dwell import dwell
+from guarded_move import GuardedMove
+from mission_schema import MissionError, describe, load_mission, mission_changed
+from obstacle_detect import blocked_ahead
+from path_executor import PathExecutor
+from phases import phase, timed
+from pose_resolver import resolve_positions
+from preflight import check_route, print_report as print_preflight
+from route_order import reorder_waypoints
+from rpc_counter import CountingClient
+from safety import decide_leg, decision_kind
+from sensor_stream import SensorStream
+from speed_profile import SpeedPlanner, vertical_speed
+from telemetry import TelemetryRecorder, new_run_dir
+
+DEFAULT_MISSION = "missions/waypoint3.json"
+REFRESH_POSE_CACHE = False
+
+STATE_RATE_HZ = 20.0
+STATE_MAX_AGE_S = 0.2
+ZONE_WATCH_S = 0.1
+LIDAR_NAME = None       # e.g. "LidarFront"; None = no LiDAR watch
+LIDAR_WATCH_S = 0.2
+ALTITUDE_LIDAR = True   # with LIDAR_NAME and altitude "corridor": fuse a scan into the height field before each leg
+LIDAR_GUARD = True      # with LIDAR_NAME: slow down / brake and resume (guarded_move.py) instead of aborting
+PROGRESS_LOG_S = 2.0
+PREFETCH_MAX_OFFSET_M = 2.0   # a pre-checked leg is reused if the drone is this close to its assumed start
+TELEMETRY_DIR = None    # binary flight log (telemetry.py) per run; AIRSIM_TELEMETRY_DIR takes precedence
+TELEMETRY_RATE_HZ = 10.0
+
+
+class MissionRun:
+    """State of one running mission, handed to the actions."""
+
+    def __init__(self, aclient, mission, stream):
+        self.aclient = aclient
+        self.mission = mission
+        self.vehicle = mission.vehicle
+        self.stream = stream
+        self.roof_z = {}      # actor -> roof z (NED)
+        self.safe_z = None
+        self.altitudes = None  # AltitudePlanner with altitude "corridor"
+        self.executor = None
+        self.guard = None     # GuardedMove when LIDAR_NAME and LIDAR_GUARD are set
+        self.prefetch = None  # (start, target, zones, task) of the next leg, checked during the actions
+        self.prefetch_stats = {"hits": 0, "misses": 0}
+        self.decided_from = None  # start the last decide() was planned from (the prefetched one on a hit)
+        self.telemetry = None  # TelemetryRecorder while recording
+
+    def note(self, kind, **kwargs):
+        """Telemetry event (telemetry.EVENT_KINDS), if recording."""
+        if self.telemetry is not None:
+            self.telemetry.event(kind, **kwargs)
+
+    def refresh(self):
+        """Adopt an edited mission file (zones, planner, speeds, hold); keeps the running waypoint list."""
+        if not mission_changed(self.mission):
+            return
+        try:
+            new = load_mission(self.mission.source)
+        except (OSError, MissionError) as e:
+            print(f"[mission] changed file ignored, keeping {self.mission.digest}: {e}")
+            return
+        print(f"[mission] reloaded {new.name}: {self.mission.digest} -> {new.digest}")
+        self.mission = new
+        if self.telemetry is not None:
+            self.telemetry.set_safety(new.zones, new.planner, new.on_block == "detour")
+        if self.executor is not None:
+            self.executor.zones = new.zones
+            self.executor.speed_planner.zones = new.zones
+
+    def _decide(self, start, target, replan=None):
+        """
+        (climb, target, decision); with corridor altitudes a detour may raise the target.
+        replan=None follows the mission's on_block; False never plans a detour (previews).
+        """
+        if replan is None:
+            replan = self.mission.on_block == "detour"
+
+        def decide(s, t):
+            return decide_leg(s, t, self.mission.zones, self.mission.planner, replan=replan)
+
+        if self.altitudes is None:
+            return [], target, decide(start, target)
+        return self.altitudes.fit_leg(start, target, decide)
+
+    def start_prefetch(self, start, target):
+        """Check the leg start -> target in a worker thread (runs alongside the actions of a stop)."""
+        task = asyncio.ensure_future(asyncio.to_thread(self._decide, start, target))
+        self.prefetch = (start, target, self.mission.zones, task)
+
+    async def decide(self, start, target):
+        """(climb, target, decision) for the leg, reusing the pre-checked decision when it still applies."""
+        prefetch, self.prefetch = self.prefetch, None
+        self.decided_from = start
+        if prefetch is not None:
+            p_start, p_target, p_zones, task = prefetch
+            climb, fitted, decision = result = await task
+            first = (climb + decision.detour + [fitted])[0]
+            if (decision.action == "fly" and p_target == target and p_zones is self.mission.zones
+                    and math.dist(start, p_start) <= PREFETCH_MAX_OFFSET_M
+                    and not p_zones.leg_blocked(*start, *first)):
+                self.prefetch_stats["hits"] += 1
+                self.decided_from = p_start
+                return result
+            self.prefetch_stats["misses"] += 1
+        with phase("safety"):
+            return self._decide(start, target)
+
+    async def position(self):
+        """Newest streamed position if fresh enough, otherwise one getMultirotorState."""
+        state = self.stream.latest_value("state", max_age_s=STATE_MAX_AGE_S)
+        if state is None:
+            state = await self.aclient.getMultirotorState(vehicle_name=self.vehicle)
+        pos = state.kinematics_estimated.position
+        return pos.x_val, pos.y_val, pos.z_val
+
+    async def hover_wait(self, seconds):
+        with phase("dwell"):
+            return await self.aclient.motion(dwell, seconds, self.vehicle, self.stream,
+                                             until=self.aclient.cancelling.is_set)
+
+    async def hold(self, message):
+        """Hold at SAFE_Z for mission.hold_s so the zone can be seen."""
+        try:
+            await self.aclient.moveToZAsync(self.safe_z, self.mission.cruise.speed_mps, vehicle_name=self.vehicle)
+        except Exception as e:
+            print(f"[WARN] moveToZAsync failed: {e}")
+        print("Holding at SAFE_Z (no move).")
+        self.note("hold")
+        await self.aclient.simPrintLogMessage("Mission:", message, severity=1)
+        await self.hover_wait(self.mission.hold_s)
+
+    def _fly_legs(self, client, points, speed):
+        for x, y, z in points:
+            if self.aclient.cancelling.is_set():
+                break
+            client.moveToPositionAsync(x, y, z, speed.speed_mps, timeout_sec=speed.timeout_s,
+                                       vehicle_name=self.vehicle).join()
+        client.hoverAsync(vehicle_name=self.vehicle).join()
+
+    async def _watch_zones(self):
+        while True:
+            await asyncio.sleep(ZONE_WATCH_S)
+            x, y, z = await self.position()
+            if self.mission.zones.point_blocked(x, y, z):
+                return f"inside a no-fly zone at ({x:.1f}, {y:.1f}, {z:.1f})"
+
+    async def _watch_lidar(self):
+        while True:
+            await asyncio.sleep(LIDAR_WATCH_S)
+            report = await self.aclient.query(blocked_ahead, LIDAR_NAME, self.vehicle)
+            if report.blocked:
+                return f"LiDAR: {report.count} points ahead"
+
+    async def _log_progress(self, name, target):
+        t0 = time.monotonic()
+        while True:
+            await asyncio.sleep(PROGRESS_LOG_S)
+            pos = await self.position()
+            print(f"  {name}: {math.dist(pos, target):.1f} m to go ({time.monotonic() - t0:.0f}s)")
+
+    async def fly(self, points, name, speed):
+        """Fly through `points` with the watchers running; returns the abort reason or None."""
+        start = await self.position()
+        if self.telemetry is not None:
+            self.telemetry.set_target(*points[-1])
+        if self.guard is not None:
+            self.guard.executor = self.executor if self.mission.execution == "path" else None
+            motion = self.guard.fly(points, speed.speed_mps)
+        elif self.mission.execution == "path":
+            planned = speed.max_speed_mps is not None
+            motion = self.aclient.motion(lambda client: self.executor.fly(
+                start, points, speed.max_speed_mps if planned else speed.speed_mps,
+                cancelled=self.aclient.cancelling.is_set, plan=planned))
+        else:
+            motion = self.aclient.motion(self._fly_legs, points, speed)
+
+        watchers = [self._watch_zones(), self._log_progress(name, points[-1])]
+        if LIDAR_NAME is not None and self.guard is None:
+            watchers.append(self._watch_lidar())
+
+        with phase("flight"):
+            result, reason = await guarded(motion, *watchers)
+        if self.guard is not None and not reason:
+            reason = result   # the guard gave up on a path that stayed blocked
+        if reason:
+            self.note("abort", xyz=points[-1])
+            print(f"\n[ABORT] {name}: {reason}")
+            await self.aclient.simPrintLogMessage("Mission:", f"ABORTED: {reason}", severity=2)
+        return reason
+
+
+async def run_mission(aclient, mission, client_factory=airsim.MultirotorClient, level_name=None):
+    vehicle = mission.vehicle
+    names = [w.actor for w in mission.waypoints]
+    print(describe(mission))
+
+    with phase("connect"):
+        await aclient.confirmConnection()
+        print("Connected!")
+        print("Client Ver:", await aclient.getClientVersion(), "Server Ver:", await aclient.getServerVersion())
+
+    # poses, order and the pre-flight check all happen on the ground, before arming
+    with phase("poses"):
+        positions = await asyncio.to_thread(
+            resolve_positions, names, level_name=level_name, refresh=REFRESH_POSE_CACHE, client_factory=client_factory
+        )
+
+    stream = SensorStream(client_factory)
+    stream.add_state(vehicle, rate_hz=STATE_RATE_HZ)
+    run = MissionRun(aclient, mission, stream)
+    actions.ACTION_TIMES.reset()
+    run.roof_z = {name: xyz[2] for name, xyz in zip(names, positions.tolist())}
+
+    # (idx, name, x, y, z_roof, z_target) as in waypoint3, for route_order
+    waypoints = []
+    by_name = {w.actor: w for w in mission.waypoints}
+    print("\nReading waypoint roof positions:")
+    for w, (x, y, z_roof) in zip(mission.waypoints, positions.tolist()):
+        z_target = z_roof - w.roof_clearance_m
+        waypoints.append((w.index, w.actor, x, y, z_roof, z_target))
+        print(f"WP {w.index} ({w.actor}): x={x:.3f}, y={y:.3f}, roof_z={z_roof:.3f}, target_z={z_target:.3f}")
+
+    def flies(wp):
+        return all(actions.REGISTRY[a.name].flies for a in wp.actions)
+
+    alt = mission.altitude
+    if alt.mode in ("safe_z", "corridor"):
+        # corridor: SAFE_Z stays the altitude of holds and of the route order
+        run.safe_z = min(w[4] - by_name[w[1]].roof_clearance_m for w in waypoints) \
+            - (alt.extra_clearance_m + alt.safe_z_margin_m)
+        print(f"\nSAFE_Z computed: {run.safe_z:.3f} (NED; more negative = higher)")
+        climb_z = run.safe_z
+    else:
+        run.safe_z = math.inf
+        climb_z = waypoints[0][5]
+
+    sx, sy, _ = await run.position()
+    if mission.order.optimize:
+        with phase("order"):
+            waypoints, old_m, new_m = await asyncio.to_thread(
+                reorder_waypoints, waypoints, (sx, sy, climb_z), run.safe_z, mission.zones, mission.planner,
+                mission.order.fixed_tail, mission.order.time_budget_s
+            )
+        print(f"Waypoint order: {[w[1] for w in waypoints]} ({old_m:.0f} m -> {new_m:.0f} m)")
+
+    planned = waypoints
+    if alt.mode == "corridor":
+        run.altitudes = AltitudePlanner.from_waypoints(
+            waypoints, max(w.roof_clearance_m for w in mission.waypoints) + alt.extra_clearance_m, alt.safe_z_margin_m)
+        planned = run.altitudes.route(waypoints, (sx, sy))
+        climb_z = planned[0][5]
+    cruise_z = {w[1]: w[5] for w in planned}
+
+    if mission.preflight != "off":
+        with phase("preflight"):
+            report = check_route(planned, (sx, sy), run.safe_z if run.altitudes is None else math.inf,
+                                 mission.zones, mission.planner, replan=mission.on_block == "detour",
+                                 preview={w.actor for w in mission.waypoints if not flies(w)},
+                                 altitudes=run.altitudes)
+        print_preflight(report)
+        if not report.ok and mission.preflight == "reject":
+            print("\nMission rejected before arming.")
+            await aclient.simPrintLogMessage("Mission:", "REJECTED (PREFLIGHT)", severity=2)
+            return
+
+    await aclient.enableApiControl(True, vehicle_name=vehicle)
+    await aclient.armDisarm(True, vehicle_name=vehicle)
+    print("\nTaking off...")
+    await timed("takeoff", aclient.takeoffAsync(vehicle_name=vehicle))
+    await asyncio.sleep(1.0)
+    stream.start()
+
+    run_dir = new_run_dir(TELEMETRY_DIR)
+    if run_dir is not None:
+        run.telemetry = TelemetryRecorder(
+            run_dir, vehicle, TELEMETRY_RATE_HZ, client_factory, stream, LIDAR_NAME, mission.zones,
+            planner=mission.planner, replan=mission.on_block == "detour"
+        ).start()
+        run.telemetry.set_altitudes(run.altitudes)   # target_of() applies SAFE_Z itself
+
+    print("\nClimbing...")
+    climb_speed = mission.cruise.speed_mps
+    if mission.cruise.max_speed_mps is not None:
+        climb_speed = vertical_speed(climb_z - (await run.position())[2], mission.cruise.max_speed_mps)
+    await timed("climb", aclient.moveToZAsync(climb_z, climb_speed, vehicle_name=vehicle))
+    await asyncio.sleep(0.5)
+    if alt.mode == "roof":
+        run.safe_z = climb_z   # holds stay at the cruise altitude
+
+    # building tops for the speed limits: the corridor planner's field, else the roofs alone
+    heights = (run.altitudes or AltitudePlanner.from_waypoints(waypoints)).heights
+    run.executor = PathExecutor(aclient.motion_client, vehicle, mission.cruise.speed_mps, zones=mission.zones,
+                                speed_planner=SpeedPlanner(mission.zones, heights=heights))
+    if LIDAR_NAME is not None and LIDAR_GUARD:
+        run.guard = GuardedMove(aclient, vehicle, LIDAR_NAME, run.executor)
+    pending = []  # path mode: vertices queued until the next stop
+
+    def target_of(w, start):
+        _, _, x, y, _, z_target = w
+        if run.altitudes is not None:
+            return x, y, min(z_target, cruise_z[w[1]], run.altitudes.leg_z(start, (x, y)))
+        return x, y, min(z_target, run.safe_z) if alt.mode == "safe_z" else z_target
+
+    last = (sx, sy, climb_z)  # where the previous leg ends
+
+    for i, w in enumerate(waypoints):
+        idx, name = w[0], w[1]
+        run.refresh()
+        wp = by_name[name]
+
+        if not flies(wp):
+            # e.g. inspect: runs from the last stop instead of flying there
+            if pending:
+                if await run.fly(pending, "last stop", wp.speed):
+                    await run.hover_wait(run.mission.hold_s)
+                    break
+                pending = []
+            await actions.run_actions(run, wp, target_of(w, last))
+            if any(actions.REGISTRY[a.name].ends_mission for a in wp.actions):
+                break
+            continue
+
+        start = pending[-1] if pending else await run.position()
+        if run.altitudes is not None and LIDAR_NAME is not None and ALTITUDE_LIDAR and not pending:
+            scan = await aclient.getLidarData(lidar_name=LIDAR_NAME, vehicle_name=vehicle)
+            run.altitudes.heights.add_scan(scan)
+            if run.telemetry is not None:
+                run.telemetry.height_scan(scan, leg=idx)
+        request = target_of(w, start)
+        climb, target, decision = await run.decide(start, request)
+        last = target
+        if run.telemetry is not None:
+            run.telemetry.event("leg_start", leg=idx, value=request[2], xyz=run.decided_from)
+            run.telemetry.set_target(*target, leg=idx, leg_blocked=decision.reason in ("detour", "no_route"))
+            run.note(decision_kind(decision), leg=idx, value=len(decision.detour), xyz=target)
+
+        if decision.reason == "target_forbidden":
+            await aclient.simPrintLogMessage("ForbiddenZone", f"TARGET FORBIDDEN: {name}", severity=2)
+            print(f"\nForbiddenZone: TARGET FORBIDDEN -> {name}")
+            await run.hold("HOLDING AT SAFE_Z (FORBIDDEN)")
+            break
+        if decision.reason in ("detour", "no_route"):
+            await aclient.simPrintLogMessage("ForbiddenZone", f"PATH FORBIDDEN to: {name}", severity=2)
+            print(f"\nForbiddenZone: PATH CROSSES FORBIDDEN -> {name}")
+            if decision.action == "hold":
+                await run.hold("HOLDING AT SAFE_Z (FORBIDDEN)")
+                break
+            print(f"Detour found: {len(decision.detour)} corner(s) in {run.mission.planner.last_stats['ms']:.1f} ms")
+            await aclient.simPrintLogMessage("ForbiddenZone", f"DETOUR to: {name}", severity=1)
+
+        print(f"\nFlying to WP {idx} ({name}) at z_cmd={target[2]:.3f}")
+        pending += climb + decision.detour + [target]
+        if not wp.actions:
+            continue
+        reason = await run.fly(pending, name, wp.speed)
+        pending = []
+        if reason:
+            await run.hover_wait(run.mission.hold_s)
+            break
+
+        nxt = waypoints[i + 1] if i + 1 < len(waypoints) else None
+        if nxt is not None and flies(by_name[nxt[1]]):
+            run.start_prefetch(target, target_of(nxt, target))
+        with phase("stop"), actions.ACTION_TIMES.phase(f"{name} stop"):
+            await actions.run_actions(run, wp, target)
+            if wp.dwell_s > 0:
+                await run.hover_wait(wp.dwell_s)
+        if any(actions.REGISTRY[a.name].ends_mission for a in wp.actions):
+            break
+    else:
+        if pending:
+            await run.fly(pending, "last stop", mission.cruise)
+
+    if run.prefetch is not None:
+        await asyncio.gather(run.prefetch[3], return_exceptions=True)
+    if run.executor.runs:
+        run.executor.print_report()
+    if run.guard is not None:
+        run.guard.print_report()
+    if run.altitudes is not None:
+        run.altitudes.print_report(run.safe_z)
+    actions.print_report()
+    hits, misses = run.prefetch_stats["hits"], run.prefetch_stats["misses"]
+    if hits + misses:
+        print(f"[pipeline] next leg checked during the actions: {hits}/{hits + misses} reused")
+    stream.print_stats()
+    stream.stop()
+    if run.telemetry is not None:
+        run.telemetry.stop()
+        print(f"Telemetry: {run.telemetry.rows} samples in {run.telemetry.run_dir}")
+
+    print("\nMission complete.")
+    await aclient.simPrintLogMessage("Mission:", "DONE", severity=2)
+    await aclient.hoverAsync(vehicle_name=vehicle)
+
+
+def main(mission_path=DEFAULT_MISSION, client_factory=airsim.MultirotorClient, level_name=""):
+    """level_name "" = the mission's "level"; None = no pose cache (headless_sim)."""
+    mission = load_mission(mission_path)
+    counts = Counter()
+    aclient = AsyncMultirotorClient(lambda: CountingClient(client_factory(), counts), vehicle_name=mission.vehicle)
+    try:
+        asyncio.run(run_mission(aclient, mission, client_factory,
+                                mission.level if level_name == "" else level_name))
+    except KeyboardInterrupt:
+        print("\nMission interrupted.")
+    finally:
+        aclient.close()
+        aclient.motion_client.print_counts()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MISSION)
\ No newline at end of file
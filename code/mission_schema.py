@@ -0,0 +1,440 @@
+"""
+Declarative mission files (JSON, or YAML when PyYAML is installed) for
+mission_engine.py, in place of the constants copied across waypoint*.py.
+
+    {
+      "name": "waypoint3",
+      "vehicle": "Drone1",
+      "level": "Genova",                                  # pose cache key (pose_resolver)
+      "speed_profiles": {"cruise": {"speed_mps": 8.0, "max_speed_mps": 15.0}, "slow": {"speed_mps": 3.0}},
+      "defaults": {"speed_profile": "cruise", "roof_clearance_m": 14.0, "dwell_s": 0.0},
+      "altitude": {"mode": "safe_z", "extra_clearance_m": 5.0, "safe_z_margin_m": 30.0},
+      "zones": [{"type": "box", "location_cm": [-14100, -9400, -50300], ...}],   # zone_index.zone_from_dict
+      "zones_file": "zones.json",                         # optional, relative to the mission file
+      "on_block": "detour",                               # "detour" | "hold"
+      "hold_s": 15.0,
+      "execution": "path",                                # "path" | "legs"
+      "preflight": "reject",                              # "reject" | "warn" | "off" (preflight.py)
+      "order": {"optimize": true, "fixed_tail": ["Actor_2", "Actor_4"], "time_budget_s": 0.5},
+      "plugins": ["my_actions"],                          # modules registering more actions
+      "actions": {"deliver": {"message": null}},          # default params per action
+      "waypoints": ["Actor_1", {"actor": "Actor_2", "action": "paint", "params": {"bounce_m": 0.5}}, ...]
+    }
+
+A waypoint is an actor name (deliver with the defaults) or an object with
+"actor", "action", "params", "speed_profile", "roof_clearance_m", "dwell_s".
+"action" is one action of actions.py (deliver | paint | inspect | ...), a
+list of them run in order (["paint", {"name": "deliver", "params": {...}}]),
+or "pass": flown through without stopping. "inspect" checks the leg to the
+waypoint without flying it, then holds and ends the mission. dwell_s is the
+hover after the actions of a stop. Params (per waypoint, or defaults per
+action under "actions") are checked against what the action declares
+(actions.register).
+
+A speed profile with "max_speed_mps" flies its legs at per-segment speeds
+up to that (speed_profile.py: faster on long clear segments, slower near
+zones and at tight turns); without it every leg is flown at "speed_mps".
+
+altitude.mode "safe_z" flies every stop at min(roof - clearance, SAFE_Z),
+SAFE_Z being above the highest roof (waypoint2/3); "roof" flies each stop at
+its own roof - clearance after climbing to the first one (waypoint.py);
+"corridor" flies each leg at the altitude of the roofs near it, with the same
+margins as SAFE_Z (altitude_planner.py).
+
+Every error of a file is reported at once (MissionError, one line per field
+path). A valid file is compiled once into a Mission: zones into a
+ZoneRegistry, the detour planner built, speed profiles resolved per waypoint.
+load_mission() caches by path and file stamp, so calling it again after the
+file changed hot-swaps the compiled mission without restarting Python.
+"""
+import hashlib
+import json
+import math
+import os
+from collections import namedtuple
+
+import actions
+from path_planner import DetourPlanner
+from zone_index import ZoneRegistry, zone_from_dict
+
+ALTITUDE_MODES = ("safe_z", "roof", "corridor")
+ON_BLOCK = ("detour", "hold")
+EXECUTION_MODES = ("path", "legs")
+PREFLIGHT_MODES = ("reject", "warn", "off")
+
+DEFAULT_SPEED_MPS = 8.0
+DEFAULT_TIMEOUT_S = 120.0
+DEFAULT_ROOF_CLEARANCE_M = 14.0
+DEFAULT_HOLD_S = 15.0
+DEFAULT_ORDER_BUDGET_S = 0.5
+
+# max_speed_mps: None = fly speed_mps everywhere, else the speed_profile.SpeedPlanner ceiling
+SpeedProfile = namedtuple("SpeedProfile", ["name", "speed_mps", "timeout_s", "max_speed_mps"])
+ActionSpec = namedtuple("ActionSpec", ["name", "params"])
+# actions: tuple of ActionSpec, empty = pass-through waypoint
+Waypoint = namedtuple("Waypoint", ["index", "actor", "actions", "speed", "roof_clearance_m", "dwell_s"])
+Altitude = namedtuple("Altitude", ["mode", "extra_clearance_m", "safe_z_margin_m"])
+Ordering = namedtuple("Ordering", ["optimize", "fixed_tail", "time_budget_s"])
+Mission = namedtuple("Mission", [
+    "name", "vehicle", "level", "waypoints", "speeds", "cruise", "altitude", "zones", "planner",
+    "on_block", "hold_s", "execution", "preflight", "order", "source", "digest",
+])
+
+_TOP_KEYS = {"name", "vehicle", "level", "speed_profiles", "defaults", "altitude", "zones", "zones_file",
+             "on_block", "hold_s", "execution", "preflight", "order", "plugins", "actions", "waypoints"}
+_WAYPOINT_KEYS = {"actor", "action", "params", "speed_profile", "roof_clearance_m", "dwell_s"}
+
+_CACHE = {}   # abs path -> ((mtime_ns, size), Mission)
+
+
+class MissionError(ValueError):
+    """A mission file that does not validate; .errors holds one "path: problem" line per error."""
+
+    def __init__(self, source, errors):
+        self.source = source
+        self.errors = list(errors)
+        super().__init__(f"{source}: {len(self.errors)} error(s)\n  " + "\n  ".join(self.errors))
+
+
+class _Checker:
+    """Collects every error instead of stopping at the first one."""
+
+    def __init__(self):
+        self.errors = []
+
+    def fail(self, path, msg):
+        self.errors.append(f"{path}: {msg}")
+
+    def get(self, d, key, path, kind, default=None, required=False):
+        if key not in d:
+            if required:
+                self.fail(f"{path}.{key}", "missing")
+            return default
+        value = d[key]
+        if kind is float:
+            ok = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+            value = float(value) if ok else value
+        else:
+            ok = isinstance(value, kind)
+        if not ok:
+            name = kind.__name__ if isinstance(kind, type) else "/".join(k.__name__ for k in kind)
+            self.fail(f"{path}.{key}", f"expected {'number' if kind is float else name}, got {value!r}")
+            return default
+        return value
+
+    def number(self, d, key, path, default, minimum=0.0):
+        value = self.get(d, key, path, float, default)
+        if isinstance(value, float) and value < minimum:
+            self.fail(f"{path}.{key}", f"must be >= {minimum:g}, got {value:g}")
+            return default
+        return value
+
+    def choice(self, d, key, path, choices, default):
+        value = self.get(d, key, path, str, default)
+        if value not in choices:
+            self.fail(f"{path}.{key}", f"must be one of {', '.join(choices)}, got {value!r}")
+            return default
+        return value
+
+    def unknown(self, d, allowed, path):
+        for key in sorted(set(d) - allowed):
+            self.fail(f"{path}.{key}", "unknown key")
+
+
+def read_mission_file(path):
+    """Parsed mission document (JSON, or YAML for .yaml / .yml)."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise MissionError(path, ["YAML mission files need PyYAML (pip install pyyaml)"]) from None
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise MissionError(path, [f"YAML: {e}"]) from None
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise MissionError(path, [f"JSON: {e}"]) from None
+
+
+def _compile_speeds(chk, doc):
+    speeds = {}
+    profiles = chk.get(doc, "speed_profiles", "mission", dict, {"cruise": {"speed_mps": DEFAULT_SPEED_MPS}})
+    for name, p in profiles.items():
+        path = f"mission.speed_profiles.{name}"
+        if not isinstance(p, dict):
+            chk.fail(path, f"expected object, got {p!r}")
+            continue
+        chk.unknown(p, {"speed_mps", "timeout_s", "max_speed_mps"}, path)
+        speed = chk.get(p, "speed_mps", path, float, DEFAULT_SPEED_MPS, required=True)
+        if isinstance(speed, float) and speed <= 0.0:
+            chk.fail(f"{path}.speed_mps", f"must be > 0, got {speed:g}")
+        timeout = chk.number(p, "timeout_s", path, DEFAULT_TIMEOUT_S)
+        max_speed = chk.get(p, "max_speed_mps", path, float)
+        if isinstance(max_speed, float) and isinstance(speed, float) and max_speed < speed:
+            chk.fail(f"{path}.max_speed_mps", f"must be >= speed_mps ({speed:g}), got {max_speed:g}")
+        speeds[name] = SpeedProfile(name, speed, timeout, max_speed)
+    return speeds
+
+
+def _compile_zones(chk, doc, base_dir):
+    zones = []
+    for i, z in enumerate(chk.get(doc, "zones", "mission", list, [])):
+        path = f"mission.zones[{i}]"
+        if not isinstance(z, dict):
+            chk.fail(path, f"expected object, got {z!r}")
+            continue
+        try:
+            zones.append(zone_from_dict(z))
+        except (KeyError, TypeError, ValueError) as e:
+            chk.fail(path, f"invalid zone ({type(e).__name__}: {e})")
+
+    zones_file = chk.get(doc, "zones_file", "mission", str)
+    if zones_file is not None:
+        zpath = os.path.join(base_dir, zones_file)
+        try:
+            zones += ZoneRegistry.load(zpath).zones
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            chk.fail("mission.zones_file", f"cannot load {zpath} ({type(e).__name__}: {e})")
+    return ZoneRegistry(zones)
+
+
+def _check_params(chk, name, params, path):
+    """The params of action `name` checked against what it declared (actions.register)."""
+    schema = actions.REGISTRY[name].params
+    if schema is None:
+        return dict(params)
+    for key in sorted(set(params) - set(schema)):
+        chk.fail(f"{path}.{key}", f"unknown param of {name} (one of {', '.join(sorted(schema)) or 'none'})")
+    out = {}
+    for key, kind in schema.items():
+        if key not in params:
+            continue
+        if isinstance(kind, (type, tuple)):
+            value = chk.get(params, key, path, kind)
+            if value is not None or params[key] is None:
+                out[key] = value
+        else:
+            problem = kind(params[key])
+            if problem:
+                chk.fail(f"{path}.{key}", problem)
+            else:
+                out[key] = params[key]
+    return out
+
+
+def _action_specs(chk, w, path, action_params):
+    value = w.get("action", "deliver")
+    if value == "pass":
+        if "params" in w:
+            chk.fail(f"{path}.params", "a pass waypoint has no actions")
+        return ()
+    items = value if isinstance(value, list) else [value]
+    if not items:
+        chk.fail(f"{path}.action", "empty action list")
+
+    specs = []
+    for j, item in enumerate(items):
+        item_path = f"{path}.action[{j}]" if isinstance(value, list) else f"{path}.action"
+        if isinstance(item, dict):
+            chk.unknown(item, {"name", "params"}, item_path)
+            name = chk.get(item, "name", item_path, str, "", required=True)
+            own = chk.get(item, "params", item_path, dict, {})
+            own_path = f"{item_path}.params"
+        elif isinstance(item, str):
+            name, own, own_path = item, {}, item_path
+        else:
+            chk.fail(item_path, f"expected action name or object, got {item!r}")
+            continue
+        if name not in actions.REGISTRY:
+            chk.fail(item_path, f"unknown action {name!r} (one of {', '.join(sorted(actions.REGISTRY))}, pass)")
+            continue
+        params = dict(action_params.get(name, {}))
+        params.update(_check_params(chk, name, own, own_path))
+        specs.append(ActionSpec(name, params))
+
+    if "params" in w:
+        if len(items) != 1:
+            chk.fail(f"{path}.params", "only for a single action; give each action its own params")
+        elif specs:
+            specs[0].params.update(_check_params(chk, specs[0].name, chk.get(w, "params", path, dict, {}),
+                                                 f"{path}.params"))
+    if any(not actions.REGISTRY[s.name].flies for s in specs) and len(specs) > 1:
+        chk.fail(f"{path}.action", "an action that does not fly to the waypoint must be its only action")
+    return tuple(specs)
+
+
+def _compile_waypoints(chk, doc, speeds, defaults):
+    plugins = chk.get(doc, "plugins", "mission", list, [])
+    try:
+        actions.load_plugins(plugins)
+    except ImportError as e:
+        chk.fail("mission.plugins", f"cannot import ({e})")
+    action_params = {}
+    for name, params in chk.get(doc, "actions", "mission", dict, {}).items():
+        if name not in actions.REGISTRY:
+            chk.fail(f"mission.actions.{name}", "unknown action")
+        elif not isinstance(params, dict):
+            chk.fail(f"mission.actions.{name}", f"expected object of params, got {params!r}")
+        else:
+            action_params[name] = _check_params(chk, name, params, f"mission.actions.{name}")
+
+    waypoints = []
+    items = chk.get(doc, "waypoints", "mission", list, [], required=True)
+    if "waypoints" in doc and not items:
+        chk.fail("mission.waypoints", "empty")
+    for i, w in enumerate(items):
+        path = f"mission.waypoints[{i}]"
+        if isinstance(w, str):
+            w = {"actor": w}
+        if not isinstance(w, dict):
+            chk.fail(path, f"expected actor name or object, got {w!r}")
+            continue
+        chk.unknown(w, _WAYPOINT_KEYS, path)
+        actor = chk.get(w, "actor", path, str, "", required=True)
+        specs = _action_specs(chk, w, path, action_params)
+        profile = chk.get(w, "speed_profile", path, str, defaults["speed_profile"])
+        if profile not in speeds:
+            chk.fail(f"{path}.speed_profile", f"unknown speed profile {profile!r}")
+        waypoints.append(Waypoint(
+            i + 1, actor, specs, speeds.get(profile),
+            chk.number(w, "roof_clearance_m", path, defaults["roof_clearance_m"], -math.inf),
+            chk.number(w, "dwell_s", path, defaults["dwell_s"]),
+        ))
+
+    names = [w.actor for w in waypoints]
+    for name in sorted({n for n in names if names.count(n) > 1}):
+        chk.fail("mission.waypoints", f"actor {name!r} listed more than once")
+    for w in waypoints[:-1]:
+        for spec in w.actions:
+            if actions.REGISTRY[spec.name].ends_mission:
+                chk.fail(f"mission.waypoints[{w.index - 1}]",
+                         f"{spec.name} ends the mission, it must be on the last waypoint")
+    return waypoints
+
+
+def compile_mission(doc, source="<mission>"):
+    """Validate a parsed mission document and build its runtime structures; raises MissionError."""
+    chk = _Checker()
+    if not isinstance(doc, dict):
+        raise MissionError(source, [f"mission: expected object, got {type(doc).__name__}"])
+    chk.unknown(doc, _TOP_KEYS, "mission")
+    base_dir = os.path.dirname(os.path.abspath(source)) if os.path.exists(source) else "."
+
+    speeds = _compile_speeds(chk, doc)
+    d = chk.get(doc, "defaults", "mission", dict, {})
+    chk.unknown(d, {"speed_profile", "roof_clearance_m", "dwell_s"}, "mission.defaults")
+    defaults = {
+        "speed_profile": chk.get(d, "speed_profile", "mission.defaults", str, "cruise"),
+        "roof_clearance_m": chk.number(d, "roof_clearance_m", "mission.defaults", DEFAULT_ROOF_CLEARANCE_M,
+                                       -math.inf),
+        "dwell_s": chk.number(d, "dwell_s", "mission.defaults", 0.0),
+    }
+    if defaults["speed_profile"] not in speeds:
+        chk.fail("mission.defaults.speed_profile", f"unknown speed profile {defaults['speed_profile']!r}")
+
+    a = chk.get(doc, "altitude", "mission", dict, {})
+    chk.unknown(a, {"mode", "extra_clearance_m", "safe_z_margin_m"}, "mission.altitude")
+    altitude = Altitude(
+        chk.choice(a, "mode", "mission.altitude", ALTITUDE_MODES, "safe_z"),
+        chk.number(a, "extra_clearance_m", "mission.altitude", 0.0),
+        chk.number(a, "safe_z_margin_m", "mission.altitude", 0.0),
+    )
+
+    o = chk.get(doc, "order", "mission", dict, {})
+    chk.unknown(o, {"optimize", "fixed_tail", "time_budget_s"}, "mission.order")
+    tail = chk.get(o, "fixed_tail", "mission.order", list, [])
+    order = Ordering(
+        chk.get(o, "optimize", "mission.order", bool, False),
+        tuple(tail),
+        chk.number(o, "time_budget_s", "mission.order", DEFAULT_ORDER_BUDGET_S),
+    )
+
+    zones = _compile_zones(chk, doc, base_dir)
+    waypoints = _compile_waypoints(chk, doc, speeds, defaults)
+    actors = {w.actor for w in waypoints}
+    for name in tail:
+        if name not in actors:
+            chk.fail("mission.order.fixed_tail", f"{name!r} is not a waypoint")
+
+    mission = Mission(
+        name=chk.get(doc, "name", "mission", str, os.path.splitext(os.path.basename(source))[0]),
+        vehicle=chk.get(doc, "vehicle", "mission", str, "Drone1"),
+        level=chk.get(doc, "level", "mission", str),
+        waypoints=tuple(waypoints),
+        speeds=speeds,
+        cruise=speeds.get(defaults["speed_profile"]),
+        altitude=altitude,
+        zones=zones,
+        planner=DetourPlanner(zones),
+        on_block=chk.choice(doc, "on_block", "mission", ON_BLOCK, "detour"),
+        hold_s=chk.number(doc, "hold_s", "mission", DEFAULT_HOLD_S),
+        execution=chk.choice(doc, "execution", "mission", EXECUTION_MODES, "path"),
+        preflight=chk.choice(doc, "preflight", "mission", PREFLIGHT_MODES, "reject"),
+        order=order,
+        source=source,
+        digest=hashlib.sha1(json.dumps(doc, sort_keys=True).encode("utf-8")).hexdigest()[:12],
+    )
+    if chk.errors:
+        raise MissionError(source, chk.errors)
+    return mission
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_mission(path, use_cache=True):
+    """
+    Compiled mission of a file, cached by path and file stamp: unchanged files
+    are not parsed again, a changed file is recompiled on the next call.
+    """
+    key = os.path.abspath(path)
+    stamp = _stamp(key)
+    hit = _CACHE.get(key)
+    if use_cache and hit is not None and hit[0] == stamp:
+        return hit[1]
+    mission = compile_mission(read_mission_file(key), source=key)
+    _CACHE[key] = (stamp, mission)
+    return mission
+
+
+def mission_changed(mission) -> bool:
+    """True if the file of a load_mission() result changed (or vanished) since it was compiled."""
+    hit = _CACHE.get(mission.source)
+    try:
+        return hit is None or hit[1] is not mission or hit[0] != _stamp(mission.source)
+    except OSError:
+        return True
+
+
+def describe(mission):
+    lines = [f"[mission] {mission.name} ({mission.digest}) vehicle={mission.vehicle} level={mission.level} "
+             f"altitude={mission.altitude.mode} on_block={mission.on_block} execution={mission.execution} "
+             f"preflight={mission.preflight}"]
+    lines.append(f"  zones: {len(mission.zones)}, speed profiles: "
+                 + ", ".join(f"{p.name} {p.speed_mps:g}" + (f"-{p.max_speed_mps:g}" if p.max_speed_mps else "")
+                             + " m/s" for p in mission.speeds.values()))
+    for w in mission.waypoints:
+        names = "+".join(a.name for a in w.actions) or "pass"
+        params = {a.name: a.params for a in w.actions if a.params}
+        lines.append(f"  WP {w.index} {w.actor:<10} {names:<14} {w.speed.speed_mps:g} m/s, "
+                     f"clearance {w.roof_clearance_m:g} m, dwell {w.dwell_s:g}s" + (f" {params}" if params else ""))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+
+    status = 0
+    for p in sys.argv[1:]:
+        try:
+            print(describe(load_mission(p)))
+        except (OSError, MissionError) as e:
+            print(f"[mission] {e}")
+            status = 1
+    sys.exit(status)
\ No newline at end of file
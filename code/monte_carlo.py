@@ -0,0 +1,267 @@
+"""
+Monte Carlo validation of the waypoint3 safety / routing logic, no simulator.
+
+Every variant jitters the waypoints and roof heights and moves, turns and
+resizes the forbidden zone, with its top sampled on both sides of the
+variant's SAFE_Z (a zone below the cruise altitude never touches a leg),
+then flies the mission on paper: waypoint3's stop order (route_order with
+its OPTIMIZE_ORDER / ORDER_FIXED_TAIL), its altitudes (ALTITUDE_POLICY:
+per-leg corridor altitudes, or every leg at SAFE_Z),
+plan_leg per leg (zones with the safety margin, the detour planner), the
+blended path that PathExecutor would fly, and the Actor_2 preview. The
+result is checked against the TRUE zone (no margin):
+
+    violation    the flown path (corner blending and climb included) enters the zone
+    false_hold   the mission held for a target / leg that is clear without the margin
+    near_miss    closest approach to the zone below NEAR_MISS_M
+
+    python monte_carlo.py --variants 5000
+    python monte_carlo.py --safety-margin 1 --safe-z-margin 0
+    python monte_carlo.py --altitude safe_z               # the policy to fly (default: waypoint3's)
+    python monte_carlo.py --scaling                       # throughput per worker count
+
+Variants are seeded per index, so results do not depend on the worker count.
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from altitude_planner import AltitudePlanner
+from forbidden_zone import OrientedBoxZone
+from frames import CM_PER_M
+from path_executor import BLEND_RADIUS_M, blend_corners, estimate_path_time
+from path_planner import DetourPlanner, path_length
+from route_order import reorder_waypoints
+from safety import decide_leg, plan_leg
+from waypoint3 import (ALTITUDE_POLICY, ALTITUDE_RECLIMB, EXTRA_CLEARANCE_M, FORBIDDEN_EXTENT_CM,
+                       FORBIDDEN_LOCATION_CM, OPTIMIZE_ORDER, ORDER_FIXED_TAIL, ORDER_TIME_BUDGET_S,
+                       ROOF_CLEARANCE_M, SAFE_Z_MARGIN_M, SAFETY_MARGIN_M, SPEED_MPS, WAYPOINT_ACTOR_NAMES)
+from zone_index import ZoneRegistry
+
+BASE_SCENE = "headless_scene.json"   # actor positions (NED m) the variants are jittered around
+VARIANTS = 2000
+SEED = 0
+CHUNK = 50                           # variants per pool task
+
+WAYPOINT_JITTER_M = 5.0              # sigma, XY
+ROOF_JITTER_M = 8.0                  # uniform +-
+ZONE_SHIFT_M = 40.0                  # uniform +-, XY of the zone center
+ZONE_SCALE = (0.6, 1.4)              # extent multiplier range
+ZONE_TOP_ABOVE_SAFE_Z_M = (-20.0, 20.0)  # zone top relative to the variant's SAFE_Z (positive = above it)
+
+TAKEOFF_ALT_M = 3.0
+SAMPLE_STEP_M = 0.5                  # flown path is checked at this spacing
+NEAR_MISS_M = 2.0
+
+OUTCOMES = ["done", "target_forbidden", "no_route"]
+
+RESULT_DTYPE = np.dtype([
+    ("outcome", "u1"),               # index into OUTCOMES
+    ("legs", "<u2"),                 # legs flown
+    ("detours", "<u2"),
+    ("violation", "?"),
+    ("false_hold", "?"),
+    ("preview_hold", "?"),
+    ("clearance_m", "<f4"),          # closest approach to the true zone
+    ("path_m", "<f4"),
+    ("flight_s", "<f4"),             # estimate_path_time over the flown runs
+    ("decide_ms", "<f4"),            # wall time in decide_leg (incl. planning)
+])
+
+
+def load_actors(path=BASE_SCENE):
+    with open(path, "r", encoding="utf-8") as f:
+        actors = json.load(f)["actors"]
+    return np.array([actors[n] for n in WAYPOINT_ACTOR_NAMES], dtype=np.float64)
+
+
+def safe_z_of(actors, safe_z_margin_m=SAFE_Z_MARGIN_M):
+    """waypoint3's SAFE_Z for roofs at actors[:, 2]."""
+    return actors[:, 2].min() - (ROOF_CLEARANCE_M + EXTRA_CLEARANCE_M + safe_z_margin_m)
+
+
+def make_variant(base, seed, index, safe_z_margin_m=SAFE_Z_MARGIN_M):
+    """(actors (N,3) with roof z, zone center_cm, extent_cm, yaw_deg) of variant `index`."""
+    rng = np.random.default_rng([seed, index])
+    actors = base.copy()
+    actors[:, :2] += rng.normal(0.0, WAYPOINT_JITTER_M, size=(len(base), 2))
+    actors[:, 2] += rng.uniform(-ROOF_JITTER_M, ROOF_JITTER_M, size=len(base))
+
+    scale = rng.uniform(*ZONE_SCALE, size=3)
+    extent_cm = [e * k for e, k in zip(FORBIDDEN_EXTENT_CM, scale)]
+    top = safe_z_of(actors, safe_z_margin_m) - rng.uniform(*ZONE_TOP_ABOVE_SAFE_Z_M)   # NED: smaller = higher
+    # NED cm for from_ned_cm: X / Y of the editor Location (the same in NED), Z from the sampled top
+    center_cm = (
+        FORBIDDEN_LOCATION_CM[0] + rng.uniform(-ZONE_SHIFT_M, ZONE_SHIFT_M) * CM_PER_M,
+        FORBIDDEN_LOCATION_CM[1] + rng.uniform(-ZONE_SHIFT_M, ZONE_SHIFT_M) * CM_PER_M,
+        top * CM_PER_M + extent_cm[2],
+    )
+    yaw = rng.uniform(0.0, 180.0)
+    return actors, center_cm, extent_cm, yaw
+
+
+def clearance(zone, points):
+    """Distance from each (N,3) point to the box (0 inside)."""
+    local = zone.to_local_xy(points)
+    dx = np.maximum(np.abs(local[:, 0]) - zone.ex, 0.0)
+    dy = np.maximum(np.abs(local[:, 1]) - zone.ey, 0.0)
+    dz = np.maximum(np.abs(points[:, 2] - zone.cz) - zone.ez, 0.0)
+    return np.sqrt(dx * dx + dy * dy + dz * dz)
+
+
+def densify(route, step=SAMPLE_STEP_M):
+    route = np.asarray(route, dtype=np.float64)
+    out = [route[:1]]
+    for a, b in zip(route[:-1], route[1:]):
+        n = max(1, int(math.ceil(np.linalg.norm(b - a) / step)))
+        out.append(a + (b - a) * (np.arange(1, n + 1)[:, None] / n))
+    return np.concatenate(out)
+
+
+def run_variant(base, seed, index, safety_margin_m=SAFETY_MARGIN_M, safe_z_margin_m=SAFE_Z_MARGIN_M,
+                altitude=ALTITUDE_POLICY):
+    actors, center_cm, extent_cm, yaw = make_variant(base, seed, index, safe_z_margin_m)
+    zone = OrientedBoxZone.from_ned_cm(center_cm, extent_cm, yaw, safety_margin_m, name="ForbiddenZone")
+    truth = OrientedBoxZone.from_ned_cm(center_cm, extent_cm, yaw, 0.0, name="ForbiddenZone")
+    zones, true_zones = ZoneRegistry([zone]), ZoneRegistry([truth])
+    planner = DetourPlanner(zones)
+
+    # waypoint3.run_mission: SAFE_Z from the highest roof, the stop order, the corridor altitudes
+    # of the route, climb, then one blended run per stop
+    safe_z = safe_z_of(actors, safe_z_margin_m)
+    waypoints = [(i + 1, name, x, y, z_roof, z_roof - ROOF_CLEARANCE_M)
+                 for i, (name, (x, y, z_roof)) in enumerate(zip(WAYPOINT_ACTOR_NAMES, actors.tolist()))]
+    if OPTIMIZE_ORDER:
+        waypoints = reorder_waypoints(waypoints, (0.0, 0.0, safe_z), safe_z, zones, planner, ORDER_FIXED_TAIL,
+                                      ORDER_TIME_BUDGET_S)[0]
+    by_name = {w[1]: w for w in waypoints}
+    altitudes = None
+    if altitude == "corridor":
+        altitudes = AltitudePlanner.from_waypoints(waypoints, ROOF_CLEARANCE_M + EXTRA_CLEARANCE_M, safe_z_margin_m)
+        waypoints = altitudes.route(waypoints, (0.0, 0.0), ALTITUDE_RECLIMB)
+        by_name = {w[1]: w for w in waypoints}
+    pos = (0.0, 0.0, safe_z if altitudes is None else waypoints[0][5])
+    flown = [(0.0, 0.0, -TAKEOFF_ALT_M), pos]
+    flight_s = estimate_path_time(flown, SPEED_MPS)
+    outcome, legs, detours, false_hold, preview_hold = "done", 0, 0, False, False
+    decide_s = 0.0
+
+    def decide(start, target):
+        return decide_leg(start, target, zones, planner, replan=True)
+
+    def decide_true(start, target):
+        return decide_leg(start, target, true_zones, DetourPlanner(true_zones), replan=True)
+
+    for _, name, x, y, _, z_target in waypoints:
+        t0 = time.perf_counter()
+        climb, target, decision = plan_leg(pos, x, y, z_target, safe_z, altitudes, decide)
+        decide_s += time.perf_counter() - t0
+
+        if decision.action == "hold":
+            outcome = decision.reason
+            false_hold = plan_leg(pos, x, y, z_target, safe_z, altitudes, decide_true)[2].action == "fly"
+            break
+
+        route = [pos] + climb + decision.detour + [target]
+        run, _ = blend_corners(route, BLEND_RADIUS_M, zones=zones)
+        flown += run[1:]
+        flight_s += estimate_path_time(route, SPEED_MPS)
+        detours += bool(decision.detour)
+        legs += 1
+        pos = target
+
+        if name == "Actor_2":
+            # forbidden preview of the next actor, never re-planned
+            _, _, nx, ny, _, nz_target = by_name["Actor_4"]
+            preview = plan_leg(pos, nx, ny, nz_target, safe_z, altitudes,
+                               lambda start, target: decide_leg(start, target, zones, planner, replan=False))[2]
+            preview_hold = preview.action == "hold"
+            break
+
+    pts = densify(flown)
+    gap = float(clearance(truth, pts).min())
+    return (OUTCOMES.index(outcome), legs, detours, gap <= 0.0, false_hold, preview_hold, gap,
+            path_length(flown), flight_s, decide_s * 1000.0)
+
+
+def run_chunk(args):
+    base, seed, start, stop, safety_margin_m, safe_z_margin_m, altitude = args
+    rows = [run_variant(base, seed, i, safety_margin_m, safe_z_margin_m, altitude) for i in range(start, stop)]
+    return np.array(rows, dtype=RESULT_DTYPE)
+
+
+def run_monte_carlo(variants=VARIANTS, seed=SEED, workers=None, safety_margin_m=SAFETY_MARGIN_M,
+                    safe_z_margin_m=SAFE_Z_MARGIN_M, base=None, chunk=CHUNK, altitude=ALTITUDE_POLICY):
+    """All variants, in index order, as a RESULT_DTYPE array."""
+    base = load_actors() if base is None else base
+    tasks = [(base, seed, s, min(s + chunk, variants), safety_margin_m, safe_z_margin_m, altitude)
+             for s in range(0, variants, chunk)]
+    if workers == 1:
+        parts = [run_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(run_chunk, tasks))
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=RESULT_DTYPE)
+
+
+def _pcts(values):
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:.2f} / p95 {p95:.2f} / p99 {p99:.2f}"
+
+
+def print_report(results, wall_s, safety_margin_m, safe_z_margin_m, altitude=ALTITUDE_POLICY):
+    n = len(results)
+    failures = results["violation"] | results["false_hold"]
+    print(f"\n[monte carlo] {n} variants, altitude {altitude}, SAFETY_MARGIN_M={safety_margin_m}, "
+          f"SAFE_Z_MARGIN_M={safe_z_margin_m}, {wall_s:.1f}s wall ({n / wall_s:.0f} variants/s)")
+    print(f"  failure rate: {failures.mean() * 100:.2f}%  "
+          f"(violation {results['violation'].mean() * 100:.2f}%, false hold {results['false_hold'].mean() * 100:.2f}%)")
+    print(f"  near miss (<{NEAR_MISS_M:g} m): {(results['clearance_m'] < NEAR_MISS_M).mean() * 100:.2f}%")
+    for i, name in enumerate(OUTCOMES):
+        print(f"  outcome {name:<16} {(results['outcome'] == i).mean() * 100:6.2f}%")
+    print(f"  detour on any leg: {(results['detours'] > 0).mean() * 100:.2f}%, "
+          f"preview hold: {results['preview_hold'].mean() * 100:.2f}%")
+    exercised = (results["detours"] > 0) | (results["outcome"] != OUTCOMES.index("done")) | results["preview_hold"]
+    if n and not exercised.any():
+        print("  [WARN] no variant detoured or held: no zone reached a leg, the margins were not tested")
+    print(f"  clearance m  {_pcts(results['clearance_m'])}")
+    print(f"  flight s     {_pcts(results['flight_s'])}")
+    print(f"  decide ms    {_pcts(results['decide_ms'])}")
+
+
+def scaling_table(variants, seed, safety_margin_m, safe_z_margin_m, altitude=ALTITUDE_POLICY):
+    base = load_actors()
+    counts = sorted({1, 2, 4, 8, 16, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+    print(f"\n{'workers':>8} {'variants/s':>11} {'speedup':>8} {'efficiency':>11}")
+    rate1 = None
+    for w in counts:
+        t0 = time.perf_counter()
+        run_monte_carlo(variants, seed, w, safety_margin_m, safe_z_margin_m, base, altitude=altitude)
+        rate = variants / (time.perf_counter() - t0)
+        rate1 = rate1 or rate
+        print(f"{w:>8} {rate:>11.0f} {rate / rate1:>7.2f}x {rate / rate1 / w * 100:>10.0f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo validation of the waypoint3 safety logic")
+    parser.add_argument("--variants", type=int, default=VARIANTS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--safety-margin", type=float, default=SAFETY_MARGIN_M)
+    parser.add_argument("--safe-z-margin", type=float, default=SAFE_Z_MARGIN_M)
+    parser.add_argument("--altitude", choices=("corridor", "safe_z"), default=ALTITUDE_POLICY)
+    parser.add_argument("--scaling", action="store_true")
+    args = parser.parse_args()
+
+    if args.scaling:
+        scaling_table(args.variants, args.seed, args.safety_margin, args.safe_z_margin, args.altitude)
+    else:
+        t0 = time.perf_counter()
+        res = run_monte_carlo(args.variants, args.seed, args.workers, args.safety_margin, args.safe_z_margin,
+                              altitude=args.altitude)
+        print_report(res, time.perf_counter() - t0, args.safety_margin, args.safe_z_margin, args.altitude)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Defaults match the original lidar_blocked_test.blocked_ahead loop
+DIST_THRESH_M = 8.0
+MIN_FORWARD_M = 1.0      # points closer than this along x are ignored (drone body / noise)
+HALF_WIDTH_M = 2.0       # "in front" corridor: |y| < HALF_WIDTH_M
+MIN_POINTS = 30          # blocked when more than this many points are in the corridor
+
+N_SECTORS = 9
+SECTOR_FOV_DEG = 180.0   # sectors span the front half-plane, -90..+90 deg around +x
+
+ObstacleReport = namedtuple("ObstacleReport", ["blocked", "count", "sectors"])
+
+
+def as_points(point_cloud) -> np.ndarray:
+    """
+    View a flat LiDAR point cloud [x1,y1,z1, x2,y2,z2, ...] as an (N,3) float32 array.
+
+    float32 ndarrays and raw buffers (bytes / memoryview) are reshaped without copying.
+    The plain list that msgpack returns from getLidarData has to be converted once.
+    A trailing partial point (len % 3 != 0) is dropped.
+    """
+    if isinstance(point_cloud, np.ndarray) and point_cloud.dtype == np.float32:
+        flat = point_cloud.reshape(-1)
+    elif isinstance(point_cloud, (bytes, bytearray, memoryview)):
+        flat = np.frombuffer(point_cloud, dtype=np.float32)
+    else:
+        flat = np.asarray(point_cloud, dtype=np.float32).reshape(-1)
+
+    n = flat.size // 3
+    return flat[:n * 3].reshape(n, 3)
+
+
+def sector_edges(n_sectors=N_SECTORS, fov_deg=SECTOR_FOV_DEG) -> np.ndarray:
+    """Azimuth bin edges in radians, sector 0 is the leftmost (most negative y)."""
+    half = math.radians(fov_deg) / 2.0
+    return np.linspace(-half, half, n_sectors + 1)
+
+
+def detect(points, dist_thresh=DIST_THRESH_M, min_forward=MIN_FORWARD_M,
+           half_width=HALF_WIDTH_M, min_points=MIN_POINTS,
+           n_sectors=N_SECTORS, fov_deg=SECTOR_FOV_DEG) -> ObstacleReport:
+    """
+    Batch obstacle test over an (N,3) array in sensor frame (x forward, y right).
+
+    - corridor test: x > min_forward, |y| < half_width, |p| < dist_thresh
+      (same rule as the old per-point loop, compared on squared distance)
+    - sectors: count of close points (|p| < dist_thresh) per azimuth sector
+      inside the front field of view
+
+    Unlike the old loop there is no early exit, so `count` is the full corridor
+    count instead of stopping at min_points + 1.
+    """
+    pts = points if isinstance(points, np.ndarray) and points.ndim == 2 else as_points(points)
+    if pts.shape[0] == 0:
+        return ObstacleReport(False, 0, np.zeros(n_sectors, dtype=np.int64))
+
+    x = pts[:, 0]
+    y = pts[:, 1]
+    d2 = np.einsum("ij,ij->i", pts, pts)
+
+    close = d2 < np.float32(dist_thresh * dist_thresh)
+    corridor = close & (x > min_forward) & (np.abs(y) < half_width)
+    count = int(np.count_nonzero(corridor))
+
+    # only the (usually few) close points need an azimuth
+    xc = x[close]
+    yc = y[close]
+    az = np.arctan2(yc, xc)
+    counts, _ = np.histogram(az, bins=sector_edges(n_sectors, fov_deg))
+
+    return ObstacleReport(count > min_points, count, counts)
+
+
+def blocked_ahead(client, lidar_name, vehicle_name, dist_thresh=DIST_THRESH_M, **kwargs) -> ObstacleReport:
+    """Fetch one scan from `lidar_name` and run `detect` on it."""
+    data = client.getLidarData(lidar_name=lidar_name, vehicle_name=vehicle_name)
+    return detect(as_points(data.point_cloud), dist_thresh=dist_thresh, **kwargs)
\ No newline at end of file
@@ -0,0 +1,203 @@
+import math
+import time
+
+import cosysairsim as airsim
+
+BLEND_RADIUS_M = 6.0       # corner rounding radius (capped at half of each adjacent segment)
+BLEND_POINTS = 5           # points per rounded corner
+LOOKAHEAD_M = -1           # moveOnPathAsync lookahead, -1 = let AirSim pick from the speed
+ADAPTIVE_LOOKAHEAD = 1
+MAX_ACCEL_MPS2 = 4.0       # used only for the time estimates below
+MAX_LAT_ACCEL_MPS2 = 3.0
+STOP_SETTLE_S = 0.5        # hover settle after each stop-and-go leg
+
+
+def blend_corners(points, radius_m=BLEND_RADIUS_M, n=BLEND_POINTS, zones=None):
+    """
+    Replace every interior corner of a polyline by a quadratic Bezier arc.
+
+    The arc starts and ends `r` before / after the corner (r <= radius_m and
+    <= half of each adjacent segment). With `zones`, a corner whose arc would
+    cut into a zone keeps its sharp vertex instead.
+    Returns (new_points, corner_radii) where corner_radii[k] belongs to points[k+1].
+    """
+    pts = [tuple(map(float, p)) for p in points]
+    if len(pts) < 3 or radius_m <= 0:
+        return pts, [0.0] * max(0, len(pts) - 2)
+
+    out = [pts[0]]
+    radii = []
+    for a, b, c in zip(pts[:-2], pts[1:-1], pts[2:]):
+        lab = math.dist(a, b)
+        lbc = math.dist(b, c)
+        r = min(radius_m, lab / 2.0, lbc / 2.0)
+        if r <= 1e-6:
+            out.append(b)
+            radii.append(0.0)
+            continue
+
+        p0 = tuple(bi + (ai - bi) * r / lab for ai, bi in zip(a, b))
+        p2 = tuple(bi + (ci - bi) * r / lbc for bi, ci in zip(b, c))
+        arc = []
+        for k in range(n):
+            t = k / (n - 1)
+            arc.append(tuple((1 - t) ** 2 * u + 2 * (1 - t) * t * v + t * t * w for u, v, w in zip(p0, b, p2)))
+
+        if zones is not None and zones.route_blocked([out[-1]] + arc + [c]).any():
+            out.append(b)
+            radii.append(0.0)
+            continue
+
+        out.extend(arc)
+        # radius of the circle tangent to both legs at distance r from the corner
+        cos_turn = _cos_between(a, b, c)
+        half = math.acos(max(-1.0, min(1.0, cos_turn))) / 2.0
+        radii.append(r / math.tan(half) if half > 1e-6 else math.inf)
+    out.append(pts[-1])
+    return out, radii
+
+
+def _cos_between(a, b, c):
+    """Cosine of the turn angle at b (1 = straight on, -1 = U-turn)."""
+    u = [bi - ai for ai, bi in zip(a, b)]
+    v = [ci - bi for bi, ci in zip(b, c)]
+    nu = math.sqrt(sum(x * x for x in u)) or 1.0
+    nv = math.sqrt(sum(x * x for x in v)) or 1.0
+    return sum(x * y for x, y in zip(u, v)) / (nu * nv)
+
+
+def trapezoid_time(dist, v_max, a_max, v0=0.0, v1=0.0):
+    """Time to cover `dist` starting at v0 and ending at v1 with |a| <= a_max, |v| <= v_max."""
+    if dist <= 0:
+        return 0.0
+    d_acc = (v_max ** 2 - v0 ** 2) / (2 * a_max)
+    d_dec = (v_max ** 2 - v1 ** 2) / (2 * a_max)
+    if d_acc + d_dec <= dist:
+        return (v_max - v0) / a_max + (v_max - v1) / a_max + (dist - d_acc - d_dec) / v_max
+    # triangle: peak speed below v_max
+    v_peak = math.sqrt(max(a_max * dist + (v0 ** 2 + v1 ** 2) / 2.0, max(v0, v1) ** 2))
+    return max(0.0, (v_peak - v0) / a_max) + max(0.0, (v_peak - v1) / a_max)
+
+
+def estimate_legs_time(points, speed, a_max=MAX_ACCEL_MPS2, settle_s=STOP_SETTLE_S):
+    """Stop-and-go: every vertex is a full stop followed by a hover."""
+    return sum(trapezoid_time(math.dist(a, b), speed, a_max) + settle_s for a, b in zip(points[:-1], points[1:]))
+
+
+def estimate_path_time(points, speed, a_max=MAX_ACCEL_MPS2, a_lat=MAX_LAT_ACCEL_MPS2,
+                       radius_m=BLEND_RADIUS_M, settle_s=STOP_SETTLE_S):
+    """One blended trajectory: stop only at the end, slow down to sqrt(a_lat * R) at corners."""
+    if len(points) < 2:
+        return 0.0
+    _, radii = blend_corners(points, radius_m)
+    v_corner = [min(speed, math.sqrt(a_lat * r)) if r > 0 else 0.0 for r in radii]
+    v = [0.0] + v_corner + [0.0]
+    seg = [math.dist(a, b) for a, b in zip(points[:-1], points[1:])]
+
+    # backward / forward passes so every corner speed is reachable
+    for k in range(len(seg) - 1, -1, -1):
+        v[k] = min(v[k], math.sqrt(v[k + 1] ** 2 + 2 * a_max * seg[k]))
+    for k in range(len(seg)):
+        v[k + 1] = min(v[k + 1], math.sqrt(v[k] ** 2 + 2 * a_max * seg[k]))
+
+    return sum(trapezoid_time(d, speed, a_max, v[k], v[k + 1]) for k, d in enumerate(seg)) + settle_s
+
+
+class PathExecutor:
+    """
+    Flies a route as one moveOnPathAsync call per run between stops, instead of
+    one moveToPositionAsync(...).join() + hoverAsync per vertex.
+
+        ex = PathExecutor(client, "Drone1", 8.0, zones=ZONES)
+        ex.fly(start, [corner, corner, stop])    # blended path, stops once at the end
+        ex.print_report()
+
+    With a speed_profile.SpeedPlanner, `speed` is the ceiling and the route is
+    flown as the planner's runs, one moveOnPathAsync each at its own speed.
+
+    Routes are world NED (the frame of `zones`); `origin` is subtracted only
+    from the points sent to AirSim, for a vehicle whose API frame starts at
+    its spawn (fleet.py).
+    """
+
+    def __init__(self, client, vehicle_name, speed, blend_radius_m=BLEND_RADIUS_M, zones=None,
+                 lookahead=LOOKAHEAD_M, adaptive_lookahead=ADAPTIVE_LOOKAHEAD, timeout_sec=300,
+                 speed_planner=None, origin=(0.0, 0.0, 0.0)):
+        self.client = client
+        self.vehicle_name = vehicle_name
+        self.speed = speed
+        self.blend_radius = blend_radius_m
+        self.zones = zones
+        self.lookahead = lookahead
+        self.adaptive_lookahead = adaptive_lookahead
+        self.timeout_sec = timeout_sec
+        self.speed_planner = speed_planner
+        self.origin = tuple(map(float, origin))
+        self.runs = []
+
+    def fly(self, start, points, speed=None, cancelled=None, plan=True):
+        """
+        Fly from `start` through `points`, only stopping at the last one (with a
+        speed planner: at the end of each of its runs). `cancelled()` is checked
+        between runs; plan=False flies at `speed` even with a planner.
+        """
+        speed = self.speed if speed is None else speed
+        route = [tuple(start)] + [tuple(p) for p in points]
+        profile = None
+        if plan and self.speed_planner is not None:
+            profile = self.speed_planner.plan(route, speed)
+            moves = [(r.points, r.speed) for r in profile.runs]
+        else:
+            moves = [(route, speed)]
+
+        t0 = time.perf_counter()
+        for pts, v in moves:
+            if cancelled is not None and cancelled():
+                break
+            smooth, _ = blend_corners(pts, self.blend_radius, zones=self.zones)
+            ox, oy, oz = self.origin
+            path = [airsim.Vector3r(x - ox, y - oy, z - oz) for x, y, z in smooth[1:]]
+            self.client.moveOnPathAsync(
+                path, v,
+                timeout_sec=self.timeout_sec,
+                lookahead=self.lookahead,
+                adaptive_lookahead=self.adaptive_lookahead,
+                vehicle_name=self.vehicle_name,
+            ).join()
+        self.client.hoverAsync(vehicle_name=self.vehicle_name).join()
+        wall = time.perf_counter() - t0
+
+        self.runs.append({
+            "vertices": len(route) - 1,
+            "moves": len(moves),
+            "wall_s": wall,
+            "est_legs_s": estimate_legs_time(route, speed),
+            "est_path_s": estimate_path_time(route, speed, radius_m=self.blend_radius),
+            "est_profile_s": profile.est_s if profile is not None else None,
+        })
+        return wall
+
+    def report(self):
+        legs = sum(r["est_legs_s"] for r in self.runs)
+        path = sum(r["est_path_s"] for r in self.runs)
+        profiled = [r for r in self.runs if r["est_profile_s"] is not None]
+        return {
+            "runs": len(self.runs),
+            "vertices": sum(r["vertices"] for r in self.runs),
+            "moves": sum(r["moves"] for r in self.runs),
+            "est_profile_s": sum(r["est_profile_s"] for r in profiled) if profiled else None,
+            "wall_s": sum(r["wall_s"] for r in self.runs),
+            "est_legs_s": legs,
+            "est_path_s": path,
+            "est_saved_s": legs - path,
+            "est_saved_pct": 100.0 * (legs - path) / legs if legs > 0 else 0.0,
+        }
+
+    def print_report(self):
+        r = self.report()
+        print(f"[path] {r['runs']} run(s), {r['vertices']} vertices, flown in {r['wall_s']:.1f}s; "
+              f"estimate leg-by-leg {r['est_legs_s']:.1f}s vs continuous {r['est_path_s']:.1f}s "
+              f"(saves {r['est_saved_s']:.1f}s, {r['est_saved_pct']:.0f}%)")
+        if r["est_profile_s"] is not None:
+            print(f"[path] speed profile: {r['moves']} move(s), estimate {r['est_profile_s']:.1f}s "
+                  f"(continuous at the ceiling speed {r['est_path_s']:.1f}s)")
\ No newline at end of file
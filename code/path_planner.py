@@ -0,0 +1,211 @@
+import heapq
+import math
+import time
+
+from forbidden_zone import OrientedBoxZone
+
+PLAN_CLEARANCE_M = 2.0      # detour corners sit this far outside each zone (on top of its own margin)
+WINDOW_MARGIN_M = 300.0     # zones farther than this from the start-goal box are ignored at first
+MAX_WINDOW_M = 20_000.0     # give up when the search window would exceed this
+NEIGHBOR_CELLS = 4.0        # A* links corners up to this many zone-grid cells apart (plus the goal)
+VIS_CACHE_SIZE = 200_000
+
+
+def zone_corners(zone, clearance_m):
+    """Detour vertices around one zone: inflated box corners or inflated polygon vertices."""
+    if isinstance(zone, OrientedBoxZone):
+        ex = zone.ex + clearance_m
+        ey = zone.ey + clearance_m
+        # local -> world is the inverse rotation of to_local
+        c, s = zone.c, -zone.s
+        out = []
+        for lx, ly in ((ex, ey), (-ex, ey), (-ex, -ey), (ex, -ey)):
+            out.append((zone.cx + lx * c - ly * s, zone.cy + lx * s + ly * c))
+        return out
+
+    # polygon: push each vertex away from the centroid
+    xs, ys = zone.xs, zone.ys
+    mx, my = float(xs.mean()), float(ys.mean())
+    out = []
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        dx, dy = x - mx, y - my
+        d = math.hypot(dx, dy) or 1.0
+        # clearance * sqrt(2) keeps convex corners at least `clearance` from both edges
+        k = clearance_m * math.sqrt(2.0) / d
+        out.append((x + dx * k, y + dy * k))
+    return out
+
+
+class DetourPlanner:
+    """
+    Any-angle shortest path in XY around the zones of a ZoneRegistry.
+
+    Nodes are the inflated corners of the zones near the start-goal corridor.
+    A* links each node to the nodes in its neighbourhood (bucketed, so dense
+    cities stay cheap) plus the goal; an edge is checked only when A* pops it
+    (lazy A*) and every visibility result is cached, so replanning across the
+    same area reuses earlier work. The path is then string-pulled to the
+    farthest visible vertex. The search window and neighbourhood grow until a
+    path is found or MAX_WINDOW_M is reached.
+    """
+
+    def __init__(self, zones, clearance_m=PLAN_CLEARANCE_M, window_margin_m=WINDOW_MARGIN_M,
+                 max_window_m=MAX_WINDOW_M):
+        self.zones = zones
+        self.clearance = clearance_m
+        self.window_margin = window_margin_m
+        self.max_window = max_window_m
+        self._corners = {}
+        self._vis = {}
+        self.last_stats = {}
+
+    def _relevant(self, i, z0, z1):
+        zone = self.zones.zones[i]
+        return zone.z_overlaps(z0) or zone.z_overlaps(z1)
+
+    def _corners_of(self, i):
+        pts = self._corners.get(i)
+        if pts is None:
+            pts = self._corners[i] = zone_corners(self.zones.zones[i], self.clearance)
+        return pts
+
+    def visible(self, a, b, z0, z1):
+        """True if the straight XY segment a-b crosses none of the zones active at z0/z1."""
+        key = (a, b, z0, z1) if a <= b else (b, a, z0, z1)
+        hit = self._vis.get(key)
+        if hit is not None:
+            return hit
+
+        ok = True
+        for i in self.zones.candidates_segment(a[0], a[1], b[0], b[1]):
+            if self._relevant(i, z0, z1) and self.zones.zones[i].segment_crosses(a[0], a[1], b[0], b[1]):
+                ok = False
+                break
+
+        if len(self._vis) >= VIS_CACHE_SIZE:
+            self._vis.clear()
+        self._vis[key] = ok
+        return ok
+
+    def _free(self, p, z0, z1):
+        return not any(
+            self._relevant(i, z0, z1) and self.zones.zones[i].contains_point(p[0], p[1])
+            for i in self.zones.candidates_point(p[0], p[1])
+        )
+
+    def _astar(self, start, goal, nodes, z0, z1, radius):
+        buckets = {}
+        for q in nodes:
+            buckets.setdefault((math.floor(q[0] / radius), math.floor(q[1] / radius)), []).append(q)
+
+        def neighbours(p):
+            bi, bj = math.floor(p[0] / radius), math.floor(p[1] / radius)
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    yield from buckets.get((bi + di, bj + dj), ())
+            yield goal
+
+        h = lambda p: math.hypot(goal[0] - p[0], goal[1] - p[1])
+        # lazy A*: an edge is only checked for visibility when its far end is popped
+        heap = [(h(start), 0.0, start, None)]
+        parent = {}
+        closed = set()
+
+        while heap:
+            _, gp, p, via = heapq.heappop(heap)
+            if p in closed:
+                continue
+            if via is not None and not self.visible(via, p, z0, z1):
+                continue
+            parent[p] = via
+            if p == goal:
+                path = []
+                while p is not None:
+                    path.append(p)
+                    p = parent[p]
+                return path[::-1], len(closed)
+            closed.add(p)
+
+            for q in neighbours(p):
+                if q not in closed:
+                    gq = gp + math.hypot(q[0] - p[0], q[1] - p[1])
+                    heapq.heappush(heap, (gq + h(q), gq, q, p))
+
+        return None, len(closed)
+
+    def plan_xy(self, start_xy, goal_xy, z0, z1):
+        """XY polyline [start, ..., goal] avoiding zones active at z0 or z1, or None."""
+        t0 = time.perf_counter()
+        start = (float(start_xy[0]), float(start_xy[1]))
+        goal = (float(goal_xy[0]), float(goal_xy[1]))
+
+        if self.visible(start, goal, z0, z1):
+            self.last_stats = {"ms": (time.perf_counter() - t0) * 1e3, "nodes": 2, "expanded": 0}
+            return [start, goal]
+
+        margin = self.window_margin
+        radius = max(NEIGHBOR_CELLS * self.zones.cell, self.clearance * 4.0)
+        path = None
+        nodes = []
+        expanded = 0
+        while path is None:
+            xmin = min(start[0], goal[0]) - margin
+            ymin = min(start[1], goal[1]) - margin
+            xmax = max(start[0], goal[0]) + margin
+            ymax = max(start[1], goal[1]) + margin
+
+            nodes = [goal]
+            for i in self.zones.candidates_rect(xmin, ymin, xmax, ymax):
+                if not self._relevant(i, z0, z1):
+                    continue
+                for p in self._corners_of(i):
+                    if xmin <= p[0] <= xmax and ymin <= p[1] <= ymax and self._free(p, z0, z1):
+                        nodes.append(p)
+
+            path, expanded = self._astar(start, goal, nodes, z0, z1, radius)
+            if path is None:
+                if max(xmax - xmin, ymax - ymin) >= self.max_window:
+                    break
+                margin *= 2.0
+                radius *= 2.0
+
+        if path is not None:
+            path = self._shortcut(path, z0, z1)
+
+        self.last_stats = {"ms": (time.perf_counter() - t0) * 1e3, "nodes": len(nodes), "expanded": expanded}
+        return path
+
+    def _shortcut(self, path, z0, z1):
+        """Drop vertices the path can see past (greedy string pulling)."""
+        out = [path[0]]
+        i = 0
+        while i < len(path) - 1:
+            j = len(path) - 1
+            while j > i + 1 and not self.visible(path[i], path[j], z0, z1):
+                j -= 1
+            out.append(path[j])
+            i = j
+        return out
+
+    def plan(self, start, goal):
+        """
+        3D detour between (x,y,z) points; Z is interpolated along the XY path length.
+        Returns a list of (x,y,z) including both ends, or None if no path exists.
+        """
+        z0, z1 = float(start[2]), float(goal[2])
+        xy = self.plan_xy(start[:2], goal[:2], z0, z1)
+        if xy is None:
+            return None
+
+        seg = [math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(xy[:-1], xy[1:])]
+        total = sum(seg) or 1.0
+        out = [(xy[0][0], xy[0][1], z0)]
+        run = 0.0
+        for (x, y), d in zip(xy[1:], seg):
+            run += d
+            out.append((x, y, z0 + (z1 - z0) * run / total))
+        return out
+
+
+def path_length(points):
+    return sum(math.dist(a, b) for a, b in zip(points[:-1], points[1:]))
\ No newline at end of file
@@ -0,0 +1,60 @@
+import contextlib
+import time
+from collections import namedtuple
+
+# wall clock bound at import: headless runs swap this module's `time` for the sim clock,
+# so `time.monotonic()` below is simulated time there and real time on a live server
+_wall = time.perf_counter
+
+PhaseRecord = namedtuple("PhaseRecord", ["name", "t0", "t1", "wall_s"])
+
+
+class PhaseTimer:
+    """
+    Collects named time intervals of a mission (connect, poses, climb, flight,
+    dwell, safety, ...). Phases may nest or overlap (concurrent tasks); each
+    interval is kept as is.
+
+        with phase("climb"):
+            client.moveToZAsync(...).join()
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def reset(self):
+        self.records = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        t0 = time.monotonic()
+        w0 = _wall()
+        try:
+            yield
+        finally:
+            self.records.append(PhaseRecord(name, t0, time.monotonic(), _wall() - w0))
+
+    async def timed(self, name, awaitable):
+        """Await `awaitable` inside a phase (for tasks started with ensure_future)."""
+        with self.phase(name):
+            return await awaitable
+
+    def summary(self):
+        out = {}
+        for r in self.records:
+            s = out.setdefault(r.name, {"count": 0, "total_s": 0.0, "max_s": 0.0, "wall_s": 0.0})
+            d = r.t1 - r.t0
+            s["count"] += 1
+            s["total_s"] += d
+            s["max_s"] = max(s["max_s"], d)
+            s["wall_s"] += r.wall_s
+        return out
+
+    def print_summary(self):
+        for name, s in self.summary().items():
+            print(f"[phase] {name:<10} x{s['count']:<4} {s['total_s']:8.2f}s (max {s['max_s']:.2f}s)")
+
+
+PHASES = PhaseTimer()
+phase = PHASES.phase
+timed = PHASES.timed
\ No newline at end of file
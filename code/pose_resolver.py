@@ -0,0 +1,110 @@
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cosysairsim as airsim
+
+POOL_SIZE = 4
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pose_cache.json")
+
+
+def check_pose(name, pose):
+    """
+    Return (x, y, z) of a simGetObjectPose result or raise RuntimeError.
+
+    simGetObjectPose does not return None for unknown actors, it returns a pose
+    full of NaN, so both cases (and inf) are rejected here.
+    """
+    if pose is None or pose.position is None:
+        raise RuntimeError(f"Could not find object '{name}'")
+
+    p = pose.position
+    xyz = (p.x_val, p.y_val, p.z_val)
+    if not all(math.isfinite(v) for v in xyz):
+        raise RuntimeError(f"Object '{name}' has an invalid pose {xyz}")
+    return xyz
+
+
+def _fetch_chunk(client_factory, names):
+    client = client_factory()
+    out = {}
+    for name in names:
+        try:
+            out[name] = check_pose(name, client.simGetObjectPose(name))
+        except Exception as e:
+            out[name] = e
+    return out
+
+
+def fetch_positions(names, client_factory=airsim.MultirotorClient, pool_size=POOL_SIZE):
+    """
+    Fetch many actor positions concurrently, one client connection per worker.
+
+    Returns an (N,3) float64 array in the order of `names`. Every name is
+    validated; if any fail, one RuntimeError lists all of them.
+    """
+    names = list(names)
+    if not names:
+        return np.zeros((0, 3))
+
+    n_workers = max(1, min(pool_size, len(names)))
+    chunks = [names[i::n_workers] for i in range(n_workers)]
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="pose") as pool:
+        for part in pool.map(lambda c: _fetch_chunk(client_factory, c), chunks):
+            results.update(part)
+
+    errors = [f"{n}: {r}" for n, r in results.items() if isinstance(r, Exception)]
+    if errors:
+        raise RuntimeError("Pose lookup failed for " + "; ".join(errors))
+
+    return np.array([results[n] for n in names], dtype=np.float64)
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path=CACHE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def resolve_positions(names, level_name=None, cache_path=CACHE_PATH, refresh=False,
+                      client_factory=airsim.MultirotorClient, pool_size=POOL_SIZE):
+    """
+    Positions (N,3) of `names`, using the on-disk cache for `level_name`.
+
+    Only names missing from the cache are looked up. Pass refresh=True (or
+    delete the cache file) after moving actors in the level. level_name=None
+    disables the cache.
+    """
+    names = list(names)
+    if level_name is None:
+        return fetch_positions(names, client_factory, pool_size)
+
+    cache = load_cache(cache_path)
+    level = {} if refresh else cache.get(level_name, {})
+
+    missing = [n for n in names if n not in level]
+    if missing:
+        t0 = time.perf_counter()
+        fetched = fetch_positions(missing, client_factory, pool_size)
+        print(f"[poses] fetched {len(missing)} poses in {time.perf_counter() - t0:.3f}s "
+              f"({len(names) - len(missing)} cached)")
+        for name, xyz in zip(missing, fetched.tolist()):
+            level[name] = xyz
+        cache[level_name] = level
+        save_cache(cache, cache_path)
+
+    return np.array([level[n] for n in names], dtype=np.float64)
\ No newline at end of file
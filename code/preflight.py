@@ -0,0 +1,275 @@
+"""
+Pre-flight check of a whole mission route, before arming.
+
+Every leg of the route as it will be flown (takeoff climb to SAFE_Z, then
+stop to stop at min(z_target, SAFE_Z) as in waypoint3) is checked against
+every zone in one vectorized (zones x legs) pass: target inside a zone, leg
+crossing a zone (waypoint3 rule), altitude above the ceiling. Only the
+blocked legs are handed to the detour planner, so a full report is ready in
+milliseconds and a mission that can never finish is rejected on the ground.
+With corridor altitudes (altitude_planner.py) each leg is built the way it
+is flown instead, safety.plan_leg from the previous stop: the climb to the
+leg's altitude, then the level leg (raised again if its detour needs it).
+
+    python preflight.py missions/waypoint3.json                 # actor positions from headless_scene.json
+    python preflight.py missions/*.json --scene my_scene.json
+
+A mission file is checked the way mission_engine flies it: in its optimized
+stop order when "order.optimize" is set, and against its own "preflight"
+mode: "warn" reports without failing the exit code, "off" is skipped.
+
+Legs to `preview` stops (waypoint3's Actor_4) are reported but never fail
+the check: holding before them is the expected outcome.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from altitude_planner import AltitudePlanner
+from forbidden_zone import OrientedBoxZone
+from path_planner import path_length
+from route_order import reorder_waypoints
+from safety import decide_leg, plan_leg
+from zone_index import ZoneRegistry
+
+MAX_ALTITUDE_M = 120.0     # ceiling above the takeoff point: NED z >= -MAX_ALTITUDE_M
+TAKEOFF_ALT_M = 3.0        # the climb leg starts here (takeoffAsync height)
+
+FAILING = ("target_forbidden", "no_route", "altitude")
+
+# status: "ok" | "detour" | "target_forbidden" | "no_route" | "altitude"
+LegCheck = namedtuple("LegCheck", ["leg", "frm", "to", "start", "target", "status", "zones", "detour",
+                                   "length_m", "preview"])
+PreflightReport = namedtuple("PreflightReport", ["ok", "legs", "problems", "safe_z", "ms"])
+
+
+def _boxes(zones):
+    """Indices and stacked (cx, cy, cz, ex, ey, ez, c, s) columns (Z,1) of the OrientedBoxZones."""
+    idx = [i for i, z in enumerate(zones) if isinstance(z, OrientedBoxZone)]
+    cols = np.array([[zones[i].cx, zones[i].cy, zones[i].cz, zones[i].ex, zones[i].ey, zones[i].ez,
+                      zones[i].c, zones[i].s] for i in idx], dtype=np.float64).reshape(-1, 8)
+    return idx, [cols[:, k:k + 1] for k in range(8)]
+
+
+def _local(pts, cx, cy, c, s):
+    dx = pts[:, 0] - cx
+    dy = pts[:, 1] - cy
+    return dx * c - dy * s, dx * s + dy * c
+
+
+def points_in_zones(zones, points):
+    """(Z, N) bool: point n inside zone z. All boxes in one broadcast, other zones one by one."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    out = np.zeros((len(zones), len(pts)), dtype=bool)
+    idx, (cx, cy, cz, ex, ey, ez, c, s) = _boxes(zones)
+    if idx:
+        lx, ly = _local(pts, cx, cy, c, s)
+        out[idx] = (np.abs(lx) <= ex) & (np.abs(ly) <= ey) & (np.abs(pts[:, 2] - cz) <= ez)
+    for i, zone in enumerate(zones):
+        if not isinstance(zone, OrientedBoxZone):
+            out[i] = [zone.contains_point(x, y, z) for x, y, z in pts.tolist()]
+    return out
+
+
+def legs_in_zones(zones, starts, ends):
+    """
+    (Z, N) bool: leg n blocked by zone z (XY crossing + Z band at either end,
+    the waypoint3 rule). Boxes: slab test in each box frame, all at once.
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+    out = np.zeros((len(zones), len(starts)), dtype=bool)
+    idx, (cx, cy, cz, ex, ey, ez, c, s) = _boxes(zones)
+    if idx:
+        x0, y0 = _local(starts, cx, cy, c, s)
+        x1, y1 = _local(ends, cx, cy, c, s)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # slab test: parameter range of the segment inside each pair of edges
+            # (a leg parallel to an edge gets +-inf, i.e. all or nothing)
+            ix, iy = 1.0 / (x1 - x0), 1.0 / (y1 - y0)
+            ax, bx = (-ex - x0) * ix, (ex - x0) * ix
+            ay, by = (-ey - y0) * iy, (ey - y0) * iy
+            u1 = np.maximum(np.maximum(np.fmin(ax, bx), np.fmin(ay, by)), 0.0)
+            u2 = np.minimum(np.minimum(np.fmax(ax, bx), np.fmax(ay, by)), 1.0)
+        in_z = (np.abs(starts[:, 2] - cz) <= ez) | (np.abs(ends[:, 2] - cz) <= ez)
+        out[idx] = in_z & (u1 <= u2)
+    for i, zone in enumerate(zones):
+        if not isinstance(zone, OrientedBoxZone):
+            out[i] = [zone.leg_blocked(*a, *b) for a, b in zip(starts.tolist(), ends.tolist())]
+    return out
+
+
+def fitted_legs(waypoints, start, zones, planner, replan, preview, altitudes, ceiling):
+    """
+    LegChecks of the stop legs flown with `altitudes` (AltitudePlanner), from
+    `start` (the top of the takeoff climb): each leg is safety.plan_leg from
+    the previous leg's fitted target, so its climb point, corridor altitude
+    and detour are the ones the drone flies.
+    """
+    legs = []
+    for n, w in enumerate(waypoints, 1):
+        is_preview = w[1] in preview
+        retry = replan and planner is not None and not is_preview
+        climb, target, decision = plan_leg(start, w[2], w[3], w[5], math.inf, altitudes,
+                                           lambda s, t: decide_leg(s, t, zones, planner, retry))
+        level = climb[-1] if climb else start
+        route = [start] + climb + decision.detour + [target]
+        status = decision.reason or "ok"
+        if status == "target_forbidden":
+            zone_names = [z.name for z in zones.zones_at(*target)]
+        else:
+            zone_names = [z.name for z in zones.zones_on_leg(*level, *target)] if status != "ok" else []
+            if any(p[2] < ceiling for p in route[1:]):
+                status = "altitude"
+        frm = waypoints[n - 2][1] if n > 1 else "takeoff"
+        legs.append(LegCheck(n, frm, w[1], start, target, status, zone_names, list(decision.detour),
+                             path_length(route), is_preview))
+        start = target
+    return legs
+
+
+def check_route(waypoints, start_xy, safe_z, zones, planner=None, replan=True, preview=(),
+                max_altitude_m=MAX_ALTITUDE_M, takeoff_alt_m=TAKEOFF_ALT_M, altitudes=None):
+    """
+    Check waypoint3-style tuples (idx, name, x, y, z_roof, z_target), in flight
+    order, from the takeoff spot `start_xy`. Stops are flown at
+    min(z_target, safe_z) (safe_z=math.inf: at z_target), or with `altitudes`
+    (AltitudePlanner) each leg as safety.plan_leg builds it.
+    """
+    t0 = time.perf_counter()
+    registry = zones if isinstance(zones, ZoneRegistry) else ZoneRegistry(zones)
+    zones = list(zones)
+    problems = []
+    ceiling = -max_altitude_m
+
+    climb_z = safe_z if math.isfinite(safe_z) else (waypoints[0][5] if waypoints else -takeoff_alt_m)
+    if climb_z < ceiling:
+        problems.append(f"SAFE_Z {climb_z:.1f} is above the {max_altitude_m:g} m ceiling")
+
+    names = ["takeoff"] + [w[1] for w in waypoints]
+    points = [(start_xy[0], start_xy[1], -takeoff_alt_m), (start_xy[0], start_xy[1], climb_z)]
+    if altitudes is None:
+        points += [(w[2], w[3], min(w[5], safe_z)) for w in waypoints]
+    pts = np.asarray(points, dtype=np.float64)
+    starts, ends = pts[:-1], pts[1:]
+
+    # one pass per zone over all legs
+    target_hit = points_in_zones(zones, ends)
+    leg_hit = legs_in_zones(zones, starts, ends)
+    too_high = ends[:, 2] < ceiling
+
+    legs = []
+    for n in range(len(ends)):
+        frm = names[n - 1] if n else "takeoff"
+        to = "climb" if n == 0 else names[n]
+        is_preview = to in preview
+        hits = [zones[i].name for i in np.flatnonzero(target_hit[:, n])]
+        blocking = [zones[i].name for i in np.flatnonzero(leg_hit[:, n])]
+        start, target = tuple(starts[n].tolist()), tuple(ends[n].tolist())
+        detour = []
+
+        if hits:
+            status, zone_names = "target_forbidden", hits
+        elif too_high[n]:
+            status, zone_names = "altitude", []
+        elif blocking:
+            route = planner.plan(start, target) if planner is not None and replan and not is_preview else None
+            if route is None:
+                status = "no_route"
+            elif any(p[2] < ceiling for p in route):
+                status = "altitude"
+            else:
+                status, detour = "detour", [tuple(p) for p in route[1:-1]]
+            zone_names = blocking
+        else:
+            status, zone_names = "ok", []
+        legs.append(LegCheck(n, frm, to, start, target, status, zone_names, detour,
+                             path_length([start] + detour + [target]), is_preview))
+    if altitudes is not None:
+        legs += fitted_legs(waypoints, points[-1], registry, planner, replan, preview, altitudes, ceiling)
+
+    ok = not problems and not any(leg.status in FAILING and not leg.preview for leg in legs)
+    return PreflightReport(ok, legs, problems, safe_z, (time.perf_counter() - t0) * 1000.0)
+
+
+def print_report(report):
+    verdict = "OK" if report.ok else "FAILED"
+    print(f"\n[preflight] {verdict}: {len(report.legs)} legs checked in {report.ms:.2f} ms"
+          + (f", SAFE_Z {report.safe_z:.1f}" if math.isfinite(report.safe_z) else ""))
+    for p in report.problems:
+        print(f"  ! {p}")
+    for leg in report.legs:
+        if leg.status == "ok":
+            continue
+        what = f"{leg.status}" + (f" ({', '.join(leg.zones)})" if leg.zones else "")
+        if leg.status == "detour":
+            what += f": {len(leg.detour)} corner(s), {leg.length_m:.0f} m"
+        print(f"  leg {leg.leg} {leg.frm} -> {leg.to}: {what}" + ("  [preview]" if leg.preview else ""))
+    total = sum(leg.length_m for leg in report.legs if not leg.preview)
+    print(f"  route length {total:.0f} m")
+
+
+def check_mission(mission, actors, start_xy=(0.0, 0.0)):
+    """
+    check_route for a compiled mission_schema.Mission, actor name -> (x, y, roof z),
+    with mission_engine.run_mission's SAFE_Z, stop order and altitudes.
+    """
+    import actions
+
+    waypoints = []
+    preview = set()
+    for w in mission.waypoints:
+        x, y, z_roof = actors[w.actor]
+        waypoints.append((w.index, w.actor, x, y, z_roof, z_roof - w.roof_clearance_m))
+        if any(not actions.REGISTRY[a.name].flies for a in w.actions):
+            preview.add(w.actor)
+    alt = mission.altitude
+    if alt.mode in ("safe_z", "corridor"):
+        safe_z = min(w[5] for w in waypoints) - (alt.extra_clearance_m + alt.safe_z_margin_m)
+        climb_z = safe_z
+    else:
+        safe_z = math.inf
+        climb_z = waypoints[0][5]
+    if mission.order.optimize:
+        waypoints = reorder_waypoints(waypoints, (start_xy[0], start_xy[1], climb_z), safe_z, mission.zones,
+                                      mission.planner, mission.order.fixed_tail, mission.order.time_budget_s)[0]
+    altitudes = None
+    if alt.mode == "corridor":
+        altitudes = AltitudePlanner.from_waypoints(
+            waypoints, max(w.roof_clearance_m for w in mission.waypoints) + alt.extra_clearance_m, alt.safe_z_margin_m)
+        waypoints, safe_z = altitudes.route(waypoints, start_xy), math.inf
+    return check_route(waypoints, start_xy, safe_z, mission.zones, mission.planner,
+                       replan=mission.on_block == "detour", preview=preview, altitudes=altitudes)
+
+
+if __name__ == "__main__":
+    from mission_schema import MissionError, load_mission
+
+    parser = argparse.ArgumentParser(description="Pre-flight check of mission files")
+    parser.add_argument("missions", nargs="+")
+    parser.add_argument("--scene", default="headless_scene.json", help="actor positions (NED m)")
+    args = parser.parse_args()
+
+    with open(args.scene, "r", encoding="utf-8") as f:
+        scene_actors = json.load(f)["actors"]
+    status = 0
+    for path in args.missions:
+        try:
+            m = load_mission(path)
+            if m.preflight == "off":
+                print(f"[preflight] {m.name}: skipped (\"preflight\": \"off\")")
+                continue
+            rep = check_mission(m, scene_actors)
+        except (OSError, KeyError, MissionError) as e:
+            print(f"[preflight] {path}: {e}")
+            status = 1
+            continue
+        print(f"[preflight] {m.name}" + (" (\"preflight\": \"warn\", not failing)" if m.preflight == "warn" else ""))
+        print_report(rep)
+        status |= not rep.ok and m.preflight == "reject"
+    sys.exit(status)
\ No newline at end of file
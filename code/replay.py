@@ -0,0 +1,231 @@
+"""
+Offline replay of recorded waypoint3 / mission_engine flights (telemetry.py
+logs), no simulator:
+
+    python replay.py telemetry/20260301-101500        # one run
+    python replay.py telemetry                        # every run in it, one process per core
+
+Every recorded leg (start point, requested z, decision) is planned again
+through safety.plan_leg with the zones, planner and replan setting stored in
+the log (the set in force when the leg was planned) and the recorded SAFE_Z
+or corridor altitude planner, its height field grown by the same LiDAR scans
+before the same legs; every sample's position goes through the zone check,
+and every recorded LiDAR scan through obstacle_detect.detect() with the
+recorded settings. A decision, detour, fitted altitude, flag or corridor
+count that comes out differently is a mismatch (exit code 1). Nothing waits
+on a clock, so a replay runs as fast as the checks do.
+
+Version 1 logs store neither zones nor scans: their legs and samples are
+checked against waypoint3's current zones, and their LiDAR is not replayed.
+Logs before version 3 store no altitude inputs: their legs are re-decided
+with safety.decide_leg between the recorded start and target.
+"""
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from altitude_planner import AltitudePlanner
+from obstacle_detect import detect
+from path_planner import DetourPlanner
+from safety import decide_leg, decision_kind, plan_leg
+from telemetry import FLAG_IN_ZONE, FLAG_LIDAR_BLOCKED, TelemetryLog
+from zone_index import ZoneRegistry, zone_from_dict
+
+LEG_DECISIONS = ("fly", "detour", "target_forbidden", "no_route", "preview_hold", "preview_stop")
+Z_MATCH_M = 0.01            # replayed target altitude within this of the recorded one (float32 log)
+
+# z_request: the z asked of plan_leg (NaN: not recorded)
+RecordedLeg = namedtuple("RecordedLeg", ["t", "leg", "start", "target", "kind", "detour_corners", "z_request"])
+# safe_z and AltitudePlanner (None: legs at SAFE_Z) the legs were planned with, and the
+# (t, world points, origin) LiDAR scans fused into its height field during the flight
+AltitudeInputs = namedtuple("AltitudeInputs", ["safe_z", "planner", "scans"])
+Mismatch = namedtuple("Mismatch", ["t", "what", "recorded", "replayed"])
+ReplayResult = namedtuple("ReplayResult", ["run_dir", "legs", "samples", "mismatches", "seconds", "notes"])
+# zones, planner and replan setting in force from t on
+SafetySet = namedtuple("SafetySet", ["t", "digest", "zones", "planner", "replan"])
+
+
+def safety_sets(log):
+    """The recorded zone sets in time order; [] for a log that has none."""
+    out = []
+    for entry in log.meta.get("safety", []):
+        zones = ZoneRegistry([zone_from_dict(d) for d in entry["zones"]])
+        planner = DetourPlanner(zones, **entry["planner"]) if entry["planner"] is not None else DetourPlanner(zones)
+        out.append(SafetySet(entry["t"], entry["zones_digest"], zones, planner, entry["replan"]))
+    return out
+
+
+def current_safety():
+    """waypoint3's zones today, for logs that did not record theirs."""
+    from waypoint3 import PLANNER, REPLAN_ON_BLOCK, ZONES
+    return [SafetySet(0.0, None, ZONES, PLANNER, REPLAN_ON_BLOCK)]
+
+
+def altitude_inputs(log):
+    """The recorded altitude inputs; None for a log that has none."""
+    entry = log.meta.get("altitude")
+    if entry is None:
+        return None
+    planner = AltitudePlanner.from_dict(entry["planner"]) if entry["planner"] is not None else None
+    safe_z = math.inf if entry["safe_z"] is None else entry["safe_z"]
+    return AltitudeInputs(safe_z, planner, log.height_scans())
+
+
+def set_at(sets, t):
+    """The set in force at time t."""
+    return sets[max(0, int(np.searchsorted([s.t for s in sets], t, side="right")) - 1)]
+
+
+def recorded_legs(log):
+    """Legs of a log in recorded order: each decision event paired with its leg_start."""
+    kinds = log.event_kinds
+    starts = {}
+    legs = []
+    for e in log.events:
+        kind = kinds[e["kind"]]
+        leg = int(e["leg"])
+        xyz = (float(e["x"]), float(e["y"]), float(e["z"]))
+        if kind == "leg_start":
+            starts[leg] = xyz, float(e["value"])
+        elif kind in LEG_DECISIONS and leg in starts:
+            detour = 0 if np.isnan(e["value"]) else int(e["value"])
+            start, z_request = starts.pop(leg)
+            legs.append(RecordedLeg(float(e["t"]), leg, start, xyz, kind, detour, z_request))
+    return legs
+
+
+def replay_legs(legs, sets, altitude=None):
+    """
+    Plan every recorded leg again with the zone set of its time: through
+    plan_leg with the `altitude` inputs (the scans recorded before the leg
+    fused first), or, without them, decide_leg from the recorded start to
+    the recorded target. Returns the mismatches.
+    """
+    out = []
+    fused = 0
+    for rec in legs:
+        preview = rec.kind.startswith("preview_")
+        safety = set_at(sets, rec.t)
+
+        def decide(start, target):
+            return decide_leg(start, target, safety.zones, safety.planner, replan=safety.replan and not preview)
+
+        if altitude is None or math.isnan(rec.z_request):
+            decision, z = decide(rec.start, rec.target), rec.target[2]
+        else:
+            while fused < len(altitude.scans) and altitude.scans[fused][0] < rec.t:
+                _, points, origin = altitude.scans[fused]
+                altitude.planner.heights.add_points(points, origin)
+                fused += 1
+            _, (_, _, z), decision = plan_leg(rec.start, rec.target[0], rec.target[1], rec.z_request,
+                                              altitude.safe_z, altitude.planner, decide)
+        kind = decision_kind(decision, preview)
+        if kind != rec.kind:
+            out.append(Mismatch(rec.t, f"leg {rec.leg} decision", rec.kind, kind))
+        elif kind == "detour" and len(decision.detour) != rec.detour_corners:
+            out.append(Mismatch(rec.t, f"leg {rec.leg} detour corners", rec.detour_corners, len(decision.detour)))
+        elif abs(z - rec.target[2]) > Z_MATCH_M:
+            out.append(Mismatch(rec.t, f"leg {rec.leg} target z", round(rec.target[2], 2), round(z, 2)))
+    return out
+
+
+def replay_samples(samples, sets):
+    """Re-run the in-zone check on every sample, with the zone set of its time; returns the mismatches."""
+    out = []
+    in_zone = np.fromiter((set_at(sets, t).zones.point_blocked(float(x), float(y), float(z))
+                           for t, x, y, z in zip(samples["t"], samples["x"], samples["y"], samples["z"])),
+                          dtype=bool, count=len(samples))
+    recorded = (samples["flags"] & FLAG_IN_ZONE) != 0
+    for i in np.flatnonzero(in_zone != recorded):
+        out.append(Mismatch(float(samples["t"][i]), "in_zone", bool(recorded[i]), bool(in_zone[i])))
+    return out
+
+
+def replay_scans(log):
+    """Re-run detect() on every recorded LiDAR scan; returns the mismatches."""
+    samples = log.samples
+    settings = log.meta.get("detect", {})
+    out = []
+    for i in np.flatnonzero(samples["scan_points"]):
+        t = float(samples["t"][i])
+        report = detect(log.scan(i), **settings)
+        recorded = bool(samples["flags"][i] & FLAG_LIDAR_BLOCKED)
+        if report.blocked != recorded:
+            out.append(Mismatch(t, "lidar_blocked", recorded, report.blocked))
+        elif report.count != int(samples["lidar_points"][i]):
+            out.append(Mismatch(t, "lidar_points", int(samples["lidar_points"][i]), report.count))
+    return out
+
+
+def replay_run(run_dir) -> ReplayResult:
+    t0 = time.perf_counter()
+    log = TelemetryLog(run_dir)
+    legs = recorded_legs(log)
+    notes = []
+    sets = safety_sets(log)
+    if not sets:
+        sets = current_safety()
+        notes.append("no zone set recorded, checked against waypoint3's current zones")
+    altitude = altitude_inputs(log)
+    if altitude is None and legs:
+        notes.append("no altitude inputs recorded, legs re-decided from their recorded targets")
+    mismatches = replay_legs(legs, sets, altitude) + replay_samples(log.samples, sets)
+    if "scan_points" in log.samples.dtype.names:
+        mismatches += replay_scans(log)
+    elif len(log.samples) and not np.isnan(log.samples["lidar_min_m"]).all():
+        notes.append("LiDAR not replayed: the log has no scans")
+    mismatches.sort(key=lambda m: m.t)
+    digests = sorted({s.digest for s in sets if s.digest is not None})
+    if len(digests) > 1:
+        notes.append(f"zone sets {', '.join(digests)}")
+    return ReplayResult(run_dir, len(legs), len(log.samples), mismatches, time.perf_counter() - t0, notes)
+
+
+def replay_many(run_dirs, workers=None):
+    """Replay runs in parallel, one process per core by default (workers=1: in this process)."""
+    if workers == 1 or len(run_dirs) <= 1:
+        return [replay_run(d) for d in run_dirs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(replay_run, run_dirs))
+
+
+def find_runs(paths):
+    runs = []
+    for p in paths:
+        if os.path.exists(os.path.join(p, "meta.json")):
+            runs.append(p)
+        elif os.path.isdir(p):
+            runs += sorted(os.path.join(p, d) for d in os.listdir(p)
+                           if os.path.exists(os.path.join(p, d, "meta.json")))
+    return runs
+
+
+def print_results(results, wall_s=None):
+    for r in results:
+        status = "OK" if not r.mismatches else f"{len(r.mismatches)} MISMATCH(ES)"
+        print(f"[replay] {r.run_dir}: {r.legs} legs, {r.samples} samples in {r.seconds * 1000:.0f} ms -> {status}")
+        for note in r.notes:
+            print(f"  note: {note}")
+        for m in r.mismatches[:10]:
+            print(f"  t={m.t:8.2f}s {m.what}: recorded {m.recorded}, replayed {m.replayed}")
+        if len(r.mismatches) > 10:
+            print(f"  ... {len(r.mismatches) - 10} more")
+    if wall_s is not None:
+        samples = sum(r.samples for r in results)
+        print(f"[replay] {len(results)} run(s), {samples} samples in {wall_s:.2f}s wall")
+
+
+if __name__ == "__main__":
+    runs = find_runs(sys.argv[1:] or ["telemetry"])
+    if not runs:
+        print("No telemetry runs found.")
+        sys.exit(2)
+    t0 = time.perf_counter()
+    results = replay_many(runs)
+    print_results(results, time.perf_counter() - t0)
+    sys.exit(1 if any(r.mismatches for r in results) else 0)
\ No newline at end of file
@@ -0,0 +1,189 @@
+import math
+import time
+
+import numpy as np
+
+from path_planner import path_length
+
+TIME_BUDGET_S = 0.5
+OR_OPT_MAX_SEG = 3
+
+
+def distance_matrix(points, zones=None, planner=None):
+    """
+    (N,N) flight distance between (x,y,z) points in meters.
+
+    Straight 3D distance, except for pairs whose leg is blocked by `zones`
+    (waypoint3 rule), which cost the planner's detour length (inf if none).
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    diff = pts[:, None, :] - pts[None, :, :]
+    dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+
+    if zones is None or len(zones) == 0:
+        return dist
+
+    n = len(pts)
+    iu, ju = np.triu_indices(n, k=1)
+    if len(zones) <= 64:
+        # few zones: one vectorized pass per zone over all pairs
+        blocked = np.zeros(len(iu), dtype=bool)
+        for z in zones:
+            if hasattr(z, "segments_blocked"):
+                blocked |= z.segments_blocked(pts[iu], pts[ju])
+            else:
+                blocked |= np.array([z.leg_blocked(*pts[a], *pts[b]) for a, b in zip(iu, ju)], dtype=bool)
+    else:
+        blocked = np.array([zones.leg_blocked(*pts[a], *pts[b]) for a, b in zip(iu, ju)], dtype=bool)
+
+    for a, b in zip(iu[blocked], ju[blocked]):
+        route = planner.plan(pts[a], pts[b]) if planner is not None else None
+        dist[a, b] = dist[b, a] = path_length(route) if route is not None else math.inf
+    return dist
+
+
+def route_cost(d, route):
+    r = np.asarray(route)
+    return float(d[r[:-1], r[1:]].sum())
+
+
+def nearest_neighbour(d, start, nodes, end=None):
+    route = [start]
+    left = set(nodes) - {start, end}
+    cur = start
+    while left:
+        cand = np.fromiter(left, dtype=np.int64)
+        nxt = int(cand[np.argmin(d[cur, cand])])
+        route.append(nxt)
+        left.remove(nxt)
+        cur = nxt
+    if end is not None:
+        route.append(end)
+    return route
+
+
+def two_opt(d, route, fixed_end, deadline):
+    """Best-improvement 2-opt; each pass scores every (i, j) reversal at once."""
+    r = np.asarray(route, dtype=np.int64)
+    m = len(r)
+    while time.perf_counter() < deadline:
+        a = r[:-1]
+        b = r[1:]
+        # reverse r[i+1..j]: edges (a_i, b_i) and (a_j, b_j) become (a_i, a_j) and (b_i, b_j)
+        delta = d[a[:, None], a[None, :]] + d[b[:, None], b[None, :]] - d[a, b][:, None] - d[a, b][None, :]
+        delta = np.triu(delta, k=1)
+        if not fixed_end:
+            # reversing the whole tail r[i+1..m-1] only swaps edge (a_i, b_i) for (a_i, r_last)
+            tail = d[a, r[-1]] - d[a, b]
+            delta = np.column_stack([delta, np.where(np.arange(m - 1) < m - 2, tail, 0.0)])
+        i, j = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[i, j] > -1e-9:
+            break
+        r[i + 1:j + 1] = r[i + 1:j + 1][::-1]
+    return r.tolist()
+
+
+def or_opt(d, route, fixed_end, deadline, max_seg=OR_OPT_MAX_SEG):
+    """Move runs of 1..max_seg stops to their best other position (first improvement)."""
+    r = list(route)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        last = len(r) - 1 if fixed_end else len(r)
+        for L in range(1, max_seg + 1):
+            for i in range(1, last - L + 1):
+                seg = r[i:i + L]
+                prev, nxt = r[i - 1], (r[i + L] if i + L < len(r) else None)
+                removed = d[prev, seg[0]] + (d[seg[-1], nxt] - d[prev, nxt] if nxt is not None else 0.0)
+
+                rest = np.array(r[:i] + r[i + L:], dtype=np.int64)
+                p = rest[:-1]
+                q = rest[1:]
+                fwd = d[p, seg[0]] + d[seg[-1], q] - d[p, q]
+                rev = d[p, seg[-1]] + d[seg[0], q] - d[p, q]
+                ins = np.minimum(fwd, rev)
+                if not fixed_end:
+                    # appending after the current last stop
+                    ins = np.append(ins, min(d[rest[-1], seg[0]], d[rest[-1], seg[-1]]))
+                k = int(np.argmin(ins))
+                if ins[k] < removed - 1e-9:
+                    if k < len(q) and rev[k] < fwd[k]:
+                        seg = seg[::-1]
+                    elif k == len(q) and d[rest[-1], seg[-1]] < d[rest[-1], seg[0]]:
+                        seg = seg[::-1]
+                    rest = rest.tolist()
+                    r = rest[:k + 1] + seg + rest[k + 1:]
+                    improved = True
+                    break
+                if time.perf_counter() >= deadline:
+                    return r
+            if improved:
+                break
+    return r
+
+
+def order_route(d, start=0, end=None, time_budget_s=TIME_BUDGET_S):
+    """
+    Visit every node of the cost matrix once, beginning at `start` and, if
+    given, finishing at `end`. Nearest-neighbour start, then 2-opt and Or-opt
+    alternately until nothing improves or the time budget is spent.
+    """
+    deadline = time.perf_counter() + time_budget_s
+    # unreachable pairs (no detour) stay last resort without poisoning the deltas with inf - inf
+    finite = np.isfinite(d)
+    d = np.where(finite, d, 1e3 * (d[finite].max() + 1.0))
+    route = nearest_neighbour(d, start, range(len(d)), end)
+    fixed_end = end is not None
+    if len(route) < 4:
+        return route
+
+    best = route_cost(d, route)
+    while time.perf_counter() < deadline:
+        route = two_opt(d, route, fixed_end, deadline)
+        route = or_opt(d, route, fixed_end, deadline)
+        cost = route_cost(d, route)
+        if cost >= best - 1e-9:
+            break
+        best = cost
+    return route
+
+
+def reorder_waypoints(waypoints, start_xyz, safe_z, zones=None, planner=None, fixed_tail=(),
+                      time_budget_s=TIME_BUDGET_S):
+    """
+    Reorder waypoint3-style tuples (idx, name, x, y, z_roof, z_target) to
+    shorten the flight from `start_xyz`. Each stop is flown at
+    min(z_target, safe_z) as in waypoint3.main. Names in `fixed_tail` keep
+    their relative order at the end of the mission.
+
+    Returns (new_waypoints, old_length_m, new_length_m).
+    """
+    tail = [w for w in waypoints if w[1] in fixed_tail]
+    free = [w for w in waypoints if w[1] not in fixed_tail]
+
+    def xyz(w):
+        return (w[2], w[3], min(w[5], safe_z))
+
+    pts = [tuple(start_xyz)] + [xyz(w) for w in free] + ([xyz(tail[0])] if tail else [])
+    d = distance_matrix(pts, zones, planner)
+    end = len(pts) - 1 if tail else None
+
+    order = order_route(d, 0, end, time_budget_s)
+    new_free = [free[i - 1] for i in order[1:] if 1 <= i <= len(free)]
+    new = new_free + tail
+
+    slot = {id(w): k for k, w in enumerate(free, start=1)}
+    if tail:
+        slot[id(tail[0])] = len(pts) - 1
+
+    def length(ws):
+        total = 0.0
+        prev_k, prev_p = 0, pts[0]
+        for w in ws:
+            k = slot.get(id(w))
+            p = xyz(w)
+            total += d[prev_k, k] if (k is not None and prev_k is not None) else math.dist(prev_p, p)
+            prev_k, prev_p = k, p
+        return float(total)
+
+    return new, length(waypoints), length(new)
\ No newline at end of file
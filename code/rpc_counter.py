@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import Counter
+
+# shared by every wrapper, since wrappers on different threads may share one Counter
+_COUNT_LOCK = threading.Lock()
+
+
+class CountingClient:
+    """
+    Wraps an AirSim client and counts every RPC method called through it.
+
+        client = CountingClient(airsim.MultirotorClient())
+        client.hoverAsync(vehicle_name="Drone1").join()   # counted as "hoverAsync"
+        client.print_counts()
+
+    Only calls made through the wrapper are counted; SensorStream pollers use
+    their own connections and report their samples separately. Several wrapped
+    connections can share one `counts` Counter (e.g. AsyncMultirotorClient).
+
+    Pass a `latency` dict (name -> list) to also record how long each call
+    took to return, in seconds. For *Async calls that is the request itself,
+    not the .join() on the returned future.
+    """
+
+    def __init__(self, client, counts=None, latency=None):
+        self._client = client
+        self.counts = Counter() if counts is None else counts
+        self.latency = latency
+        self.t_start = time.monotonic()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def call(*args, **kwargs):
+            with _COUNT_LOCK:
+                self.counts[name] += 1
+            if self.latency is None:
+                return attr(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                dt = time.perf_counter() - t0
+                with _COUNT_LOCK:
+                    self.latency.setdefault(name, []).append(dt)
+
+        return call
+
+    @property
+    def unwrapped(self):
+        return self._client
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def reset(self):
+        self.counts.clear()
+        if self.latency is not None:
+            self.latency.clear()
+        self.t_start = time.monotonic()
+
+    def print_counts(self, label="mission"):
+        elapsed = max(1e-9, time.monotonic() - self.t_start)
+        total = self.total()
+        print(f"[rpc] {label}: {total} calls in {elapsed:.1f}s ({total / elapsed:.1f}/s)")
+        for name, n in self.counts.most_common():
+            print(f"  {name:<28} {n:>6}")
\ No newline at end of file
@@ -0,0 +1,325 @@
+"""
+RPC tracing: duration, payload size and outcome of every AirSim client call,
+kept in per-method log-scale histograms plus a bounded event buffer that is
+written as a Chrome trace (chrome://tracing, ui.perfetto.dev) at exit.
+
+Enable it with an environment variable and run the script through the
+launcher; the entry points need no changes, and without the variable nothing
+is traced:
+
+    AIRSIM_RPC_TRACE=trace.json python -m rpc_trace waypoint3.py
+    AIRSIM_RPC_TRACE=trace.json python -m rpc_trace headless_sim.py waypoint3
+
+The launcher puts tracehook/ on PYTHONPATH, whose sitecustomize.py traces
+the Python processes a traced one starts (e.g. spawned workers) from their
+startup; each writes its own trace.<pid>.json. The same hook works without
+the launcher, for this repo's scripts only:
+
+    PYTHONPATH=tracehook AIRSIM_RPC_TRACE=trace.json python waypoint3.py
+
+install() hooks msgpackrpc itself, so every cosysairsim client in the process
+is traced (state reads, pose queries, the request of each *Async call and its
+.join() as a separate "join" span). headless_sim clients are wrapped with
+TracingClient while a tracer is installed.
+"""
+import atexit
+import json
+import math
+import os
+import runpy
+import sys
+import threading
+import time
+from collections import deque
+
+TRACE_ENV = "AIRSIM_RPC_TRACE"             # output file; set = tracing on
+TRACE_SIZES_ENV = "AIRSIM_RPC_TRACE_SIZES"  # "0" = skip payload sizes (re-packs every request/response)
+TRACE_PID_ENV = "AIRSIM_RPC_TRACE_PID"      # set by the first traced process; children write their own file
+HOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tracehook")   # holds sitecustomize.py
+DEFAULT_TRACE_FILE = "rpc_trace.json"
+MAX_EVENTS = 200_000                       # newest events kept for the trace file
+BUCKETS_PER_DECADE = 8
+MIN_BUCKET_S = 1e-5                        # histogram range 10 us .. 1000 s
+N_BUCKETS = 8 * BUCKETS_PER_DECADE + 1
+
+TRACER = None
+
+
+def bucket_of(seconds):
+    if seconds <= MIN_BUCKET_S:
+        return 0
+    return min(N_BUCKETS - 1, 1 + int(math.log10(seconds / MIN_BUCKET_S) * BUCKETS_PER_DECADE))
+
+
+def bucket_upper_s(i):
+    return MIN_BUCKET_S * 10 ** (i / BUCKETS_PER_DECADE)
+
+
+def payload_size(obj):
+    try:
+        import msgpack
+        return len(msgpack.packb(obj, default=lambda x: x.to_msgpack()))
+    except Exception:
+        return None
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total_s", "max_s", "errors", "bytes_out", "bytes_in")
+
+    def __init__(self):
+        self.buckets = [0] * N_BUCKETS
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.errors = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def percentile(self, p):
+        """Upper edge of the bucket holding the p-th percentile (log-scale resolution)."""
+        if self.count == 0:
+            return None
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(bucket_upper_s(i), self.max_s)
+        return self.max_s
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_s / self.count * 1000, 4) if self.count else None,
+            "p50_ms": _ms(self.percentile(50)),
+            "p95_ms": _ms(self.percentile(95)),
+            "p99_ms": _ms(self.percentile(99)),
+            "max_ms": _ms(self.max_s),
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "buckets": self.buckets,
+        }
+
+
+def _ms(s):
+    return None if s is None else round(s * 1000, 4)
+
+
+class Tracer:
+    """In-memory histograms per (method, kind) and the newest MAX_EVENTS call events."""
+
+    def __init__(self, path=DEFAULT_TRACE_FILE, sizes=True, max_events=MAX_EVENTS):
+        self.path = path
+        self.sizes = sizes
+        self.hist = {}
+        self.events = deque(maxlen=max_events)
+        self.t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, method, kind, t_start, t_end, outcome="ok", bytes_out=None, bytes_in=None):
+        dt = t_end - t_start
+        with self._lock:
+            h = self.hist.get((method, kind))
+            if h is None:
+                h = self.hist[(method, kind)] = Histogram()
+            h.buckets[bucket_of(dt)] += 1
+            h.count += 1
+            h.total_s += dt
+            h.max_s = max(h.max_s, dt)
+            if outcome != "ok":
+                h.errors += 1
+            h.bytes_out += bytes_out or 0
+            h.bytes_in += bytes_in or 0
+        self.events.append((method, kind, t_start, dt, threading.get_ident(), outcome, bytes_out, bytes_in))
+
+    def histograms(self):
+        with self._lock:
+            return {f"{m} ({k})": h.as_dict() for (m, k), h in sorted(self.hist.items())}
+
+    def chrome_trace(self):
+        events = []
+        for method, kind, t_start, dt, tid, outcome, b_out, b_in in list(self.events):
+            args = {"outcome": outcome}
+            if b_out is not None:
+                args["bytes_out"] = b_out
+            if b_in is not None:
+                args["bytes_in"] = b_in
+            events.append({
+                "name": method, "cat": kind, "ph": "X", "pid": os.getpid(), "tid": tid,
+                "ts": round((t_start - self.t0) * 1e6, 1), "dur": round(dt * 1e6, 1), "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"histograms": self.histograms()}}
+
+    def dump(self, path=None):
+        path = path or self.path
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        print(f"[rpc_trace] {len(self.events)} events written to {path}")
+
+    def print_summary(self):
+        print(f"[rpc_trace] {'method':<34} {'n':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name, h in self.histograms().items():
+            print(f"  {name:<40} {h['count']:>6} {h['errors']:>4} {h['p50_ms']:>9.3f} {h['p95_ms']:>9.3f} "
+                  f"{h['p99_ms']:>9.3f} {h['max_ms']:>9.3f}")
+
+
+def _outcome(error):
+    return "ok" if error is None else type(error).__name__ if isinstance(error, BaseException) else "error"
+
+
+class _TracedFuture:
+    """Wraps the future of an *Async call so its .join() is traced as a "join" span."""
+
+    def __init__(self, future, tracer, method):
+        self._future = future
+        self._tracer = tracer
+        self._method = method
+
+    def join(self):
+        t0 = time.perf_counter()
+        outcome = "ok"
+        try:
+            return self._future.join()
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            self._tracer.record(self._method, "join", t0, time.perf_counter(), outcome)
+
+    def __getattr__(self, name):
+        return getattr(self._future, name)
+
+
+class TracingClient:
+    """
+    Wraps any client object (e.g. headless_sim.HeadlessClient) and traces its
+    calls, like install() does for cosysairsim clients. Payload sizes are not
+    recorded here (nothing is serialized).
+    """
+
+    def __init__(self, client, tracer):
+        self._client = client
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        tracer = self._tracer
+
+        def call(*args, **kwargs):
+            t0 = time.perf_counter()
+            outcome = "ok"
+            try:
+                result = attr(*args, **kwargs)
+            except BaseException as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                tracer.record(name, "call", t0, time.perf_counter(), outcome)
+            if name.endswith("Async") and hasattr(result, "join"):
+                return _TracedFuture(result, tracer, name)
+            return result
+
+        return call
+
+
+def wrap(client):
+    """TracingClient around `client` while a tracer is installed, else `client` itself."""
+    return TracingClient(client, TRACER) if TRACER is not None else client
+
+
+def install(path=None, sizes=None):
+    """Hook msgpackrpc so every client call in this process is traced; dumps the trace at exit."""
+    global TRACER
+    if TRACER is not None:
+        return TRACER
+    from msgpackrpc import session
+    from msgpackrpc.future import Future
+
+    if sizes is None:
+        sizes = os.environ.get(TRACE_SIZES_ENV, "1") != "0"
+    tracer = Tracer(path or os.environ.get(TRACE_ENV) or DEFAULT_TRACE_FILE, sizes)
+    orig_call, orig_call_async, orig_join = session.Session.call, session.Session.call_async, Future.join
+
+    def call(self, method, *args):
+        t0 = time.perf_counter()
+        outcome, result = "ok", None
+        try:
+            result = orig_call(self, method, *args)
+            return result
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            t1 = time.perf_counter()
+            tracer.record(method, "call", t0, t1, outcome,
+                          payload_size(args) if tracer.sizes else None,
+                          payload_size(result) if tracer.sizes and outcome == "ok" else None)
+
+    def call_async(self, method, *args):
+        t0 = time.perf_counter()
+        future = orig_call_async(self, method, *args)
+        tracer.record(method, "call", t0, time.perf_counter(), "ok", payload_size(args) if tracer.sizes else None)
+        future._trace_method = method
+        return future
+
+    def join(self):
+        # only the first join of an *Async future; get() joins again internally
+        method = self.__dict__.pop("_trace_method", None)
+        if method is None:
+            return orig_join(self)
+        t0 = time.perf_counter()
+        try:
+            return orig_join(self)
+        finally:
+            tracer.record(method, "join", t0, time.perf_counter(), _outcome(self._error))
+
+    session.Session.call, session.Session.call_async, Future.join = call, call_async, join
+    TRACER = tracer
+    atexit.register(tracer.dump)
+    return tracer
+
+
+def startup():
+    """install() if TRACE_ENV is set, with a summary at exit; what tracehook/ and the launcher call."""
+    path = os.environ.get(TRACE_ENV)
+    if not path or TRACER is not None:
+        return TRACER
+    root = os.environ.setdefault(TRACE_PID_ENV, str(os.getpid()))
+    if root != str(os.getpid()):
+        stem, ext = os.path.splitext(path)
+        path = f"{stem}.{os.getpid()}{ext or '.json'}"
+    try:
+        tracer = install(path)
+    except ImportError as e:
+        # a Python without cosysairsim: the hook must never break its startup
+        print(f"[rpc_trace] not tracing: {e}")
+        return None
+    atexit.register(tracer.print_summary)   # runs before the dump (atexit is last in, first out)
+    return tracer
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("usage: python -m rpc_trace script.py [args...]")
+        sys.exit(2)
+    script = sys.argv[1]
+    sys.argv = sys.argv[1:]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    # install on the importable module, the one headless_sim and the scripts see
+    import rpc_trace
+    if rpc_trace.startup() is None:
+        print(f"[rpc_trace] {TRACE_ENV} is not set, running {script} without tracing")
+    else:
+        paths = os.environ.get("PYTHONPATH")
+        os.environ["PYTHONPATH"] = HOOK_DIR + (os.pathsep + paths if paths else "")
+    runpy.run_path(script, run_name="__main__")
+
+
+if __name__ != "__main__":
+    startup()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
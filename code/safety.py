@@ -0,0 +1,53 @@
+"""
+The per-leg safety decision of waypoint3, mission_engine and its actions,
+preflight.py, replay.py and monte_carlo.py: a pure function of the leg, the
+zones and the detour planner (no client calls, no script constants), so
+recorded flights and random variants can re-run it exactly.
+
+    decision = decide_leg(start, target, zones, planner, replan=True)
+    if decision.action == "fly":
+        route = [start] + decision.detour + [target]
+
+plan_leg() adds the leg's altitude: SAFE_Z, or the corridor altitude of an
+altitude_planner.AltitudePlanner with its climb point.
+"""
+from collections import namedtuple
+
+# action: "fly" | "hold"; reason: None (straight leg), "detour", "target_forbidden", "no_route"
+LegDecision = namedtuple("LegDecision", ["action", "reason", "detour"])
+
+
+def decide_leg(start, target, zones, planner, replan=True) -> LegDecision:
+    """
+    Hold if the target is inside a zone; fly straight if the leg is clear;
+    otherwise fly the planner's detour (replan=True) or hold.
+    """
+    if zones.point_blocked(*target):
+        return LegDecision("hold", "target_forbidden", [])
+    if not zones.leg_blocked(*start, *target):
+        return LegDecision("fly", None, [])
+    route = planner.plan(start, target) if replan else None
+    if route is None:
+        return LegDecision("hold", "no_route", [])
+    return LegDecision("fly", "detour", route[1:-1])
+
+
+def plan_leg(start, x, y, z_target, safe_z, altitudes, decide):
+    """
+    (climb, target, decision) of the leg start -> (x, y): flown at
+    min(z_target, safe_z), or with `altitudes` (AltitudePlanner) at its
+    corridor altitude, climbing first if the leg starts lower.
+    decide(start, target) is decide_leg with the zones and planner bound.
+    """
+    if altitudes is None:
+        target = (x, y, min(z_target, safe_z))
+        return [], target, decide(start, target)
+    target = (x, y, min(z_target, altitudes.leg_z(start, (x, y))))
+    return altitudes.fit_leg(start, target, decide)
+
+
+def decision_kind(decision: LegDecision, preview=False) -> str:
+    """Telemetry event kind of a decision (see telemetry.EVENT_KINDS)."""
+    if preview:
+        return "preview_hold" if decision.action == "hold" else "preview_stop"
+    return decision.reason or "fly"
\ No newline at end of file
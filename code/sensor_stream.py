@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import namedtuple
+
+import cosysairsim as airsim
+
+STATE_RATE_HZ = 20.0
+LIDAR_RATE_HZ = 10.0
+RING_SIZE = 64
+
+# t = time.monotonic() when the reply arrived, rpc_s = round-trip of the call
+Sample = namedtuple("Sample", ["t", "seq", "value", "rpc_s"])
+SensorStats = namedtuple("SensorStats", ["name", "samples", "rate_hz", "staleness_s", "rpc_ms", "errors"])
+
+
+def wait_event(event, timeout):
+    """event.wait(timeout), timeout in seconds of `time`; headless_sim swaps in one on its simulated clock."""
+    return event.wait(timeout)
+
+
+def default_client_factory():
+    client = airsim.MultirotorClient()
+    client.confirmConnection()
+    return client
+
+
+class RingBuffer:
+    """
+    Fixed-size ring of samples for ONE writer thread and any number of readers.
+
+    No locks: the writer stores the slot first and only then publishes the new
+    sequence number, and both are single reference assignments (atomic under the
+    GIL), so a reader never sees a half-written sample.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self._slots = [None] * size
+        self._size = size
+        self._seq = 0
+
+    def push(self, sample):
+        self._slots[self._seq % self._size] = sample
+        self._seq += 1
+
+    def latest(self):
+        seq = self._seq
+        if seq == 0:
+            return None
+        return self._slots[(seq - 1) % self._size]
+
+    def recent(self, n=None):
+        """Up to n newest samples, oldest first."""
+        seq = self._seq
+        n = min(seq, self._size) if n is None else min(n, seq, self._size)
+        out = [self._slots[i % self._size] for i in range(seq - n, seq)]
+        # a slot may be overwritten by a newer sample while copying
+        return sorted((s for s in out if s is not None), key=lambda s: s.seq)
+
+    def __len__(self):
+        return min(self._seq, self._size)
+
+
+class SensorPoller(threading.Thread):
+    """
+    Polls one sensor at a fixed rate on its own client connection
+    (msgpack-rpc clients are not safe to share between threads).
+    """
+
+    def __init__(self, name, fetch, rate_hz, client_factory=default_client_factory, ring_size=RING_SIZE):
+        super().__init__(name=f"poll-{name}", daemon=True)
+        self.sensor = name
+        self.fetch = fetch
+        self.period = 1.0 / rate_hz
+        self.client_factory = client_factory
+        self.buffer = RingBuffer(ring_size)
+        self.errors = 0
+        self.last_error = None
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+
+    def run(self):
+        client = self.client_factory()
+        self._ready.set()
+        seq = 0
+        next_t = time.monotonic()
+
+        while not self._stop_event.is_set():
+            t0 = time.monotonic()
+            try:
+                value = self.fetch(client)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+            else:
+                t1 = time.monotonic()
+                self.buffer.push(Sample(t1, seq, value, t1 - t0))
+                seq += 1
+
+            next_t += self.period
+            delay = next_t - time.monotonic()
+            if delay < 0:
+                # fell behind (slow RPC): don't try to catch up with a burst
+                next_t = time.monotonic()
+                delay = 0
+            wait_event(self._stop_event, delay)
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self, now=None) -> SensorStats:
+        now = time.monotonic() if now is None else now
+        samples = self.buffer.recent()
+        if not samples:
+            return SensorStats(self.sensor, 0, 0.0, float("inf"), float("nan"), self.errors)
+
+        span = samples[-1].t - samples[0].t
+        rate = (len(samples) - 1) / span if span > 0 else 0.0
+        rpc_ms = 1e3 * sum(s.rpc_s for s in samples) / len(samples)
+        return SensorStats(self.sensor, samples[-1].seq + 1, rate, now - samples[-1].t, rpc_ms, self.errors)
+
+
+class SensorStream:
+    """
+    Set of background pollers, one thread per sensor.
+
+        stream = SensorStream()
+        stream.add_state("Drone1")
+        stream.add_lidar("LidarFront", "Drone1")
+        with stream:
+            state = stream.latest_value("state")
+    """
+
+    def __init__(self, client_factory=default_client_factory):
+        self.client_factory = client_factory
+        self.pollers = {}
+
+    def add(self, name, fetch, rate_hz, ring_size=RING_SIZE):
+        if name in self.pollers:
+            raise ValueError(f"Sensor '{name}' already added")
+        self.pollers[name] = SensorPoller(name, fetch, rate_hz, self.client_factory, ring_size)
+        return self.pollers[name]
+
+    def add_state(self, vehicle_name, rate_hz=STATE_RATE_HZ, name="state"):
+        return self.add(name, lambda c: c.getMultirotorState(vehicle_name=vehicle_name), rate_hz)
+
+    def add_lidar(self, lidar_name, vehicle_name, rate_hz=LIDAR_RATE_HZ, name="lidar"):
+        return self.add(name, lambda c: c.getLidarData(lidar_name=lidar_name, vehicle_name=vehicle_name), rate_hz)
+
+    def start(self, wait_s=5.0):
+        for p in self.pollers.values():
+            p.start()
+        for p in self.pollers.values():
+            p.wait_ready(wait_s)
+        return self
+
+    def stop(self):
+        for p in self.pollers.values():
+            p.stop()
+        for p in self.pollers.values():
+            p.join(timeout=2.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def latest(self, name) -> Sample:
+        """Newest sample (or None), never blocks."""
+        return self.pollers[name].buffer.latest()
+
+    def latest_value(self, name, max_age_s=None):
+        """Newest value, or None if there is none yet or it is older than max_age_s."""
+        s = self.latest(name)
+        if s is None:
+            return None
+        if max_age_s is not None and time.monotonic() - s.t > max_age_s:
+            return None
+        return s.value
+
+    def stats(self):
+        now = time.monotonic()
+        return {name: p.stats(now) for name, p in self.pollers.items()}
+
+    def print_stats(self):
+        for s in self.stats().values():
+            print(f"[stream] {s.name}: {s.samples} samples, {s.rate_hz:.1f} Hz, "
+                  f"stale={s.staleness_s * 1e3:.0f} ms, rpc={s.rpc_ms:.1f} ms, errors={s.errors}")
+
+
+if __name__ == "__main__":
+    stream = SensorStream()
+    stream.add_state("Drone1")
+    stream.add_lidar("LidarFront", "Drone1")
+
+    with stream:
+        for _ in range(5):
+            time.sleep(1.0)
+            stream.print_stats()
\ No newline at end of file
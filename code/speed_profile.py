@@ -0,0 +1,276 @@
+"""
+Per-segment speed limits for a route, instead of one SPEED_MPS for everything.
+
+Every segment of a route gets a limit from
+  - the cruise ceiling (V_MAX_MPS or the caller's),
+  - its clearance to the zones: the drone must stay inside the clearance with
+    a TRACKING_LAG_S cross-track error, v <= clearance / TRACKING_LAG_S,
+  - the same for its height above the buildings near it, given a height
+    field (altitude_planner.HeightField: the waypoint roofs, LiDAR tops),
+  - climbing / descending share of the segment (V_UP_MPS / V_DOWN_MPS),
+and every corner one from its curvature: sqrt(A_LAT_MPS2 * R) with R the
+radius of the corner as path_executor blends it, raised up to
+sqrt(2 * A_LAT_MPS2 * clearance) when an overshoot that large still misses
+every zone.
+
+Zone- and building-limited segments are cut into PIECE_M pieces first, so a
+segment that passes close to a zone or a roof is only slow where it is close. The route is then split into runs, each flown by one moveOnPathAsync at its
+own speed: neighbouring segments are merged (at the slower speed) as long as
+that is faster than stopping between them, so only a real gain, e.g. a long
+clear leg after a detour along a zone, becomes its own fast run.
+
+    planner = SpeedPlanner(ZONES, heights=altitudes.heights)
+    profile = planner.plan([start, corner, stop], ceiling_mps=15.0)
+    for run in profile.runs:
+        client.moveOnPathAsync(path_of(run.points), run.speed).join()
+
+Time estimates use trapezoidal profiles, or jerk-limited (S-curve) ones with
+`jerk_mps3`. Vertical moves (climb, painting bounce) get vertical_speed():
+never faster than a rest-to-rest move of that length can reach, and downward
+no faster than a stop within OVERSHOOT_M, so the roof clearance is kept.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from forbidden_zone import OrientedBoxZone
+from path_executor import BLEND_RADIUS_M, blend_corners
+from path_planner import zone_corners
+
+V_MAX_MPS = 15.0
+V_MIN_MPS = 2.0
+V_UP_MPS = 8.0
+V_DOWN_MPS = 4.0
+A_MAX_MPS2 = 4.0              # as path_executor.MAX_ACCEL_MPS2
+A_LAT_MPS2 = 3.0              # as path_executor.MAX_LAT_ACCEL_MPS2
+JERK_MPS3 = None              # None = trapezoidal profiles, else jerk-limited
+TRACKING_LAG_S = 0.2          # cross-track error ~ speed * lag on a straight segment
+OVERSHOOT_M = 0.5             # allowed overshoot of a downward move
+SPEED_STEP_MPS = 0.5          # commanded speeds are rounded down to this
+PIECE_M = 40.0                # zone-limited segments are split into pieces this long (only close ones stay slow)
+
+# limit: what sets v_max: "ceiling" | "zone" | "building" | "climb" | "descent";
+# clearance_m: to the nearest zone or building top
+SegmentLimit = namedtuple("SegmentLimit", ["length_m", "v_max", "clearance_m", "limit"])
+Run = namedtuple("Run", ["points", "speed", "est_s"])
+Profile = namedtuple("Profile", ["segments", "corners", "runs", "est_s", "ceiling_mps"])
+
+
+def _point_segment_dist(p, a, b):
+    """(N,) distance from the 2-D points p (N,2) to the segments a-b (N,2 or 2)."""
+    d = b - a
+    dd = np.einsum("...k,...k->...", d, d)
+    t = np.clip(np.einsum("...k,...k->...", p - a, d) / np.where(dd > 0, dd, 1.0), 0.0, 1.0)
+    return np.linalg.norm(p - (a + t[..., None] * d), axis=-1)
+
+
+def segment_clearance(zones, a, b):
+    """
+    Distance from the segment a-b to the nearest zone (0 when it touches one),
+    math.inf without zones. Exact in XY; the Z gap is taken at the closer end,
+    so it never overestimates.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    best = math.inf
+    for zone in zones:
+        z_lo, z_hi = min(a[2], b[2]), max(a[2], b[2])
+        dz = max(0.0, zone.cz - zone.ez - z_hi, z_lo - zone.cz - zone.ez)
+        if zone.segment_crosses(a[0], a[1], b[0], b[1]):
+            dxy = 0.0
+        else:
+            if isinstance(zone, OrientedBoxZone):
+                corners = np.array(zone_corners(zone, 0.0))
+            else:
+                corners = np.column_stack([zone.xs, zone.ys])
+            edges = np.roll(corners, -1, axis=0)
+            ends = np.array([a[:2], b[:2]])
+            dxy = min(float(_point_segment_dist(corners, a[:2], b[:2]).min()),
+                      float(_point_segment_dist(ends[:, None, :], corners[None], edges[None]).min()))
+        best = min(best, math.hypot(dxy, dz))
+    return best
+
+
+def change_time(dv, a_max=A_MAX_MPS2, jerk=JERK_MPS3):
+    """Time to change speed by |dv| from rest acceleration to rest acceleration."""
+    dv = abs(dv)
+    if jerk is None:
+        return dv / a_max
+    if dv >= a_max * a_max / jerk:
+        return dv / a_max + a_max / jerk
+    return 2.0 * math.sqrt(dv / jerk)
+
+
+def segment_time(dist, v_max, v0=0.0, v1=0.0, a_max=A_MAX_MPS2, jerk=JERK_MPS3):
+    """Time over `dist` entering at v0 and leaving at v1, |v| <= v_max (trapezoid or S-curve)."""
+    if dist <= 0:
+        return 0.0
+
+    def ramps(vp):
+        t0, t1 = change_time(vp - v0, a_max, jerk), change_time(vp - v1, a_max, jerk)
+        return t0 + t1, (v0 + vp) / 2.0 * t0 + (vp + v1) / 2.0 * t1   # symmetric ramps: mean speed
+
+    t, d = ramps(v_max)
+    if d <= dist:
+        return t + (dist - d) / v_max
+    lo, hi = max(v0, v1), v_max
+    for _ in range(40):
+        mid = (lo + hi) / 2.0
+        lo, hi = (mid, hi) if ramps(mid)[1] < dist else (lo, mid)
+    return ramps(lo)[0]
+
+
+def vertical_speed(dz, ceiling_mps=None, a_max=A_MAX_MPS2, overshoot_m=OVERSHOOT_M):
+    """
+    Commanded speed of a moveToZAsync by `dz` (NED, > 0 = down): no more than a
+    rest-to-rest move of |dz| reaches, downward no more than stops within overshoot_m.
+    """
+    reach = math.sqrt(a_max * abs(dz))
+    v = min(reach, V_DOWN_MPS if dz > 0 else V_UP_MPS)
+    if dz > 0:
+        v = min(v, math.sqrt(2.0 * a_max * overshoot_m))
+    if ceiling_mps is not None:
+        v = min(v, ceiling_mps)
+    return max(0.5, v)
+
+
+class SpeedPlanner:
+    def __init__(self, zones=(), ceiling_mps=V_MAX_MPS, a_max=A_MAX_MPS2, a_lat=A_LAT_MPS2, jerk_mps3=JERK_MPS3,
+                 blend_radius_m=BLEND_RADIUS_M, heights=None):
+        self.zones = zones
+        self.heights = heights   # altitude_planner.HeightField of the building tops, None = zones only
+        self.ceiling = ceiling_mps
+        self.a_max = a_max
+        self.a_lat = a_lat
+        self.jerk = jerk_mps3
+        self.blend_radius = blend_radius_m
+        self._bounds = (None, None)
+
+    def _near(self, a, b, radius):
+        """Zones whose XY bounds come within `radius` of the segment's bounding box."""
+        key, bounds = self._bounds
+        if key != (id(self.zones), len(self.zones)):
+            zones = list(self.zones)
+            bounds = zones, np.array([z.bounds_xy() for z in zones], dtype=np.float64).reshape(-1, 4)
+            self._bounds = ((id(self.zones), len(self.zones)), bounds)
+        zones, box = bounds
+        hit = ((box[:, 0] <= max(a[0], b[0]) + radius) & (box[:, 2] >= min(a[0], b[0]) - radius)
+               & (box[:, 1] <= max(a[1], b[1]) + radius) & (box[:, 3] >= min(a[1], b[1]) - radius))
+        return [zones[i] for i in np.flatnonzero(hit)]
+
+    def building_clearance(self, a, b, radius):
+        """
+        Height of the segment a-b above the highest known top within `radius` of
+        it (0 when at or below it), math.inf without a height field or tops.
+        Taken at the lower end, so it never overestimates.
+        """
+        if self.heights is None:
+            return math.inf
+        top = self.heights.corridor(a, b, radius).top_z
+        if top is None:
+            return math.inf
+        return max(0.0, top - max(a[2], b[2]))
+
+    def segment_limits(self, route, ceiling_mps):
+        # farther than this from every zone or building, neither segment nor corner limits change
+        radius = max(ceiling_mps * TRACKING_LAG_S, ceiling_mps ** 2 / (2.0 * self.a_lat))
+        out = []
+        for a, b in zip(route[:-1], route[1:]):
+            d = np.subtract(b, a, dtype=np.float64)
+            length = float(np.linalg.norm(d))
+            clear = segment_clearance(self._near(a, b, radius), a, b)
+            roof = self.building_clearance(a, b, radius)
+            caps = {"ceiling": ceiling_mps, "zone": clear / TRACKING_LAG_S, "building": roof / TRACKING_LAG_S}
+            clear = min(clear, roof)
+            if length > 0:
+                # share of the segment that is vertical, at the vertical limit
+                up = max(0.0, -d[2]) / length
+                down = max(0.0, d[2]) / length
+                if up > 0:
+                    caps["climb"] = V_UP_MPS / up
+                if down > 0:
+                    caps["descent"] = V_DOWN_MPS / down
+            limit = min(caps, key=caps.get)
+            out.append(SegmentLimit(length, max(V_MIN_MPS, float(caps[limit])), clear, limit))
+        return out
+
+    def corner_limits(self, route, segments):
+        """(physical corner speed, commanded cap) per interior vertex."""
+        _, radii = blend_corners(route, self.blend_radius)
+        out = []
+        for k, r in enumerate(radii):
+            turn = math.sqrt(self.a_lat * r) if r > 0 else 0.0
+            clear = min(segments[k].clearance_m, segments[k + 1].clearance_m)
+            out.append((turn, max(V_MIN_MPS, turn, math.sqrt(2.0 * self.a_lat * clear))))
+        return out
+
+    def estimate(self, route, seg_v, corner_v):
+        """Seconds to fly `route` rest to rest with segment and corner speed limits."""
+        seg = [math.dist(a, b) for a, b in zip(route[:-1], route[1:])]
+        v = [0.0] + [min(c, seg_v[k], seg_v[k + 1]) for k, c in enumerate(corner_v)] + [0.0]
+        for k in range(len(seg) - 1, -1, -1):
+            v[k] = min(v[k], math.sqrt(v[k + 1] ** 2 + 2 * self.a_max * seg[k]))
+        for k in range(len(seg)):
+            v[k + 1] = min(v[k + 1], math.sqrt(v[k] ** 2 + 2 * self.a_max * seg[k]))
+        return sum(segment_time(d, seg_v[k], v[k], v[k + 1], self.a_max, self.jerk) for k, d in enumerate(seg))
+
+    def plan(self, route, ceiling_mps=None):
+        """Profile of `route` (start first); runs cover it end to end, each at one speed."""
+        route = [tuple(map(float, p)) for p in route]
+        ceiling = self.ceiling if ceiling_mps is None else ceiling_mps
+        segments = self.segment_limits(route, ceiling)
+        fine = route[:1]
+        for a, b, seg in zip(route[:-1], route[1:], segments):
+            n = int(math.ceil(seg.length_m / PIECE_M)) if seg.limit in ("zone", "building") else 1
+            fine += [tuple(p + (q - p) * k / n for p, q in zip(a, b)) for k in range(1, n)] + [b]
+        if len(fine) > len(route):
+            route = fine
+            segments = self.segment_limits(route, ceiling)
+        corners = self.corner_limits(route, segments)
+        if not segments:
+            return Profile(segments, corners, [], 0.0, ceiling)
+
+        def quantize(v):
+            return max(V_MIN_MPS, math.floor(v / SPEED_STEP_MPS) * SPEED_STEP_MPS)
+
+        def run_time(i, j, speed):
+            pts = route[i:j + 2]
+            return self.estimate(pts, [speed] * (j - i + 1), [c[0] for c in corners[i:j]])
+
+        def merge(n):
+            """(time saved, merged run, its time) of joining runs n and n+1 at the slower speed."""
+            (i, k, v0), (_, j, v1) = runs[n], runs[n + 1]
+            speed = quantize(min(v0, v1, corners[k][1]))
+            t = run_time(i, j, speed)
+            return times[n] + times[n + 1] - t, (i, j, speed), t
+
+        # runs as (first segment, last segment, speed); start with one per segment,
+        # then join the best pair while that saves time (only its neighbours change)
+        runs = [(k, k, quantize(s.v_max)) for k, s in enumerate(segments)]
+        times = [run_time(i, j, v) for i, j, v in runs]
+        pairs = [merge(n) for n in range(len(runs) - 1)]
+        while pairs:
+            n = max(range(len(pairs)), key=lambda k: pairs[k][0])
+            gain, merged, t = pairs[n]
+            if gain <= 0:
+                break
+            runs[n:n + 2] = [merged]
+            times[n:n + 2] = [t]
+            del pairs[n]
+            for k in (n - 1, n):
+                if 0 <= k < len(runs) - 1:
+                    pairs[k] = merge(k)
+
+        out = [Run(route[i:j + 2], v, t) for (i, j, v), t in zip(runs, times)]
+        return Profile(segments, corners, out, sum(times), ceiling)
+
+    def print_profile(self, profile, fixed_mps=None):
+        line = (f"[speed] {len(profile.segments)} segment(s) in {len(profile.runs)} move(s): "
+                + ", ".join(f"{len(r.points) - 1}x{r.speed:g}" for r in profile.runs)
+                + f" m/s, est {profile.est_s:.1f}s")
+        if fixed_mps is not None and profile.runs:
+            route = [p for r in profile.runs for p in r.points[:-1]] + [profile.runs[-1].points[-1]]
+            fixed = self.estimate(route, [fixed_mps] * (len(route) - 1), [c[0] for c in profile.corners])
+            line += f" vs {fixed:.1f}s at {fixed_mps:g} m/s"
+        print(line)
\ No newline at end of file
@@ -0,0 +1,443 @@
+import datetime
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from obstacle_detect import DIST_THRESH_M, HALF_WIDTH_M, MIN_FORWARD_M, MIN_POINTS, as_points, detect
+from sensor_stream import default_client_factory, wait_event
+from voxel_map import scan_to_world
+from zone_index import zone_to_dict
+
+TELEMETRY_RATE_HZ = 10.0
+FLUSH_ROWS = 600            # samples buffered before an append to disk (60 s at 10 Hz)
+STATE_MAX_AGE_S = 0.5       # streamed state older than this is fetched again
+TELEMETRY_VERSION = 3      # 2: scans.bin, scan_offset / scan_points, meta "safety" and "detect"
+                           # 3: heights.bin, "height_scan" events, leg_start value, meta "altitude"
+TELEMETRY_DIR_ENV = "AIRSIM_TELEMETRY_DIR"   # set = record every run under this directory
+
+# one row per tick; float32 keeps mm resolution within +-8 km of the spawn
+SAMPLE_DTYPE = np.dtype([
+    ("t", "<f8"),                                    # s since the recorder started
+    ("x", "<f4"), ("y", "<f4"), ("z", "<f4"),        # NED position, m
+    ("vx", "<f4"), ("vy", "<f4"), ("vz", "<f4"),     # NED velocity, m/s
+    ("qw", "<f4"), ("qx", "<f4"), ("qy", "<f4"), ("qz", "<f4"),
+    ("tx", "<f4"), ("ty", "<f4"), ("tz", "<f4"),     # commanded target, NaN = none
+    ("leg", "<i2"),                                  # waypoint index being flown, -1 = none
+    ("flags", "u1"),                                 # FLAG_* bits
+    ("lidar_points", "<u4"),                         # corridor points of the last scan
+    ("lidar_min_m", "<f4"),                          # closest return, NaN = no scan
+    ("scan_offset", "<u8"),                          # first point of the scan in scans.bin
+    ("scan_points", "<u4"),                          # points of the scan, 0 = no scan
+])
+SCAN_DTYPE = np.dtype("<f4")                         # scans.bin: x, y, z per point, sensor frame
+HEIGHT_DTYPE = np.dtype("<f8")                       # heights.bin: per scan the sensor origin, then its points
+                                                     # (x, y, z, world NED, as fused)
+
+# decisions and safety-check results, appended to events.bin as they happen
+EVENT_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("kind", "u1"),                                  # index into meta["event_kinds"]
+    ("leg", "<i2"),
+    ("value", "<f4"),
+    ("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+])
+
+FLAG_COLLISION = 1          # state reported a collision
+FLAG_IN_ZONE = 2            # position inside a no-fly zone (zones given to the recorder)
+FLAG_LIDAR_BLOCKED = 4      # obstacle_detect.detect() said blocked
+FLAG_LEG_BLOCKED = 8        # set by the mission for the leg being flown (detour)
+
+# "leg_start" carries the leg's start point and the z asked of safety.plan_leg; the decision
+# of each leg follows it as "fly" / "detour" / "target_forbidden" / "no_route" (or
+# "preview_hold" / "preview_stop") with the target as planned. "height_scan": a LiDAR scan
+# fused into the corridor height field (value = points in heights.bin, xyz = sensor origin)
+EVENT_KINDS = ["start", "target", "target_forbidden", "leg_blocked", "detour", "abort", "hold", "stop",
+               "leg_start", "fly", "no_route", "preview_hold", "preview_stop", "height_scan"]
+
+
+class TelemetryRecorder:
+    """
+    Samples kinematics, the commanded target, safety flags and a LiDAR summary
+    at a fixed rate on a background thread, and appends them to an on-disk log:
+
+        run_dir/meta.json     dtypes, rate, vehicle, event kind names, the zone
+                              sets / planner the legs were decided with, detect() settings,
+                              the SAFE_Z and corridor altitude planner the legs were planned with
+        run_dir/samples.bin   SAMPLE_DTYPE rows, append-only
+        run_dir/events.bin    EVENT_DTYPE rows, append-only
+        run_dir/scans.bin     the LiDAR point clouds the samples point to (each scan once)
+        run_dir/heights.bin   the scans fused into the height field, one per "height_scan" event
+
+    Samples and scans are buffered and appended FLUSH_ROWS samples at a time
+    (and on stop), so a crash loses at most one buffer; events are few and
+    written one by one. Read it back with TelemetryLog; replay.py re-runs the
+    checks on it.
+
+        rec = TelemetryRecorder("telemetry/run1", "Drone1", stream=stream, zones=ZONES,
+                                planner=PLANNER, replan=REPLAN_ON_BLOCK)
+        with rec:
+            rec.set_target(x, y, z, leg=3)
+            rec.event("detour", leg=3, value=len(detour))
+
+    With a SensorStream the newest streamed state / LiDAR scan is used; only
+    when it is stale does the recorder call getMultirotorState on its own
+    connection.
+    """
+
+    def __init__(self, run_dir, vehicle_name, rate_hz=TELEMETRY_RATE_HZ, client_factory=default_client_factory,
+                 stream=None, lidar_name=None, zones=None, flush_rows=FLUSH_ROWS, planner=None, replan=True):
+        self.run_dir = run_dir
+        self.vehicle_name = vehicle_name
+        self.period = 1.0 / rate_hz
+        self.rate_hz = rate_hz
+        self.client_factory = client_factory
+        self.stream = stream
+        self.lidar_name = lidar_name
+        self.zones = zones
+        self.safety = []      # meta["safety"]: zone set, planner and replan in force from "t" on
+        self.altitude = None  # meta["altitude"]: safe_z and AltitudePlanner.to_dict() of the legs
+        self.event_kinds = list(EVENT_KINDS)
+        self.rows = 0
+        self.errors = 0
+
+        self._buf = np.zeros(flush_rows, dtype=SAMPLE_DTYPE)
+        self._n = 0
+        self._scans = []
+        self._scan_points = 0
+        self._last_scan = (None, 0, 0)   # (getLidarData result, offset, points) of the newest scan
+        self._target = (math.nan, math.nan, math.nan)
+        self._leg = -1
+        self._flags = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._t0 = None
+
+        os.makedirs(run_dir, exist_ok=True)
+        self._samples_f = open(os.path.join(run_dir, "samples.bin"), "ab")
+        self._events_f = open(os.path.join(run_dir, "events.bin"), "ab")
+        self._scans_f = open(os.path.join(run_dir, "scans.bin"), "ab")
+        self._heights_f = open(os.path.join(run_dir, "heights.bin"), "ab")
+        if zones is not None:
+            self.set_safety(zones, planner, replan)
+        else:
+            self._write_meta()
+
+    # ---- mission side ----
+
+    def set_safety(self, zones, planner=None, replan=True):
+        """The zones (and detour planner / replan setting) legs are decided with from now on."""
+        entries = [zone_to_dict(z) for z in zones]
+        with self._lock:
+            self.zones = zones
+            self.safety.append({
+                "t": self._now(),
+                "zones_digest": hashlib.sha1(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()[:12],
+                "zones": entries,
+                "planner": None if planner is None else {"clearance_m": planner.clearance,
+                                                         "window_margin_m": planner.window_margin,
+                                                         "max_window_m": planner.max_window},
+                "replan": bool(replan),
+            })
+            self._write_meta()
+
+    def set_altitudes(self, altitudes, safe_z=math.inf):
+        """
+        The altitudes legs are planned with (safety.plan_leg): `safe_z`, or the
+        AltitudePlanner as it is now; later fused scans go through height_scan().
+        """
+        with self._lock:
+            self.altitude = {"safe_z": safe_z if math.isfinite(safe_z) else None,
+                             "planner": None if altitudes is None else altitudes.to_dict()}
+            self._write_meta()
+
+    def height_scan(self, lidar_data, leg=None):
+        """A getLidarData result fused into the altitude planner's height field (HeightField.add_scan)."""
+        p = lidar_data.pose.position
+        origin = (p.x_val, p.y_val, p.z_val)
+        pts = scan_to_world(as_points(lidar_data.point_cloud), lidar_data.pose)
+        with self._lock:
+            self._heights_f.write(np.vstack([origin, pts]).astype(HEIGHT_DTYPE).tobytes())
+            self._heights_f.flush()
+        self.event("height_scan", leg, value=len(pts), xyz=origin)
+
+    def set_target(self, x, y, z, leg=None, leg_blocked=False):
+        """Commanded target from now on (and the waypoint index / blocked-leg flag)."""
+        with self._lock:
+            self._target = (x, y, z)
+            if leg is not None:
+                self._leg = leg
+            self._flags = FLAG_LEG_BLOCKED if leg_blocked else 0
+        self.event("target", leg, xyz=(x, y, z))
+
+    def event(self, kind, leg=None, value=math.nan, xyz=None):
+        """Record a decision / safety-check result; unknown kinds are added to the log's kind table."""
+        with self._lock:
+            if kind not in self.event_kinds:
+                self.event_kinds.append(kind)
+                self._write_meta()
+            x, y, z = xyz if xyz is not None else (math.nan, math.nan, math.nan)
+            row = (self._now(), self.event_kinds.index(kind), self._leg if leg is None else leg, value, x, y, z)
+            self._events_f.write(np.array([row], dtype=EVENT_DTYPE).tobytes())
+            self._events_f.flush()
+
+    # ---- recorder thread ----
+
+    def start(self):
+        self._t0 = time.monotonic()
+        self.event("start")
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.event("stop")
+            self._stop_event.set()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.flush()
+        self._samples_f.close()
+        self._events_f.close()
+        self._scans_f.close()
+        self._heights_f.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _now(self):
+        return time.monotonic() - self._t0 if self._t0 is not None else 0.0
+
+    def _run(self):
+        client = None
+        next_t = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                state = self._streamed("state")
+                if state is None:
+                    client = client or self.client_factory()
+                    state = client.getMultirotorState(vehicle_name=self.vehicle_name)
+                lidar = None
+                if self.lidar_name is not None:
+                    lidar = self._streamed("lidar")
+                    if lidar is None:
+                        client = client or self.client_factory()
+                        lidar = client.getLidarData(lidar_name=self.lidar_name, vehicle_name=self.vehicle_name)
+                self._sample(state, lidar)
+            except Exception:
+                self.errors += 1
+
+            next_t += self.period
+            delay = next_t - time.monotonic()
+            if delay < 0:
+                next_t = time.monotonic()
+                delay = 0
+            wait_event(self._stop_event, delay)
+
+    def _streamed(self, name):
+        if self.stream is None or name not in self.stream.pollers:
+            return None
+        return self.stream.latest_value(name, STATE_MAX_AGE_S)
+
+    def _sample(self, state, lidar):
+        k = state.kinematics_estimated
+        p, v, q = k.position, k.linear_velocity, k.orientation
+        flags = 0
+        if state.collision.has_collided:
+            flags |= FLAG_COLLISION
+        if self.zones is not None and self.zones.point_blocked(p.x_val, p.y_val, p.z_val):
+            flags |= FLAG_IN_ZONE
+
+        lidar_points, lidar_min = 0, math.nan
+        pts = None
+        if lidar is not None:
+            pts = as_points(lidar.point_cloud)
+            if pts.shape[0]:
+                report = detect(pts)
+                lidar_points = report.count
+                lidar_min = float(np.sqrt(np.einsum("ij,ij->i", pts, pts).min()))
+                if report.blocked:
+                    flags |= FLAG_LIDAR_BLOCKED
+
+        with self._lock:
+            row = self._buf[self._n]
+            row["t"] = self._now()
+            row["x"], row["y"], row["z"] = p.x_val, p.y_val, p.z_val
+            row["vx"], row["vy"], row["vz"] = v.x_val, v.y_val, v.z_val
+            row["qw"], row["qx"], row["qy"], row["qz"] = q.w_val, q.x_val, q.y_val, q.z_val
+            row["tx"], row["ty"], row["tz"] = self._target
+            row["leg"] = self._leg
+            row["flags"] = flags | self._flags
+            row["lidar_points"] = lidar_points
+            row["lidar_min_m"] = lidar_min
+            row["scan_offset"], row["scan_points"] = self._scan_of(lidar, pts)
+            self._n += 1
+            if self._n == len(self._buf):
+                self._flush_locked()
+
+    def _scan_of(self, lidar, pts):
+        """(offset, points) of the scan in scans.bin; a streamed scan sampled again is stored once."""
+        if pts is None or not pts.shape[0]:
+            return 0, 0
+        last, offset, n = self._last_scan
+        if lidar is not last:
+            offset, n = self._scan_points, pts.shape[0]
+            self._scans.append(np.ascontiguousarray(pts, dtype=SCAN_DTYPE))
+            self._scan_points += n
+            self._last_scan = (lidar, offset, n)
+        return offset, n
+
+    # ---- disk ----
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._n:
+            self._samples_f.write(self._buf[:self._n].tobytes())
+            self._samples_f.flush()
+            self.rows += self._n
+            self._n = 0
+        if self._scans:
+            for pts in self._scans:
+                self._scans_f.write(pts.tobytes())
+            self._scans_f.flush()
+            self._scans = []
+
+    def _write_meta(self):
+        meta = {
+            "version": TELEMETRY_VERSION,
+            "vehicle": self.vehicle_name,
+            "rate_hz": self.rate_hz,
+            "sample_dtype": SAMPLE_DTYPE.descr,
+            "event_dtype": EVENT_DTYPE.descr,
+            "event_kinds": self.event_kinds,
+            "safety": self.safety,
+            "altitude": self.altitude,
+            "detect": {"dist_thresh": DIST_THRESH_M, "min_forward": MIN_FORWARD_M, "half_width": HALF_WIDTH_M,
+                       "min_points": MIN_POINTS},
+            "flags": {"collision": FLAG_COLLISION, "in_zone": FLAG_IN_ZONE,
+                      "lidar_blocked": FLAG_LIDAR_BLOCKED, "leg_blocked": FLAG_LEG_BLOCKED},
+        }
+        tmp = os.path.join(self.run_dir, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(self.run_dir, "meta.json"))
+
+
+def new_run_dir(base_dir=None):
+    """
+    A fresh timestamped run directory under $AIRSIM_TELEMETRY_DIR, else under
+    base_dir; None when neither is set (no recording).
+    """
+    base_dir = os.environ.get(TELEMETRY_DIR_ENV) or base_dir
+    if not base_dir:
+        return None
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    run_dir, n = os.path.join(base_dir, stamp), 1
+    while os.path.exists(run_dir):
+        n += 1
+        run_dir = os.path.join(base_dir, f"{stamp}-{n}")
+    return run_dir
+
+
+def _descr(d):
+    return np.dtype([tuple(f) for f in d])
+
+
+def _memmap(path, dtype):
+    n = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+    if n == 0:
+        return np.zeros(0, dtype=dtype)
+    # a half-written last row (crash mid-append) is left out
+    return np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+
+
+class TelemetryLog:
+    """
+    Read-only view of a recorded run. `samples` and `events` are memory-mapped
+    structured arrays, so opening an hour-long log costs nothing until columns
+    are touched:
+
+        log = TelemetryLog("telemetry/run1")
+        xyz = np.column_stack([log.samples["x"], log.samples["y"], log.samples["z"]])
+        detours = log.events_of("detour")
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        with open(os.path.join(run_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.samples = _memmap(os.path.join(run_dir, "samples.bin"), _descr(self.meta["sample_dtype"]))
+        self.events = _memmap(os.path.join(run_dir, "events.bin"), _descr(self.meta["event_dtype"]))
+        self.scans = _memmap(os.path.join(run_dir, "scans.bin"), SCAN_DTYPE)
+        self.heights = _memmap(os.path.join(run_dir, "heights.bin"), HEIGHT_DTYPE)
+        self.event_kinds = self.meta["event_kinds"]
+
+    def scan(self, i):
+        """(N,3) sensor-frame points of sample i's LiDAR scan (empty without one, or in a version 1 log)."""
+        s = self.samples[i]
+        if "scan_points" not in s.dtype.names or not s["scan_points"]:
+            return np.zeros((0, 3), dtype=SCAN_DTYPE)
+        offset = int(s["scan_offset"]) * 3
+        return np.asarray(self.scans[offset:offset + int(s["scan_points"]) * 3]).reshape(-1, 3)
+
+    def height_scans(self):
+        """(t, (N,3) world points, sensor origin) of every "height_scan" event, in order."""
+        out, offset = [], 0
+        for e in self.events_of("height_scan"):
+            n = (int(e["value"]) + 1) * 3
+            rows = np.asarray(self.heights[offset:offset + n]).reshape(-1, 3)
+            out.append((float(e["t"]), rows[1:], tuple(rows[0].tolist())))
+            offset += n
+        return out
+
+    def events_of(self, kind):
+        if kind not in self.event_kinds:
+            return self.events[:0]
+        return self.events[self.events["kind"] == self.event_kinds.index(kind)]
+
+    def flagged(self, flag):
+        return self.samples[(self.samples["flags"] & flag) != 0]
+
+    def summary(self):
+        s = self.samples
+        out = {"samples": len(s), "events": len(self.events), "duration_s": 0.0, "distance_m": 0.0,
+               "max_speed_mps": 0.0, "bytes": os.path.getsize(os.path.join(self.run_dir, "samples.bin"))}
+        if len(s):
+            xyz = np.column_stack([s["x"], s["y"], s["z"]]).astype(np.float64)
+            speed = np.sqrt(s["vx"].astype(np.float64) ** 2 + s["vy"] ** 2 + s["vz"] ** 2)
+            out["duration_s"] = float(s["t"][-1] - s["t"][0])
+            out["distance_m"] = float(np.linalg.norm(np.diff(xyz, axis=0), axis=1).sum())
+            out["max_speed_mps"] = float(speed.max())
+        for name, bit in self.meta["flags"].items():
+            out[f"{name}_samples"] = int(np.count_nonzero(s["flags"] & bit)) if len(s) else 0
+        out["event_counts"] = {k: int(np.count_nonzero(self.events["kind"] == i))
+                               for i, k in enumerate(self.event_kinds) if len(self.events)}
+        return out
+
+    def print_summary(self):
+        s = self.summary()
+        print(f"[telemetry] {self.run_dir}: {s['samples']} samples ({s['bytes'] / 1024:.0f} KiB), "
+              f"{s['duration_s']:.1f}s, {s['distance_m']:.0f} m, max {s['max_speed_mps']:.1f} m/s")
+        for name in self.meta["flags"]:
+            if s[f"{name}_samples"]:
+                print(f"  {name}: {s[f'{name}_samples']} samples")
+        for kind, n in s["event_counts"].items():
+            if n:
+                print(f"  event {kind}: {n}")
+
+
+if __name__ == "__main__":
+    for run in sys.argv[1:]:
+        TelemetryLog(run).print_summary()
\ No newline at end of file
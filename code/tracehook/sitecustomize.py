@@ -0,0 +1,16 @@
+"""
+Interpreter-startup hook for rpc_trace, scoped to this repo: Python imports
+sitecustomize from PYTHONPATH, so only processes started with this directory
+on it run it, and it does nothing while AIRSIM_RPC_TRACE is unset.
+
+    PYTHONPATH=tracehook AIRSIM_RPC_TRACE=trace.json python waypoint3.py
+
+`python -m rpc_trace` puts it on PYTHONPATH for the processes it starts.
+It replaces any other sitecustomize of the interpreter for those processes.
+"""
+import os
+import sys
+
+if os.environ.get("AIRSIM_RPC_TRACE"):
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import rpc_trace  # noqa: F401  (importing it runs rpc_trace.startup())
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+Local 3D occupancy map built from LiDAR scans, in world NED.
+
+Each getLidarData scan is moved into the world frame with its sensor pose and
+fused into a sparse voxel hash with log-odds updates: +L_HIT for every voxel
+with a return, L_MISS for mapped voxels a ray passed through. Only voxels
+that were hit at least once are stored (sorted int64 keys + per-voxel arrays),
+so every update and query is a handful of NumPy passes, no Python per point.
+
+    vmap = VoxelMap()
+    vmap.integrate_scan(client.getLidarData(lidar_name="LidarFront", vehicle_name="Drone1"))
+    report = vmap.corridor_blocked(start, goal, half_width_m=2.0)
+
+Memory stays bounded: voxels farther than WINDOW_M from the newest sensor
+origin or not hit for MAX_AGE_SCANS scans are evicted, and above MAX_VOXELS
+the oldest are dropped first. bench_voxel_map.py measures the fusion rate.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from frames import quat_to_matrix
+from obstacle_detect import as_points
+
+VOXEL_M = 0.5
+L_HIT = 0.85          # log-odds of p = 0.7
+L_MISS = -0.4         # log-odds of p = 0.4
+L_MIN = -2.0
+L_MAX = 3.5
+L_OCCUPIED = 0.0      # occupied above this (p > 0.5)
+
+WINDOW_M = 80.0       # sliding window around the newest sensor origin
+MAX_AGE_SCANS = 600   # evict voxels not hit for this many scans
+MAX_VOXELS = 500_000
+MAX_FREE_RAYS = 2048  # rays per scan used for the free-space (miss) update
+MIN_VOXELS = 3        # corridor_blocked: occupied voxels needed to call a leg blocked
+
+_BITS = 21
+_OFFSET = 1 << (_BITS - 1)
+_MASK = (1 << _BITS) - 1
+
+
+def _unique(keys):
+    """Sorted unique int64 keys (sort + diff; faster than np.unique's hashing here)."""
+    k = np.sort(keys)
+    if len(k) < 2:
+        return k
+    return k[np.concatenate(([True], k[1:] != k[:-1]))]
+
+
+CorridorReport = namedtuple("CorridorReport", ["blocked", "count", "first_m"])
+
+
+def scan_to_world(points, pose):
+    """(N,3) sensor-frame points -> world NED with the scan's pose (LidarData.pose)."""
+    p, q = pose.position, pose.orientation
+    w, x, y, z = q.w_val, q.x_val, q.y_val, q.z_val
+    pts = np.asarray(points, dtype=np.float64)
+    if not (math.isnan(w) or (w == 1.0 and x == 0.0 and y == 0.0 and z == 0.0)):
+        pts = pts @ quat_to_matrix((w, x, y, z)).T
+    return pts + (p.x_val, p.y_val, p.z_val)
+
+
+class VoxelMap:
+    def __init__(self, voxel_m=VOXEL_M, window_m=WINDOW_M, max_age_scans=MAX_AGE_SCANS, max_voxels=MAX_VOXELS,
+                 max_free_rays=MAX_FREE_RAYS):
+        self.voxel = float(voxel_m)
+        self.window = float(window_m)
+        self.max_age = int(max_age_scans)
+        self.max_voxels = int(max_voxels)
+        self.max_free_rays = int(max_free_rays)
+        self.keys = np.zeros(0, dtype=np.int64)      # sorted
+        self.logodds = np.zeros(0, dtype=np.float32)
+        self.stamp = np.zeros(0, dtype=np.int64)     # scan number of the last hit
+        self.scans = 0
+        self.origin = None
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ---------- keys ----------
+
+    def keys_of(self, points):
+        idx = np.floor(np.asarray(points, dtype=np.float64) / self.voxel).astype(np.int64) + _OFFSET
+        return (idx[:, 0] << (2 * _BITS)) | (idx[:, 1] << _BITS) | idx[:, 2]
+
+    def centers(self, keys=None):
+        keys = self.keys if keys is None else keys
+        idx = np.column_stack([(keys >> (2 * _BITS)) & _MASK, (keys >> _BITS) & _MASK, keys & _MASK])
+        return (idx - _OFFSET + 0.5) * self.voxel
+
+    def _find(self, keys):
+        """(positions, found) of `keys` in the map."""
+        pos = np.searchsorted(self.keys, keys)
+        found = np.zeros(len(keys), dtype=bool)
+        inside = pos < len(self.keys)
+        found[inside] = self.keys[pos[inside]] == keys[inside]
+        return pos, found
+
+    # ---------- updates ----------
+
+    def integrate_scan(self, lidar_data):
+        """Fuse one getLidarData result (sensor-frame points + pose)."""
+        pts = as_points(lidar_data.point_cloud)
+        p = lidar_data.pose.position
+        return self.integrate(scan_to_world(pts, lidar_data.pose), (p.x_val, p.y_val, p.z_val))
+
+    def integrate(self, points_world, origin):
+        """Fuse (N,3) world points seen from `origin`; returns the number of voxels hit."""
+        self.scans += 1
+        self.origin = np.asarray(origin, dtype=np.float64)
+        pts = np.asarray(points_world, dtype=np.float64).reshape(-1, 3)
+        if len(pts) == 0:
+            self._evict()
+            return 0
+        hit = _unique(self.keys_of(pts))
+        pos, found = self._find(hit)
+
+        # free space first, only for mapped voxels, never for one hit in this scan
+        mpos, mfound = self._find(self._ray_keys(pts))
+        miss = np.setdiff1d(_unique(mpos[mfound]), pos[found], assume_unique=True)
+        if len(miss):
+            self.logodds[miss] = np.maximum(self.logodds[miss] + L_MISS, L_MIN)
+
+        i = pos[found]
+        self.logodds[i] = np.minimum(self.logodds[i] + L_HIT, L_MAX)
+        self.stamp[i] = self.scans
+        new = ~found
+        if new.any():
+            at = pos[new]
+            self.keys = np.insert(self.keys, at, hit[new])
+            self.logodds = np.insert(self.logodds, at, np.float32(L_HIT))
+            self.stamp = np.insert(self.stamp, at, self.scans)
+        self._evict()
+        return len(hit)
+
+    def _ray_keys(self, pts):
+        """Keys of the voxels along (a subsample of) the rays, short of their end voxel (with repeats)."""
+        step = max(1, -(-len(pts) // self.max_free_rays))
+        ends = pts[::step]
+        d = ends - self.origin
+        length = np.sqrt(np.einsum("ij,ij->i", d, d))
+        n = int(math.ceil(min(float(length.max()), self.window) / self.voxel)) if len(length) else 0
+        if n <= 1:
+            return np.zeros(0, dtype=np.int64)
+        t = np.arange(1, n, dtype=np.float64) * self.voxel                   # distance along the ray
+        keep = t[None, :] < (length[:, None] - self.voxel)
+        unit = d / np.maximum(length, 1e-9)[:, None]
+        samples = self.origin + unit[:, None, :] * t[None, :, None]
+        return self.keys_of(samples[keep])
+
+    def _evict(self):
+        if not len(self.keys):
+            return
+        c = self.centers()
+        far = np.max(np.abs(c - self.origin), axis=1) > self.window
+        old = self.stamp < self.scans - self.max_age
+        drop = far | old
+        keep_n = len(self.keys) - int(drop.sum())
+        if keep_n > self.max_voxels:
+            # still too many: drop the least recently hit
+            order = np.argsort(np.where(drop, -1, self.stamp), kind="stable")
+            drop[order[:len(self.keys) - self.max_voxels]] = True
+        if drop.any():
+            self.evicted += int(drop.sum())
+            keep = ~drop
+            self.keys, self.logodds, self.stamp = self.keys[keep], self.logodds[keep], self.stamp[keep]
+
+    # ---------- queries ----------
+
+    def occupied(self, points):
+        """(N,) bool per world point: its voxel is mapped and occupied."""
+        keys = self.keys_of(np.asarray(points, dtype=np.float64).reshape(-1, 3))
+        pos, found = self._find(keys)
+        out = np.zeros(len(keys), dtype=bool)
+        out[found] = self.logodds[pos[found]] > L_OCCUPIED
+        return out
+
+    def ray_hit(self, start, end):
+        """Distance from `start` to the first occupied voxel on the segment, or None."""
+        a = np.asarray(start, dtype=np.float64)
+        d = np.asarray(end, dtype=np.float64) - a
+        length = float(np.linalg.norm(d))
+        t = np.arange(0.0, length + self.voxel * 0.5, self.voxel * 0.5)
+        occ = self.occupied(a + (d / max(length, 1e-9)) * t[:, None])
+        return float(t[np.argmax(occ)]) if occ.any() else None
+
+    def corridor_blocked(self, start, end, half_width_m=2.0, min_voxels=MIN_VOXELS):
+        """Occupied voxels within `half_width_m` of the segment (count, distance of the nearest along it)."""
+        if not len(self.keys):
+            return CorridorReport(False, 0, None)
+        a = np.asarray(start, dtype=np.float64)
+        b = np.asarray(end, dtype=np.float64)
+        occ = self.logodds > L_OCCUPIED
+        c = self.centers(self.keys[occ])
+        r = half_width_m + self.voxel
+        box = np.all((c >= np.minimum(a, b) - r) & (c <= np.maximum(a, b) + r), axis=1)
+        c = c[box]
+        d = b - a
+        dd = float(d @ d)
+        t = np.clip((c - a) @ d / dd, 0.0, 1.0) if dd > 0 else np.zeros(len(c))
+        dist = np.linalg.norm(c - (a + t[:, None] * d), axis=1)
+        near = dist <= half_width_m
+        count = int(near.sum())
+        first = float(t[near].min() * math.sqrt(dd)) if count else None
+        return CorridorReport(count >= min_voxels, count, first)
+
+    def stats(self):
+        occ = int((self.logodds > L_OCCUPIED).sum())
+        return {"voxels": len(self.keys), "occupied": occ, "scans": self.scans, "evicted": self.evicted,
+                "bytes": int(self.keys.nbytes + self.logodds.nbytes + self.stamp.nbytes)}
\ No newline at end of file
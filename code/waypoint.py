@@ -1,50 +1,51 @@
 import cosysairsim as airsim
 import time
 
+from phases import phase
+from pose_resolver import resolve_positions
+
 VEHICLE_NAME = "Drone1"
 
 # Order: Actor_1 -> Actor_11
 WAYPOINT_ACTOR_NAMES = ["Actor_1", "Actor_3", "Actor_5", "Actor_7", "Actor_9", "Actor_11"]
 
+# Key for the on-disk pose cache (pose_resolver); bump/refresh after moving actors in the level
+LEVEL_NAME = "Genova"
+REFRESH_POSE_CACHE = False
+
 SPEED_MPS = 8.0
 HOVER_SEC = 1.0
 
 ROOF_CLEARANCE_M = 14.0   # meters ABOVE each roof marker
 
 
-def must_pose(client, name: str):
-    pose = client.simGetObjectPose(name)
-    if pose is None:
-        raise RuntimeError(f"Could not find object '{name}'")
-    return pose
-
-
-def main():
-    client = airsim.MultirotorClient()
-    client.confirmConnection()
+def main(client_factory=airsim.MultirotorClient, level_name=LEVEL_NAME):
+    with phase("connect"):
+        client = client_factory()
+        client.confirmConnection()
 
-    print("Connected!")
-    print("Client Ver:", client.getClientVersion(),
-          "Server Ver:", client.getServerVersion())
+        print("Connected!")
+        print("Client Ver:", client.getClientVersion(),
+              "Server Ver:", client.getServerVersion())
 
-    client.enableApiControl(True, vehicle_name=VEHICLE_NAME)
-    client.armDisarm(True, vehicle_name=VEHICLE_NAME)
+        client.enableApiControl(True, vehicle_name=VEHICLE_NAME)
+        client.armDisarm(True, vehicle_name=VEHICLE_NAME)
 
     # Takeoff
     print("\nTaking off...")
-    client.takeoffAsync(vehicle_name=VEHICLE_NAME).join()
-    time.sleep(1.0)
+    with phase("takeoff"):
+        client.takeoffAsync(vehicle_name=VEHICLE_NAME).join()
+        time.sleep(1.0)
 
     # Read waypoint positions
     waypoints = []
 
     print("\nReading waypoint roof positions:")
-    for name in WAYPOINT_ACTOR_NAMES:
-        pose = must_pose(client, name)
-
-        x = pose.position.x_val
-        y = pose.position.y_val
-        z_roof = pose.position.z_val
+    with phase("poses"):
+        positions = resolve_positions(
+            WAYPOINT_ACTOR_NAMES, level_name=level_name, refresh=REFRESH_POSE_CACHE, client_factory=client_factory
+        )
+    for name, (x, y, z_roof) in zip(WAYPOINT_ACTOR_NAMES, positions.tolist()):
 
         # fly above roof
         z_target = z_roof - ROOF_CLEARANCE_M
@@ -55,38 +56,41 @@ def main():
 
     # Move to first waypoint altitude smoothly
     print("\nAdjusting altitude to first waypoint height...")
-    client.moveToZAsync(
-        waypoints[0][3],
-        SPEED_MPS,
-        vehicle_name=VEHICLE_NAME
-    ).join()
+    with phase("climb"):
+        client.moveToZAsync(
+            waypoints[0][3],
+            SPEED_MPS,
+            vehicle_name=VEHICLE_NAME
+        ).join()
 
-    time.sleep(0.5)
+        time.sleep(0.5)
 
     # Fly through waypoints
     for i, (name, x, y, z_target) in enumerate(waypoints, start=1):
 
         print(f"\nFlying to {name} ({i}/{len(waypoints)})")
 
-        client.moveToPositionAsync(
-            x,
-            y,
-            z_target,
-            SPEED_MPS,
-            timeout_sec=120,
-            vehicle_name=VEHICLE_NAME
-        ).join()
-
-        client.hoverAsync(vehicle_name=VEHICLE_NAME).join()
-
-        # SHOW EXACT WHITE MESSAGE ON SCREEN
-        client.simPrintLogMessage(
-            "Color DELIVERED",
-            "",
-            severity=0   # white color
-        )
-
-        time.sleep(HOVER_SEC)
+        with phase("flight"):
+            client.moveToPositionAsync(
+                x,
+                y,
+                z_target,
+                SPEED_MPS,
+                timeout_sec=120,
+                vehicle_name=VEHICLE_NAME
+            ).join()
+
+        with phase("dwell"):
+            client.hoverAsync(vehicle_name=VEHICLE_NAME).join()
+
+            # SHOW EXACT WHITE MESSAGE ON SCREEN
+            client.simPrintLogMessage(
+                "Color DELIVERED",
+                "",
+                severity=0   # white color
+            )
+
+            time.sleep(HOVER_SEC)
 
     print("\nMission complete.")
     client.simPrintLogMessage(
@@ -1,130 +1,228 @@
 import cosysairsim as airsim
-import time
+import asyncio
 import math
+import time
+from collections import Counter
+
+from aio_client import AsyncMultirotorClient, guarded
+from altitude_planner import AltitudePlanner
+from dwell import dwell
+from forbidden_zone import OrientedBoxZone
+from guarded_move import GuardedMove
+from obstacle_detect import blocked_ahead
+from path_executor import PathExecutor
+from path_planner import DetourPlanner
+from phases import phase, timed
+from pose_resolver import resolve_positions
+from preflight import check_route, print_report as print_preflight
+from route_order import reorder_waypoints
+from rpc_counter import CountingClient
+from safety import LegDecision, decide_leg, decision_kind, plan_leg
+from sensor_stream import SensorStream
+from speed_profile import SpeedPlanner, vertical_speed
+from telemetry import TelemetryRecorder, new_run_dir
+from zone_index import ZoneRegistry
 
 VEHICLE_NAME = "Drone1"
 
 WAYPOINT_ACTOR_NAMES = ["Actor_1", "Actor_3", "Actor_5", "Actor_7", "Actor_9", "Actor_11", "Actor_2", "Actor_4"]
 
+# Key for the on-disk pose cache (pose_resolver); bump/refresh after moving actors in the level
+LEVEL_NAME = "Genova"
+REFRESH_POSE_CACHE = False
+
 SPEED_MPS = 8.0
+# Per-segment speeds (speed_profile.py): up to MAX_CRUISE_MPS on long clear segments, slower
+# near zones and at tight turns, vertical moves sized to their length; False = SPEED_MPS everywhere
+SPEED_PROFILE = True
+MAX_CRUISE_MPS = 15.0
 WAIT_AT_WP_SEC = 5.0
 ROOF_CLEARANCE_M = 14.0
 EXTRA_CLEARANCE_M = 5.0
 
 # ✅ FIX: fly higher than forbidden box so path-cross test doesn't trigger at Actor_1
 SAFE_Z_MARGIN_M = 30.0
+# "corridor": each leg flies at the altitude its own corridor needs (altitude_planner.py, the
+# margins above counted over the roofs near the leg); "safe_z": every leg at the one SAFE_Z
+ALTITUDE_POLICY = "corridor"
+ALTITUDE_RECLIMB = False    # False: no leg descends below what a later leg climbs back to (AltitudePlanner.route)
+ALTITUDE_LIDAR = True   # with LIDAR_NAME: fuse a scan into the height field before every stop-to-stop leg
 
-FORBIDDEN_CENTER_CM = (-14100.0, -9400.0, 50300.0)    # (FIXED Z SIGN)
+FORBIDDEN_LOCATION_CM = (-14100.0, -9400.0, -50300.0)  # TriggerBox Location as in the editor (Z up, frames.py)
 FORBIDDEN_EXTENT_CM = (5246.25, 4743.75, 3433.75)
 FORBIDDEN_YAW_DEG = -50.0
 SAFETY_MARGIN_M = 3.0
 
+# compiled once: cm -> m, margins and yaw rotation are not recomputed per check
+FORBIDDEN_ZONE = OrientedBoxZone.from_unreal_location(
+    FORBIDDEN_LOCATION_CM, FORBIDDEN_EXTENT_CM, FORBIDDEN_YAW_DEG, SAFETY_MARGIN_M, name="ForbiddenZone"
+)
 
-def must_pose(client, name: str):
-    pose = client.simGetObjectPose(name)
-    if pose is None:
-        raise RuntimeError(f"Could not find object '{name}'")
-    return pose
+# Extra no-fly zones loaded in bulk (see zones.json for the format); None = only FORBIDDEN_ZONE
+ZONES_FILE = None
 
+ZONES = ZoneRegistry([FORBIDDEN_ZONE])
+if ZONES_FILE is not None:
+    ZONES.extend(ZoneRegistry.load(ZONES_FILE).zones)
 
-def hover_wait(client, seconds: float):
-    end_t = time.time() + seconds
-    while time.time() < end_t:
-        client.hoverAsync(vehicle_name=VEHICLE_NAME).join()
-        time.sleep(0.5)
+# Route around a blocked leg instead of stopping the mission (False = old hold-and-stop behaviour)
+REPLAN_ON_BLOCK = True
+PLANNER = DetourPlanner(ZONES)
 
+# Reorder the delivery stops to shorten the flight; the painting stop and its preview stay last
+OPTIMIZE_ORDER = True
+ORDER_FIXED_TAIL = ["Actor_2", "Actor_4"]
+ORDER_TIME_BUDGET_S = 0.5
 
-def forbidden_params_m():
-    cx = FORBIDDEN_CENTER_CM[0] / 100.0
-    cy = FORBIDDEN_CENTER_CM[1] / 100.0
-    cz = FORBIDDEN_CENTER_CM[2] / 100.0
-    ex = FORBIDDEN_EXTENT_CM[0] / 100.0 + SAFETY_MARGIN_M
-    ey = FORBIDDEN_EXTENT_CM[1] / 100.0 + SAFETY_MARGIN_M
-    ez = FORBIDDEN_EXTENT_CM[2] / 100.0
-    yaw = math.radians(FORBIDDEN_YAW_DEG)
-    return cx, cy, cz, ex, ey, ez, yaw
+# "path": one blended moveOnPathAsync per stop (detour corners and pass-through waypoints are not stops)
+# "legs": old stop-and-go moveToPositionAsync(...).join() per vertex
+EXECUTION_MODE = "path"
+DELIVERY_STOPS = None   # actor names the drone stops at; None = every waypoint is a stop
 
+# Check every leg of the route (preflight.py) before arming; a route that cannot
+# finish is not flown. The Actor_4 preview leg is reported, never rejected.
+PREFLIGHT = True
+PREVIEW_ACTORS = ["Actor_4"]
 
-def point_in_forbidden_xyz(x_m, y_m, z_m) -> bool:
-    cx, cy, cz, ex, ey, ez, yaw = forbidden_params_m()
+STATE_RATE_HZ = 20.0
+STATE_MAX_AGE_S = 0.2
 
-    dx = x_m - cx
-    dy = y_m - cy
+# Run alongside every flight (asyncio): abort the move if the drone ends up inside a zone
+# or LiDAR sees something close ahead, and log progress
+ZONE_WATCH_S = 0.1
+LIDAR_NAME = None       # e.g. "LidarFront"; None = no LiDAR watch
+LIDAR_WATCH_S = 0.2
+# With LIDAR_NAME: slow down / brake and resume while the path ahead is blocked
+# (guarded_move.py) instead of aborting the mission on the first blocked scan
+LIDAR_GUARD = True
+PROGRESS_LOG_S = 2.0
 
-    c = math.cos(-yaw)
-    s = math.sin(-yaw)
-    lx = dx * c - dy * s
-    ly = dx * s + dy * c
+# Binary flight log (telemetry.py), one sub-directory per run; None = no recording
+# (the AIRSIM_TELEMETRY_DIR environment variable, if set, takes precedence)
+TELEMETRY_DIR = None
+TELEMETRY_RATE_HZ = 10.0
 
-    in_xy = (abs(lx) <= ex) and (abs(ly) <= ey)
-    in_z = (abs(z_m - cz) <= ez)
-    return in_xy and in_z
 
+async def current_position(aclient, stream=None):
+    """Newest streamed position if fresh enough, otherwise one getMultirotorState."""
+    state = stream.latest_value("state", max_age_s=STATE_MAX_AGE_S) if stream is not None else None
+    if state is None:
+        state = await aclient.getMultirotorState(vehicle_name=VEHICLE_NAME)
+    pos = state.kinematics_estimated.position
+    return pos.x_val, pos.y_val, pos.z_val
 
-def segment_intersects_aabb(x0, y0, x1, y1, xmin, xmax, ymin, ymax) -> bool:
-    dx = x1 - x0
-    dy = y1 - y0
 
-    p = [-dx, dx, -dy, dy]
-    q = [x0 - xmin, xmax - x0, y0 - ymin, ymax - y0]
+async def hover_wait(aclient, seconds: float, stream=None):
+    """One hoverAsync, then wait; re-commands only if the streamed position drifts."""
+    with phase("dwell"):
+        return await aclient.motion(dwell, seconds, VEHICLE_NAME, stream, until=aclient.cancelling.is_set)
 
-    u1, u2 = 0.0, 1.0
-    for pi, qi in zip(p, q):
-        if pi == 0:
-            if qi < 0:
-                return False
-        else:
-            t = qi / pi
-            if pi < 0:
-                u1 = max(u1, t)
-            else:
-                u2 = min(u2, t)
-
-    return u1 <= u2
-
-
-def segment_crosses_forbidden_xy(x0_m, y0_m, x1_m, y1_m) -> bool:
-    cx, cy, cz, ex, ey, ez, yaw = forbidden_params_m()
 
-    c = math.cos(-yaw)
-    s = math.sin(-yaw)
+def point_in_forbidden_xyz(x_m, y_m, z_m) -> bool:
+    return ZONES.point_blocked(x_m, y_m, z_m)
 
-    def to_local(x, y):
-        dx = x - cx
-        dy = y - cy
-        lx = dx * c - dy * s
-        ly = dx * s + dy * c
-        return lx, ly
 
-    lx0, ly0 = to_local(x0_m, y0_m)
-    lx1, ly1 = to_local(x1_m, y1_m)
+def decide(start, target, replan=REPLAN_ON_BLOCK) -> LegDecision:
+    """safety.decide_leg against this script's ZONES and PLANNER."""
+    return decide_leg(start, target, ZONES, PLANNER, replan)
 
-    return segment_intersects_aabb(lx0, ly0, lx1, ly1, -ex, ex, -ey, ey)
 
+def segment_crosses_forbidden_xy(x0_m, y0_m, x1_m, y1_m) -> bool:
+    return FORBIDDEN_ZONE.segment_crosses(x0_m, y0_m, x1_m, y1_m)
 
-def main():
-    client = airsim.MultirotorClient()
-    client.confirmConnection()
 
-    print("Connected!")
-    print("Client Ver:", client.getClientVersion(), "Server Ver:", client.getServerVersion())
+def fly_legs(client, points, cancelled):
+    """Old stop-and-go flight: one moveToPositionAsync(...).join() per vertex (motion thread)."""
+    for x, y, z in points:
+        if cancelled():
+            break
+        client.moveToPositionAsync(x, y, z, SPEED_MPS, timeout_sec=120, vehicle_name=VEHICLE_NAME).join()
+    client.hoverAsync(vehicle_name=VEHICLE_NAME).join()
 
-    client.enableApiControl(True, vehicle_name=VEHICLE_NAME)
-    client.armDisarm(True, vehicle_name=VEHICLE_NAME)
 
-    print("\nTaking off...")
-    client.takeoffAsync(vehicle_name=VEHICLE_NAME).join()
-    time.sleep(1.0)
+async def watch_zones(aclient, stream):
+    while True:
+        await asyncio.sleep(ZONE_WATCH_S)
+        x, y, z = await current_position(aclient, stream)
+        if point_in_forbidden_xyz(x, y, z):
+            return f"inside a no-fly zone at ({x:.1f}, {y:.1f}, {z:.1f})"
+
+
+async def watch_lidar(aclient):
+    while True:
+        await asyncio.sleep(LIDAR_WATCH_S)
+        report = await aclient.query(blocked_ahead, LIDAR_NAME, VEHICLE_NAME)
+        if report.blocked:
+            return f"LiDAR: {report.count} points ahead"
+
+
+async def log_progress(aclient, stream, name, target):
+    t0 = time.monotonic()
+    while True:
+        await asyncio.sleep(PROGRESS_LOG_S)
+        pos = await current_position(aclient, stream)
+        print(f"  {name}: {math.dist(pos, target):.1f} m to go ({time.monotonic() - t0:.0f}s)")
+
+
+def note(telemetry, kind, **kwargs):
+    if telemetry is not None:
+        telemetry.event(kind, **kwargs)
+
+
+async def fly(aclient, stream, executor, points, name, telemetry=None, guard=None):
+    """
+    Fly through `points` (with `guard`: LiDAR-guarded path; blended path with
+    `executor`, else leg by leg) while the zone / LiDAR watchers and the
+    progress log run. Returns the abort reason or None.
+    """
+    start = await current_position(aclient, stream)
+    if telemetry is not None:
+        telemetry.set_target(*points[-1])
+    if guard is not None:
+        motion = guard.fly(points, SPEED_MPS)
+    elif executor is not None:
+        motion = aclient.motion(lambda client: executor.fly(start, points, cancelled=aclient.cancelling.is_set))
+    else:
+        motion = aclient.motion(fly_legs, points, aclient.cancelling.is_set)
+
+    watchers = [watch_zones(aclient, stream), log_progress(aclient, stream, name, points[-1])]
+    if LIDAR_NAME is not None and guard is None:
+        watchers.append(watch_lidar(aclient))
+
+    with phase("flight"):
+        result, reason = await guarded(motion, *watchers)
+    if guard is not None and not reason:
+        reason = result   # the guard gave up on a path that stayed blocked
+    if reason:
+        note(telemetry, "abort", xyz=points[-1])
+        print(f"\n[ABORT] {name}: {reason}")
+        await aclient.simPrintLogMessage("Mission:", f"ABORTED: {reason}", severity=2)
+    return reason
+
+
+async def run_mission(aclient, client_factory=airsim.MultirotorClient, level_name=LEVEL_NAME):
+    with phase("connect"):
+        await aclient.confirmConnection()
+
+        print("Connected!")
+        print("Client Ver:", await aclient.getClientVersion(), "Server Ver:", await aclient.getServerVersion())
+
+    # poses, order and the pre-flight check happen on the ground, before arming
+    with phase("poses"):
+        positions = await asyncio.to_thread(
+            resolve_positions, WAYPOINT_ACTOR_NAMES, level_name=level_name, refresh=REFRESH_POSE_CACHE,
+            client_factory=client_factory
+        )
+
+    stream = SensorStream(client_factory)
+    stream.add_state(VEHICLE_NAME, rate_hz=STATE_RATE_HZ)
 
     waypoints = []
     roof_zs = []
     print("\nReading waypoint roof positions:")
+    actor_xyz = dict(zip(WAYPOINT_ACTOR_NAMES, positions.tolist()))
     for idx, name in enumerate(WAYPOINT_ACTOR_NAMES, start=1):
-        pose = must_pose(client, name)
-
-        x = pose.position.x_val
-        y = pose.position.y_val
-        z_roof = pose.position.z_val
+        x, y, z_roof = actor_xyz[name]
         z_target = z_roof - ROOF_CLEARANCE_M
 
         waypoints.append((idx, name, x, y, z_roof, z_target))
@@ -136,122 +234,203 @@ def main():
     SAFE_Z = min_roof_z - (ROOF_CLEARANCE_M + EXTRA_CLEARANCE_M + SAFE_Z_MARGIN_M)
     print(f"\nSAFE_Z computed: {SAFE_Z:.3f} (NED; more negative = higher)")
 
-    print("\nClimbing to SAFE_Z first...")
-    client.moveToZAsync(SAFE_Z, SPEED_MPS, vehicle_name=VEHICLE_NAME).join()
-    time.sleep(0.5)
-
-    for idx, name, x, y, z_roof, z_target in waypoints:
-        z_cmd = min(z_target, SAFE_Z)
+    altitudes = None
+    if ALTITUDE_POLICY == "corridor":
+        altitudes = AltitudePlanner.from_waypoints(waypoints, ROOF_CLEARANCE_M + EXTRA_CLEARANCE_M, SAFE_Z_MARGIN_M)
+
+    # takeoff and climb are vertical, so the XY start of the route is known on the ground
+    sx, sy, _ = await current_position(aclient)
+    if OPTIMIZE_ORDER:
+        with phase("order"):
+            waypoints, old_m, new_m = await asyncio.to_thread(
+                reorder_waypoints, waypoints, (sx, sy, SAFE_Z), SAFE_Z, ZONES, PLANNER, ORDER_FIXED_TAIL,
+                ORDER_TIME_BUDGET_S
+            )
+        print(f"Waypoint order: {[w[1] for w in waypoints]} ({old_m:.0f} m -> {new_m:.0f} m)")
+
+    # stop-to-stop cruise altitudes of the route as ordered (detours may raise them in flight)
+    planned = waypoints if altitudes is None else altitudes.route(waypoints, (sx, sy), ALTITUDE_RECLIMB)
+    climb_z = SAFE_Z if altitudes is None or not planned else planned[0][5]
+    cruise_z = {w[1]: w[5] for w in planned}
+
+    if PREFLIGHT:
+        with phase("preflight"):
+            report = check_route(planned, (sx, sy), SAFE_Z if altitudes is None else math.inf, ZONES, PLANNER,
+                                 REPLAN_ON_BLOCK, PREVIEW_ACTORS, altitudes=altitudes)
+        print_preflight(report)
+        if not report.ok:
+            print("\nMission rejected before arming.")
+            await aclient.simPrintLogMessage("Mission:", "REJECTED (PREFLIGHT)", severity=2)
+            return
+
+    await aclient.enableApiControl(True, vehicle_name=VEHICLE_NAME)
+    await aclient.armDisarm(True, vehicle_name=VEHICLE_NAME)
 
-        state = client.getMultirotorState(vehicle_name=VEHICLE_NAME)
-        pos = state.kinematics_estimated.position
-        x0, y0, z0 = pos.x_val, pos.y_val, pos.z_val
+    print("\nTaking off...")
+    await timed("takeoff", aclient.takeoffAsync(vehicle_name=VEHICLE_NAME))
+    await asyncio.sleep(1.0)
+    stream.start()
+
+    telemetry = None
+    run_dir = new_run_dir(TELEMETRY_DIR)
+    if run_dir is not None:
+        telemetry = TelemetryRecorder(
+            run_dir, VEHICLE_NAME, TELEMETRY_RATE_HZ, client_factory, stream, LIDAR_NAME, ZONES,
+            planner=PLANNER, replan=REPLAN_ON_BLOCK
+        ).start()
+        telemetry.set_altitudes(altitudes, SAFE_Z)
+
+    print(f"\nClimbing to {'SAFE_Z' if altitudes is None else 'the first leg altitude'} {climb_z:.1f} first...")
+    climb_speed = SPEED_MPS
+    if SPEED_PROFILE:
+        climb_speed = vertical_speed(climb_z - (await current_position(aclient, stream))[2])
+    await timed("climb", aclient.moveToZAsync(climb_z, climb_speed, vehicle_name=VEHICLE_NAME))
+    await asyncio.sleep(0.5)
+
+    # building tops for the speed limits: the corridor planner's field, else the roofs alone
+    heights = (altitudes or AltitudePlanner.from_waypoints(waypoints)).heights
+    executor = PathExecutor(aclient.motion_client, VEHICLE_NAME, MAX_CRUISE_MPS if SPEED_PROFILE else SPEED_MPS,
+                            zones=ZONES, speed_planner=SpeedPlanner(ZONES, heights=heights) if SPEED_PROFILE else None)
+    guard = None
+    if LIDAR_NAME is not None and LIDAR_GUARD:
+        guard = GuardedMove(aclient, VEHICLE_NAME, LIDAR_NAME, executor if EXECUTION_MODE == "path" else None)
+    pending = []  # path mode: vertices queued until the next stop
 
-        if point_in_forbidden_xyz(x, y, z_cmd):
-            client.simPrintLogMessage("ForbiddenZone", f"TARGET FORBIDDEN: {name}", severity=2)
+    for idx, name, x, y, z_roof, z_target in waypoints:
+        x0, y0, z0 = pending[-1] if pending else await current_position(aclient, stream)
+
+        if altitudes is not None and LIDAR_NAME is not None and ALTITUDE_LIDAR and not pending:
+            scan = await aclient.getLidarData(lidar_name=LIDAR_NAME, vehicle_name=VEHICLE_NAME)
+            altitudes.heights.add_scan(scan)
+            if telemetry is not None:
+                telemetry.height_scan(scan, leg=idx)
+        z_request = min(z_target, cruise_z[name])
+        with phase("safety"):
+            climb, (_, _, z_cmd), decision = plan_leg((x0, y0, z0), x, y, z_request, SAFE_Z, altitudes, decide)
+
+        if telemetry is not None:
+            telemetry.event("leg_start", leg=idx, value=z_request, xyz=(x0, y0, z0))
+            telemetry.set_target(x, y, z_cmd, leg=idx, leg_blocked=decision.reason in ("detour", "no_route"))
+            telemetry.event(decision_kind(decision), leg=idx, value=len(decision.detour), xyz=(x, y, z_cmd))
+
+        if decision.reason == "target_forbidden":
+            await aclient.simPrintLogMessage("ForbiddenZone", f"TARGET FORBIDDEN: {name}", severity=2)
             print(f"\nForbiddenZone: TARGET FORBIDDEN -> {name}")
 
             # Hold at SAFE_Z so you can see the forbidden zone
             try:
-                client.moveToZAsync(SAFE_Z, SPEED_MPS, vehicle_name=VEHICLE_NAME).join()
+                await aclient.moveToZAsync(SAFE_Z, SPEED_MPS, vehicle_name=VEHICLE_NAME)
             except Exception as e:
                 print(f"[WARN] moveToZAsync failed: {e}")
 
             print("Holding at SAFE_Z (no move).")
-            client.simPrintLogMessage("Mission:", "HOLDING AT SAFE_Z (FORBIDDEN)", severity=1)
-            hover_wait(client, 15.0)
+            note(telemetry, "hold", leg=idx)
+            await aclient.simPrintLogMessage("Mission:", "HOLDING AT SAFE_Z (FORBIDDEN)", severity=1)
+            await hover_wait(aclient, 15.0, stream)
             break
 
-        cx, cy, cz, ex, ey, ez, yaw = forbidden_params_m()
-        in_forbidden_z = (abs(z0 - cz) <= ez) or (abs(z_cmd - cz) <= ez)
-
-        if in_forbidden_z and segment_crosses_forbidden_xy(x0, y0, x, y):
-            client.simPrintLogMessage("ForbiddenZone", f"PATH FORBIDDEN to: {name}", severity=2)
+        detour = decision.detour
+        if decision.reason in ("detour", "no_route"):
+            await aclient.simPrintLogMessage("ForbiddenZone", f"PATH FORBIDDEN to: {name}", severity=2)
             print(f"\nForbiddenZone: PATH CROSSES FORBIDDEN -> {name}")
 
-            # Hold at SAFE_Z so you can see the forbidden zone
-            try:
-                client.moveToZAsync(SAFE_Z, SPEED_MPS, vehicle_name=VEHICLE_NAME).join()
-            except Exception as e:
-                print(f"[WARN] moveToZAsync failed: {e}")
+            if decision.action == "hold":
+                # Hold at SAFE_Z so you can see the forbidden zone
+                try:
+                    await aclient.moveToZAsync(SAFE_Z, SPEED_MPS, vehicle_name=VEHICLE_NAME)
+                except Exception as e:
+                    print(f"[WARN] moveToZAsync failed: {e}")
 
-            print("Holding at SAFE_Z (no move).")
-            client.simPrintLogMessage("Mission:", "HOLDING AT SAFE_Z (FORBIDDEN)", severity=1)
-            hover_wait(client, 15.0)
-            break
+                print("Holding at SAFE_Z (no move).")
+                note(telemetry, "hold", leg=idx)
+                await aclient.simPrintLogMessage("Mission:", "HOLDING AT SAFE_Z (FORBIDDEN)", severity=1)
+                await hover_wait(aclient, 15.0, stream)
+                break
+
+            print(f"Detour found: {len(detour)} corner(s) in {PLANNER.last_stats['ms']:.1f} ms")
+            await aclient.simPrintLogMessage("ForbiddenZone", f"DETOUR to: {name}", severity=1)
 
         print(f"\nFlying to WP {idx} ({name}) at z_cmd={z_cmd:.3f}")
 
-        client.moveToPositionAsync(
-            x, y, z_cmd,
-            SPEED_MPS,
-            timeout_sec=120,
-            vehicle_name=VEHICLE_NAME
-        ).join()
+        if EXECUTION_MODE == "path":
+            pending += climb + detour + [(x, y, z_cmd)]
+            if DELIVERY_STOPS is not None and name not in DELIVERY_STOPS and name != "Actor_2":
+                continue
+            reason = await fly(aclient, stream, executor, pending, name, telemetry, guard)
+            pending = []
+        else:
+            reason = await fly(aclient, stream, None, climb + detour + [(x, y, z_cmd)], name, telemetry, guard)
 
-        client.hoverAsync(vehicle_name=VEHICLE_NAME).join()
+        if reason:
+            await hover_wait(aclient, 15.0, stream)
+            break
 
         if name == "Actor_2":
             # small painting movement
             BOUNCE_M = 0.5
             z_down = max(z_cmd + BOUNCE_M, z_target)
             z_up = z_cmd - BOUNCE_M
+            speeds = (2.0, 6.0, 3.0)
+            if SPEED_PROFILE:
+                # no faster than each short move can reach, the way down stops within OVERSHOOT_M
+                speeds = (vertical_speed(z_down - z_cmd), vertical_speed(z_up - z_down), vertical_speed(z_cmd - z_up))
 
-            client.simPrintLogMessage("Drone is PAINTING:", "COMPLETED", severity=0)
+            await aclient.simPrintLogMessage("Drone is PAINTING:", "COMPLETED", severity=0)
 
             try:
-                client.moveToZAsync(z_down, 2.0, vehicle_name=VEHICLE_NAME).join()
-                time.sleep(0.05)
-                client.moveToZAsync(z_up, 6.0, vehicle_name=VEHICLE_NAME).join()
-                time.sleep(0.05)
-                client.moveToZAsync(z_cmd, 3.0, vehicle_name=VEHICLE_NAME).join()
-                client.hoverAsync(vehicle_name=VEHICLE_NAME).join()
+                with phase("paint"):
+                    await aclient.moveToZAsync(z_down, speeds[0], vehicle_name=VEHICLE_NAME)
+                    await asyncio.sleep(0.05)
+                    await aclient.moveToZAsync(z_up, speeds[1], vehicle_name=VEHICLE_NAME)
+                    await asyncio.sleep(0.05)
+                    await aclient.moveToZAsync(z_cmd, speeds[2], vehicle_name=VEHICLE_NAME)
+                    await aclient.hoverAsync(vehicle_name=VEHICLE_NAME)
             except Exception as e:
                 print(f"[WARN] Actor_2 painting move failed: {e}")
 
             # ===== After Actor_2 painting: check NEXT actor (Actor_4) WITHOUT moving, then stop =====
             try:
                 next_name = "Actor_4"
-                next_pose = must_pose(client, next_name)
-
-                nx = next_pose.position.x_val
-                ny = next_pose.position.y_val
-                nz_roof = next_pose.position.z_val
+                nx, ny, nz_roof = actor_xyz[next_name]
                 nz_target = nz_roof - ROOF_CLEARANCE_M
-                nz_cmd = min(nz_target, SAFE_Z)
 
                 # Current drone position
-                state2 = client.getMultirotorState(vehicle_name=VEHICLE_NAME)
-                pos2 = state2.kinematics_estimated.position
-                cx0, cy0, cz0 = pos2.x_val, pos2.y_val, pos2.z_val
-
-                forbidden = False
-
-                if point_in_forbidden_xyz(nx, ny, nz_cmd):
-                    forbidden = True
-                    client.simPrintLogMessage("ForbiddenZone", f"TARGET FORBIDDEN: {next_name}", severity=2)
+                cx0, cy0, cz0 = await current_position(aclient, stream)
+
+                # preview only: checked like a leg, but never re-planned
+                nz_request = min(nz_target, cruise_z.get(next_name, nz_target))
+                with phase("safety"):
+                    _, (_, _, nz_cmd), preview = plan_leg(
+                        (cx0, cy0, cz0), nx, ny, nz_request, SAFE_Z, altitudes,
+                        lambda start, target: decide(start, target, replan=False))
+                forbidden = preview.action == "hold"
+
+                if telemetry is not None:
+                    next_idx = WAYPOINT_ACTOR_NAMES.index(next_name) + 1
+                    telemetry.event("leg_start", leg=next_idx, value=nz_request, xyz=(cx0, cy0, cz0))
+                    telemetry.event(decision_kind(preview, preview=True), leg=next_idx, xyz=(nx, ny, nz_cmd))
+
+                if preview.reason == "target_forbidden":
+                    await aclient.simPrintLogMessage("ForbiddenZone", f"TARGET FORBIDDEN: {next_name}", severity=2)
                     print(f"\nForbiddenZone: TARGET FORBIDDEN -> {next_name}")
                 else:
-                    bx, by, bcz, bex, bey, bez, byaw = forbidden_params_m()
-                    in_forbidden_z2 = (abs(cz0 - bcz) <= bez) or (abs(nz_cmd - bcz) <= bez)
-
-                    if in_forbidden_z2 and segment_crosses_forbidden_xy(cx0, cy0, nx, ny):
-                        forbidden = True
-                        client.simPrintLogMessage("ForbiddenZone", f"PATH FORBIDDEN to: {next_name}", severity=2)
+                    if forbidden:
+                        await aclient.simPrintLogMessage("ForbiddenZone", f"PATH FORBIDDEN to: {next_name}", severity=2)
                         print(f"\nForbiddenZone: PATH CROSSES FORBIDDEN -> {next_name}")
 
                 # Hold at SAFE_Z so you can see forbidden zone
-                client.moveToZAsync(SAFE_Z, SPEED_MPS, vehicle_name=VEHICLE_NAME).join()
-                client.hoverAsync(vehicle_name=VEHICLE_NAME).join()
+                await aclient.moveToZAsync(SAFE_Z, SPEED_MPS, vehicle_name=VEHICLE_NAME)
+                await aclient.hoverAsync(vehicle_name=VEHICLE_NAME)
 
                 if forbidden:
                     print("Holding at SAFE_Z (forbidden ahead).")
-                    client.simPrintLogMessage("Mission:", "HOLDING AT SAFE_Z (FORBIDDEN AHEAD)", severity=1)
+                    note(telemetry, "hold", leg=idx)
+                    await aclient.simPrintLogMessage("Mission:", "HOLDING AT SAFE_Z (FORBIDDEN AHEAD)", severity=1)
                 else:
                     print("ForbiddenZone: stop")
-                    client.simPrintLogMessage("ForbiddenZone", "STOPPED (PREVIEW)", severity=2)
+                    await aclient.simPrintLogMessage("ForbiddenZone", "STOPPED (PREVIEW)", severity=2)
 
-                hover_wait(client, 15.0)
+                await hover_wait(aclient, 15.0, stream)
             except Exception as e:
                 print(f"[WARN] Post-Actor_2 forbidden preview failed: {e}")
 
@@ -259,10 +438,41 @@ def main():
             # ==========================================================================================
             # ==========================================================================================
 
+    else:
+        if pending:
+            await fly(aclient, stream, executor, pending, "last stop", telemetry, guard)
+
+    if executor.runs:
+        executor.print_report()
+    if guard is not None:
+        guard.print_report()
+    if altitudes is not None:
+        altitudes.print_report(SAFE_Z)
+
+    stream.print_stats()
+    stream.stop()
+    if telemetry is not None:
+        telemetry.stop()
+        print(f"Telemetry: {telemetry.rows} samples in {telemetry.run_dir}")
 
     print("\nMission complete.")
-    client.simPrintLogMessage("Mission:", "DONE", severity=2)
-    client.hoverAsync(vehicle_name=VEHICLE_NAME).join()
+    await aclient.simPrintLogMessage("Mission:", "DONE", severity=2)
+    await aclient.hoverAsync(vehicle_name=VEHICLE_NAME)
+
+
+def main(client_factory=airsim.MultirotorClient, level_name=LEVEL_NAME):
+    counts = Counter()  # RPCs of both connections of the async client
+    aclient = AsyncMultirotorClient(
+        lambda: CountingClient(client_factory(), counts), vehicle_name=VEHICLE_NAME
+    )
+    try:
+        asyncio.run(run_mission(aclient, client_factory, level_name))
+    except KeyboardInterrupt:
+        # asyncio.run cancelled the mission task, which sent cancelLastTask for the running move
+        print("\nMission interrupted.")
+    finally:
+        aclient.close()
+        aclient.motion_client.print_counts()
 
 
 if __name__ == "__main__":
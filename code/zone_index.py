@@ -0,0 +1,234 @@
+import json
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from forbidden_zone import OrientedBoxZone, PolygonZone
+
+DEFAULT_CELL_M = 100.0
+MAX_CELLS_PER_ZONE = 4096   # a zone larger than this many cells goes to the "always check" list
+
+
+def zone_from_dict(d):
+    """
+    One zone entry from a zone file.
+
+    box:     {"type": "box", "name": ..., "location_cm": [x,y,z], "extent_cm": [x,y,z],
+              "yaw_deg": ..., "margin_m": ..., "xy_only": false}
+             location_cm = the Location as shown in the Unreal editor (Z up,
+             converted with frames.unreal_to_ned); or "center_cm" = the center
+             already in NED cm (Z down); or "center_m" / "extent_m" in NED meters
+    polygon: {"type": "polygon", "name": ..., "vertices_m": [[x,y], ...],
+              "z_min_m": ..., "z_max_m": ...}        (z range optional = all altitudes)
+    """
+    kind = d.get("type", "box")
+    name = d.get("name", "")
+
+    if kind == "box":
+        margin = float(d.get("margin_m", 0.0))
+        xy_only = bool(d.get("xy_only", False))
+        if "location_cm" in d:
+            return OrientedBoxZone.from_unreal_location(d["location_cm"], d["extent_cm"], d.get("yaw_deg", 0.0),
+                                                        margin, xy_only, name)
+        if "center_cm" in d:
+            return OrientedBoxZone.from_ned_cm(d["center_cm"], d["extent_cm"], d.get("yaw_deg", 0.0),
+                                               margin, xy_only, name)
+        cx, cy, cz = d["center_m"]
+        ex, ey, ez = d["extent_m"]
+        return OrientedBoxZone(cx, cy, cz, ex + margin, ey + margin, math.inf if xy_only else ez,
+                               math.radians(d.get("yaw_deg", 0.0)), name)
+
+    if kind == "polygon":
+        return PolygonZone.from_z_range(d["vertices_m"], d.get("z_min_m", -math.inf),
+                                        d.get("z_max_m", math.inf), name)
+
+    raise ValueError(f"Unknown zone type '{kind}' ({name})")
+
+
+def zone_to_dict(zone):
+    """Zone file entry of a zone (NED meters), so that zone_from_dict(zone_to_dict(z)) rebuilds it."""
+    if isinstance(zone, OrientedBoxZone):
+        d = {"type": "box", "name": zone.name, "center_m": [zone.cx, zone.cy, zone.cz],
+             "extent_m": [zone.ex, zone.ey, 0.0 if math.isinf(zone.ez) else zone.ez],
+             "yaw_deg": math.degrees(zone.yaw)}
+        if math.isinf(zone.ez):
+            d["xy_only"] = True
+        return d
+    d = {"type": "polygon", "name": zone.name, "vertices_m": [list(v) for v in zone.vertices]}
+    if not math.isinf(zone.ez):
+        d["z_min_m"], d["z_max_m"] = zone.cz - zone.ez, zone.cz + zone.ez
+    return d
+
+
+class ZoneRegistry:
+    """
+    Set of no-fly zones behind a hashed uniform grid over XY.
+
+    Each zone is registered in every cell its bounding rectangle overlaps, so a
+    point query touches one cell and a segment query only the cells the segment
+    passes through; exact zone tests run on those candidates only.
+    """
+
+    def __init__(self, zones=(), cell_size_m=None):
+        self.zones = list(zones)
+        self.cell = cell_size_m
+        self._auto_size = cell_size_m is None
+        self._grid = {}
+        self._huge = []
+        self._build()
+
+    @classmethod
+    def load(cls, path, cell_size_m=None):
+        """Bulk-load zones from a JSON file: {"zones": [...]} or a bare list."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        items = data["zones"] if isinstance(data, dict) else data
+        return cls([zone_from_dict(d) for d in items], cell_size_m)
+
+    def __len__(self):
+        return len(self.zones)
+
+    def __iter__(self):
+        return iter(self.zones)
+
+    def add(self, zone):
+        self.zones.append(zone)
+        self._insert(len(self.zones) - 1, zone)
+
+    def extend(self, zones):
+        self.zones.extend(zones)
+        self._build()
+
+    # ---------- index ----------
+
+    def _auto_cell(self):
+        if not self.zones:
+            return DEFAULT_CELL_M
+        sizes = []
+        for z in self.zones:
+            x0, y0, x1, y1 = z.bounds_xy()
+            sizes.append(max(x1 - x0, y1 - y0))
+        # about one cell per typical zone keeps both the fan-out and the candidate lists small
+        return max(1.0, float(np.median(sizes)))
+
+    def _build(self):
+        if self._auto_size:
+            self.cell = self._auto_cell()
+        self._grid = defaultdict(list)
+        self._huge = []
+        for i, z in enumerate(self.zones):
+            self._insert(i, z)
+
+    def _cell_of(self, x, y):
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    def _insert(self, i, zone):
+        x0, y0, x1, y1 = zone.bounds_xy()
+        i0, j0 = self._cell_of(x0, y0)
+        i1, j1 = self._cell_of(x1, y1)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > MAX_CELLS_PER_ZONE:
+            self._huge.append(i)
+            return
+        for ci in range(i0, i1 + 1):
+            for cj in range(j0, j1 + 1):
+                self._grid[(ci, cj)].append(i)
+
+    def cells_on_segment(self, x0, y0, x1, y1):
+        """Grid cells crossed by the XY segment (Amanatides-Woo traversal)."""
+        ci, cj = self._cell_of(x0, y0)
+        ei, ej = self._cell_of(x1, y1)
+        cells = [(ci, cj)]
+
+        dx = x1 - x0
+        dy = y1 - y0
+        step_i = 1 if dx > 0 else -1
+        step_j = 1 if dy > 0 else -1
+        t_dx = abs(self.cell / dx) if dx != 0 else math.inf
+        t_dy = abs(self.cell / dy) if dy != 0 else math.inf
+        next_x = (ci + (step_i > 0)) * self.cell
+        next_y = (cj + (step_j > 0)) * self.cell
+        t_mx = (next_x - x0) / dx if dx != 0 else math.inf
+        t_my = (next_y - y0) / dy if dy != 0 else math.inf
+
+        n = abs(ei - ci) + abs(ej - cj)
+        for _ in range(n):
+            if t_mx < t_my:
+                ci += step_i
+                t_mx += t_dx
+            else:
+                cj += step_j
+                t_my += t_dy
+            cells.append((ci, cj))
+        return cells
+
+    def candidates_point(self, x, y):
+        ids = self._grid.get(self._cell_of(x, y), ())
+        return list(ids) + self._huge if self._huge else ids
+
+    def candidates_segment(self, x0, y0, x1, y1):
+        seen = set(self._huge)
+        grid = self._grid
+        for c in self.cells_on_segment(x0, y0, x1, y1):
+            ids = grid.get(c)
+            if ids:
+                seen.update(ids)
+        return seen
+
+    def candidates_rect(self, xmin, ymin, xmax, ymax):
+        """Ids of the zones registered in any cell the XY rectangle overlaps (plus the unindexed ones)."""
+        i0, j0 = self._cell_of(xmin, ymin)
+        i1, j1 = self._cell_of(xmax, ymax)
+        seen = set(self._huge)
+        grid = self._grid
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(grid):
+            # a window wider than the occupied cells (a planner search grown to its limit): scan those instead
+            for (ci, cj), ids in grid.items():
+                if i0 <= ci <= i1 and j0 <= cj <= j1:
+                    seen.update(ids)
+            return seen
+        for ci in range(i0, i1 + 1):
+            for cj in range(j0, j1 + 1):
+                ids = grid.get((ci, cj))
+                if ids:
+                    seen.update(ids)
+        return seen
+
+    # ---------- queries ----------
+
+    def zones_at(self, x, y, z=None):
+        """Zones containing the point (z=None ignores altitude)."""
+        return [self.zones[i] for i in self.candidates_point(x, y) if self.zones[i].contains_point(x, y, z)]
+
+    def point_blocked(self, x, y, z=None) -> bool:
+        return any(self.zones[i].contains_point(x, y, z) for i in self.candidates_point(x, y))
+
+    def zones_on_leg(self, x0, y0, z0, x1, y1, z1):
+        """Zones that block the leg under the waypoint3 rule (XY crossing + Z band at either end)."""
+        out = []
+        for i in sorted(self.candidates_segment(x0, y0, x1, y1)):
+            if self.zones[i].leg_blocked(x0, y0, z0, x1, y1, z1):
+                out.append(self.zones[i])
+        return out
+
+    def leg_blocked(self, x0, y0, z0, x1, y1, z1) -> bool:
+        for i in self.candidates_segment(x0, y0, x1, y1):
+            if self.zones[i].leg_blocked(x0, y0, z0, x1, y1, z1):
+                return True
+        return False
+
+    def route_blocked(self, route) -> np.ndarray:
+        """(M,3) polyline -> (M-1,) bool, one entry per leg."""
+        route = np.asarray(route, dtype=np.float64).reshape(-1, 3).tolist()
+        return np.array([self.leg_blocked(*a, *b) for a, b in zip(route[:-1], route[1:])], dtype=bool)
+
+    def stats(self):
+        sizes = [len(v) for v in self._grid.values()]
+        return {
+            "zones": len(self.zones),
+            "cell_m": self.cell,
+            "cells": len(sizes),
+            "max_per_cell": max(sizes, default=0),
+            "mean_per_cell": float(np.mean(sizes)) if sizes else 0.0,
+            "unindexed": len(self._huge),
+        }
\ No newline at end of file